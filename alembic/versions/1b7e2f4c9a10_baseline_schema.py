@@ -0,0 +1,249 @@
+"""Baseline schema
+
+Revision ID: 1b7e2f4c9a10
+Revises: d4da9e08c95a
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b7e2f4c9a10'
+down_revision: Union[str, Sequence[str], None] = 'd4da9e08c95a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 기존 운영 DB는 main.py의 create_all()로 이미 테이블이 만들어져 있으므로,
+# 없는 테이블만 생성하고 나머지는 그대로 둡니다. (이 리비전이 스키마 기준점)
+user_role = sa.Enum(
+    'SUPER_ADMIN', 'BRAND_ADMIN', 'GROUP_ADMIN', 'STORE_OWNER', 'STAFF', 'GENERAL_USER',
+    name='userrole'
+)
+
+
+def _create_table(name, *columns):
+    # index=True 컬럼의 인덱스(ix_<table>_<column>)는 create_table이 함께 만들어 줍니다.
+    if not sa.inspect(op.get_bind()).has_table(name):
+        op.create_table(name, *columns)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _create_table(
+        'brands',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('name', sa.String(), unique=True, index=True),
+        sa.Column('business_number', sa.String(), nullable=True),
+        sa.Column('support_email', sa.String(), nullable=True),
+        sa.Column('logo_url', sa.String(), nullable=True),
+        sa.Column('homepage', sa.String(), nullable=True),
+    )
+    _create_table(
+        'groups',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('name', sa.String(), unique=True, index=True),
+        sa.Column('brand_id', sa.Integer(), sa.ForeignKey('brands.id'), nullable=True),
+    )
+    _create_table(
+        'stores',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('name', sa.String(), index=True),
+        sa.Column('brand_id', sa.Integer(), sa.ForeignKey('brands.id'), nullable=True),
+        sa.Column('is_direct_manage', sa.Boolean()),
+        sa.Column('address', sa.String(), nullable=True),
+        sa.Column('phone', sa.String(), nullable=True),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('is_open', sa.Boolean()),
+        sa.Column('notice', sa.String(), nullable=True),
+        sa.Column('origin_info', sa.String(), nullable=True),
+        sa.Column('owner_name', sa.String(), nullable=True),
+        sa.Column('business_name', sa.String(), nullable=True),
+        sa.Column('business_address', sa.String(), nullable=True),
+        sa.Column('business_number', sa.String(), nullable=True),
+        sa.Column('group_id', sa.Integer(), sa.ForeignKey('groups.id'), nullable=True),
+        sa.Column('price_markup', sa.Integer()),
+        sa.Column('royalty_type', sa.String()),
+        sa.Column('royalty_amount', sa.Float()),
+        sa.Column('region', sa.String()),
+        sa.Column('payment_policy', sa.String()),
+    )
+    _create_table(
+        'users',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('email', sa.String(), unique=True, index=True),
+        sa.Column('hashed_password', sa.String()),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('phone', sa.String(), nullable=True),
+        sa.Column('is_active', sa.Boolean()),
+        sa.Column('role', user_role),
+        sa.Column('brand_id', sa.Integer(), sa.ForeignKey('brands.id'), nullable=True),
+        sa.Column('group_id', sa.Integer(), sa.ForeignKey('groups.id'), nullable=True),
+        sa.Column('store_id', sa.Integer(), sa.ForeignKey('stores.id'), nullable=True),
+    )
+    _create_table(
+        'categories',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('store_id', sa.Integer(), sa.ForeignKey('stores.id'), index=True, nullable=False),
+        sa.Column('name', sa.String()),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('order_index', sa.Integer()),
+        sa.Column('is_hidden', sa.Boolean()),
+    )
+    _create_table(
+        'menus',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('store_id', sa.Integer(), sa.ForeignKey('stores.id'), index=True, nullable=False),
+        sa.Column('category_id', sa.Integer(), sa.ForeignKey('categories.id')),
+        sa.Column('name', sa.String()),
+        sa.Column('price', sa.Integer()),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('is_sold_out', sa.Boolean()),
+        sa.Column('image_url', sa.String(), nullable=True),
+        sa.Column('order_index', sa.Integer()),
+        sa.Column('is_hidden', sa.Boolean()),
+        sa.Column('is_price_fixed', sa.Boolean()),
+        sa.Column('is_discounted', sa.Boolean()),
+        sa.Column('discount_price', sa.Integer()),
+        sa.Column('time_sale_start', sa.String(), nullable=True),
+        sa.Column('time_sale_end', sa.String(), nullable=True),
+        sa.Column('target_time', sa.Integer()),
+    )
+    _create_table(
+        'option_groups',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('store_id', sa.Integer(), sa.ForeignKey('stores.id'), index=True, nullable=False),
+        sa.Column('name', sa.String()),
+        sa.Column('is_required', sa.Boolean()),
+        sa.Column('is_single_select', sa.Boolean()),
+        sa.Column('order_index', sa.Integer()),
+        sa.Column('max_select', sa.Integer()),
+    )
+    _create_table(
+        'options',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('store_id', sa.Integer(), sa.ForeignKey('stores.id'), index=True, nullable=False),
+        sa.Column('group_id', sa.Integer(), sa.ForeignKey('option_groups.id')),
+        sa.Column('name', sa.String()),
+        sa.Column('price', sa.Integer()),
+        sa.Column('order_index', sa.Integer()),
+        sa.Column('is_default', sa.Boolean()),
+    )
+    _create_table(
+        'menu_option_links',
+        sa.Column('menu_id', sa.Integer(), sa.ForeignKey('menus.id'), primary_key=True),
+        sa.Column('option_group_id', sa.Integer(), sa.ForeignKey('option_groups.id'), primary_key=True),
+        sa.Column('order_index', sa.Integer()),
+    )
+    _create_table(
+        'tables',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('store_id', sa.Integer(), sa.ForeignKey('stores.id'), index=True, nullable=False),
+        sa.Column('name', sa.String()),
+        sa.Column('qr_token', sa.String(), unique=True, index=True),
+    )
+    _create_table(
+        'call_options',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('store_id', sa.Integer(), sa.ForeignKey('stores.id'), index=True, nullable=False),
+        sa.Column('name', sa.String()),
+    )
+    _create_table(
+        'operating_hours',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('store_id', sa.Integer(), sa.ForeignKey('stores.id'), index=True, nullable=False),
+        sa.Column('day_of_week', sa.Integer()),
+        sa.Column('open_time', sa.String(), nullable=True),
+        sa.Column('close_time', sa.String(), nullable=True),
+        sa.Column('is_closed', sa.Boolean()),
+        sa.Column('break_time_list', sa.String()),
+    )
+    _create_table(
+        'holidays',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('store_id', sa.Integer(), sa.ForeignKey('stores.id'), index=True, nullable=False),
+        sa.Column('date', sa.String()),
+        sa.Column('description', sa.String(), nullable=True),
+    )
+    # created_at은 이 시점 기준(문자열)으로 만들고, 다음 리비전에서 timestamptz로 변환합니다.
+    _create_table(
+        'orders',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('store_id', sa.Integer(), sa.ForeignKey('stores.id'), index=True, nullable=False),
+        sa.Column('daily_number', sa.Integer()),
+        sa.Column('total_price', sa.Integer()),
+        sa.Column('is_completed', sa.Boolean()),
+        sa.Column('created_at', sa.String()),
+        sa.Column('table_id', sa.Integer(), sa.ForeignKey('tables.id'), nullable=True),
+        sa.Column('payment_status', sa.String()),
+        sa.Column('cooking_status', sa.String()),
+        sa.Column('target_time', sa.Integer()),
+        sa.Column('payment_method', sa.String(), nullable=True),
+        sa.Column('imp_uid', sa.String(), nullable=True),
+        sa.Column('merchant_uid', sa.String(), unique=True, nullable=True),
+        sa.Column('paid_amount', sa.Integer()),
+    )
+    _create_table(
+        'daily_order_counters',
+        sa.Column('store_id', sa.Integer(), sa.ForeignKey('stores.id'), primary_key=True),
+        sa.Column('business_date', sa.Date(), primary_key=True),
+        sa.Column('last_number', sa.Integer(), nullable=False),
+    )
+    _create_table(
+        'order_items',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('store_id', sa.Integer(), sa.ForeignKey('stores.id'), index=True, nullable=False),
+        sa.Column('order_id', sa.Integer(), sa.ForeignKey('orders.id')),
+        sa.Column('menu_name', sa.String()),
+        sa.Column('price', sa.Integer()),
+        sa.Column('quantity', sa.Integer()),
+        sa.Column('options_desc', sa.String(), nullable=True),
+        sa.Column('is_cancelled', sa.Boolean()),
+    )
+    _create_table(
+        'staff_calls',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('store_id', sa.Integer(), sa.ForeignKey('stores.id'), index=True, nullable=False),
+        sa.Column('table_id', sa.Integer(), sa.ForeignKey('tables.id')),
+        sa.Column('message', sa.String()),
+        sa.Column('is_completed', sa.Boolean()),
+        sa.Column('created_at', sa.String()),
+    )
+    _create_table(
+        'notices',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('content', sa.String(), nullable=False),
+        sa.Column('target_type', sa.String(), nullable=False),
+        sa.Column('target_brand_id', sa.Integer(), nullable=True),
+        sa.Column('target_store_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('is_active', sa.Boolean()),
+    )
+    _create_table(
+        'notice_reads',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id')),
+        sa.Column('notice_id', sa.Integer(), sa.ForeignKey('notices.id')),
+        sa.Column('read_at', sa.DateTime()),
+    )
+    _create_table(
+        'audit_logs',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id')),
+        sa.Column('action', sa.String(), nullable=False),
+        sa.Column('target_type', sa.String(), nullable=False),
+        sa.Column('target_id', sa.Integer(), nullable=True),
+        sa.Column('details', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime()),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # upgrade는 없던 테이블만 만들었을 뿐 기존 운영 테이블은 create_all()이 만든 것이므로,
+    # 여기서 테이블을 지우면 기준점 이전 데이터까지 사라집니다. 스키마는 그대로 둡니다. (초기화는 reset_db.py 사용)
+    pass
@@ -0,0 +1,36 @@
+"""Idempotency keys
+
+Revision ID: 3f6b9d1a4e57
+Revises: 9e4a6b2d8c35
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6b9d1a4e57'
+down_revision: Union[str, Sequence[str], None] = '9e4a6b2d8c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if sa.inspect(op.get_bind()).has_table('idempotency_keys'):
+        return
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('key', sa.String(), primary_key=True),
+        sa.Column('request_hash', sa.String(), nullable=False),
+        sa.Column('response_body', sa.String(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False, index=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('idempotency_keys')
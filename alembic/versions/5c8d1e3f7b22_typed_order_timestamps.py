@@ -0,0 +1,85 @@
+"""Typed order timestamps
+
+Revision ID: 5c8d1e3f7b22
+Revises: 1b7e2f4c9a10
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c8d1e3f7b22'
+down_revision: Union[str, Sequence[str], None] = '1b7e2f4c9a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 문자열 created_at을 timestamptz로 옮길 테이블들
+TABLES = ('orders', 'staff_calls')
+# 한 번에 갱신할 행 수 (배치마다 커밋해서 긴 잠금/거대한 트랜잭션을 피합니다)
+BATCH_SIZE = int(os.getenv('BACKFILL_BATCH_SIZE', '5000'))
+
+
+def _app_timezone(bind):
+    # 기존 문자열은 앱 서버의 현지 시각(str(datetime.now()))으로 저장되어 있습니다.
+    return os.getenv('APP_TIMEZONE') or bind.execute(sa.text('SHOW TIME ZONE')).scalar()
+
+
+def _is_timestamp(bind, table):
+    columns = {c['name']: c['type'] for c in sa.inspect(bind).get_columns(table)}
+    return isinstance(columns['created_at'], sa.DateTime)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    tz = _app_timezone(bind)
+
+    for table in TABLES:
+        # create_all()로 새로 만든 DB는 이미 timestamptz이므로 건너뜁니다.
+        if _is_timestamp(bind, table):
+            continue
+
+        op.add_column(table, sa.Column('created_at_ts', sa.DateTime(timezone=True), nullable=True))
+
+        with op.get_context().autocommit_block():
+            max_id = bind.execute(sa.text(f'SELECT COALESCE(MAX(id), 0) FROM {table}')).scalar()
+            for lo in range(0, max_id + 1, BATCH_SIZE):
+                bind.execute(
+                    sa.text(
+                        f"UPDATE {table} SET created_at_ts = (NULLIF(created_at, '')::timestamp AT TIME ZONE :tz) "
+                        f"WHERE id >= :lo AND id < :hi AND created_at_ts IS NULL"
+                    ),
+                    {'tz': tz, 'lo': lo, 'hi': lo + BATCH_SIZE}
+                )
+
+        # 백필 이후 새로 들어온 행까지 마저 옮기고 곧바로 컬럼을 교체합니다. (같은 트랜잭션)
+        # 쓰기를 잠깐 막아 두어야 마지막 갱신과 컬럼 교체 사이에 created_at이 비는 행이 생기지 않습니다.
+        # (백필이 끝난 id 이후만 PK 범위로 보므로 잠금 시간은 그 사이 들어온 행 수에 비례)
+        bind.execute(sa.text(f'LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE'))
+        bind.execute(
+            sa.text(
+                f"UPDATE {table} SET created_at_ts = (NULLIF(created_at, '')::timestamp AT TIME ZONE :tz) "
+                f"WHERE id > :max_id AND created_at_ts IS NULL"
+            ),
+            {'tz': tz, 'max_id': max_id}
+        )
+        op.drop_column(table, 'created_at')
+        op.alter_column(table, 'created_at_ts', new_column_name='created_at')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    tz = _app_timezone(bind)
+
+    for table in TABLES:
+        op.alter_column(
+            table, 'created_at',
+            type_=sa.String(),
+            postgresql_using=f"to_char(created_at AT TIME ZONE '{tz}', 'YYYY-MM-DD HH24:MI:SS.US')"
+        )
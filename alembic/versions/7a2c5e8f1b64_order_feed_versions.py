@@ -0,0 +1,43 @@
+"""Order feed versions
+
+Revision ID: 7a2c5e8f1b64
+Revises: 3f6b9d1a4e57
+Create Date: 2026-10-18 10:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a2c5e8f1b64'
+down_revision: Union[str, Sequence[str], None] = '3f6b9d1a4e57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('store_feed_versions'):
+        op.create_table(
+            'store_feed_versions',
+            sa.Column('store_id', sa.Integer(), sa.ForeignKey('stores.id'), primary_key=True),
+            sa.Column('version', sa.Integer(), nullable=False),
+        )
+    # 기존 주문은 모두 0 (= 최초 전체 조회에 포함). 상수 기본값이라 테이블 재작성 없이 추가됩니다.
+    if 'change_seq' not in {c['name'] for c in inspector.get_columns('orders')}:
+        op.add_column('orders', sa.Column('change_seq', sa.Integer(), nullable=False, server_default='0'))
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_orders_store_change_seq', 'orders', ['store_id', 'change_seq'], postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_orders_store_change_seq', table_name='orders', postgresql_concurrently=True, if_exists=True)
+    op.drop_column('orders', 'change_seq')
+    op.drop_table('store_feed_versions')
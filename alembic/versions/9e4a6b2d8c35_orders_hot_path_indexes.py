@@ -0,0 +1,41 @@
+"""Orders hot path indexes
+
+Revision ID: 9e4a6b2d8c35
+Revises: 5c8d1e3f7b22
+Create Date: 2026-10-18 09:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4a6b2d8c35'
+down_revision: Union[str, Sequence[str], None] = '5c8d1e3f7b22'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (인덱스 이름, 테이블, 컬럼) - models.py의 __table_args__와 동일하게 유지
+INDEXES = (
+    ('ix_orders_kitchen_feed', 'orders', ['store_id', 'payment_status', 'is_completed']),
+    ('ix_orders_store_id_id', 'orders', ['store_id', 'id']),
+    ('ix_orders_store_paid_created', 'orders', ['store_id', 'payment_status', 'created_at']),
+    ('ix_staff_calls_store_open', 'staff_calls', ['store_id', 'is_completed']),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY는 트랜잭션 밖에서만 실행되므로 autocommit 블록을 사용합니다. (운영 중 쓰기 잠금 없음)
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,44 @@
+"""Order refunds
+
+Revision ID: b8d3f0a6c219
+Revises: 7a2c5e8f1b64
+Create Date: 2026-10-18 10:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d3f0a6c219'
+down_revision: Union[str, Sequence[str], None] = '7a2c5e8f1b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if sa.inspect(op.get_bind()).has_table('order_refunds'):
+        return
+    op.create_table(
+        'order_refunds',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('order_id', sa.Integer(), sa.ForeignKey('orders.id'), index=True, nullable=False),
+        sa.Column('store_id', sa.Integer(), sa.ForeignKey('stores.id'), index=True, nullable=False),
+        sa.Column('imp_uid', sa.String(), nullable=True),
+        sa.Column('amount', sa.Integer(), nullable=False),
+        sa.Column('checksum', sa.Integer(), nullable=True),
+        sa.Column('reason', sa.String(), nullable=True),
+        sa.Column('cancelled_item_ids', sa.String()),
+        sa.Column('status', sa.String()),
+        sa.Column('attempts', sa.Integer()),
+        sa.Column('last_error', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True)),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('order_refunds')
@@ -0,0 +1,36 @@
+"""Token revocations
+
+Revision ID: c4e9a2f7d813
+Revises: b8d3f0a6c219
+Create Date: 2026-10-18 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e9a2f7d813'
+down_revision: Union[str, Sequence[str], None] = 'b8d3f0a6c219'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if sa.inspect(op.get_bind()).has_table('token_revocations'):
+        return
+    op.create_table(
+        'token_revocations',
+        sa.Column('id', sa.Integer(), primary_key=True, index=True),
+        sa.Column('user_id', sa.Integer(), index=True, nullable=False),
+        sa.Column('revoked_before', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True)),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('token_revocations')
@@ -0,0 +1,68 @@
+"""Seed daily order counters
+
+Revision ID: e1f5a7c3d926
+Revises: c4e9a2f7d813
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f5a7c3d926'
+down_revision: Union[str, Sequence[str], None] = 'c4e9a2f7d813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 배포 당일 영업 중인 매장의 주문번호가 1번부터 다시 시작하지 않도록,
+# 최근 주문의 영업일별 마지막 번호로 daily_order_counters를 채웁니다.
+# (영업일 = 주문 시각이 그 요일 오픈 시간 이전이면 전날, store_schedule.StoreSchedule.business_date와 같은 규칙)
+SEED_LOOKBACK = '2 days'
+DEFAULT_OPEN_TIME = '09:00'
+
+
+def _app_timezone(bind):
+    # 앱 서버의 현지 시각 기준으로 영업일을 계산합니다. (datetime.now().astimezone())
+    return os.getenv('APP_TIMEZONE') or bind.execute(sa.text('SHOW TIME ZONE')).scalar()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    tz = _app_timezone(bind)
+    bind.execute(
+        sa.text(
+            f"""
+            INSERT INTO daily_order_counters (store_id, business_date, last_number)
+            SELECT store_id, business_date, MAX(daily_number)
+            FROM (
+                SELECT o.store_id, o.daily_number,
+                       CASE WHEN (o.created_at AT TIME ZONE :tz)::time
+                                 < COALESCE(NULLIF(oh.open_time, ''), :default_open)::time
+                            THEN (o.created_at AT TIME ZONE :tz)::date - 1
+                            ELSE (o.created_at AT TIME ZONE :tz)::date
+                       END AS business_date
+                FROM orders o
+                LEFT JOIN operating_hours oh
+                       ON oh.store_id = o.store_id
+                      AND oh.day_of_week = EXTRACT(ISODOW FROM o.created_at AT TIME ZONE :tz)::int - 1
+                WHERE o.created_at >= now() - interval '{SEED_LOOKBACK}'
+                  AND o.daily_number IS NOT NULL
+            ) recent
+            GROUP BY store_id, business_date
+            ON CONFLICT (store_id, business_date)
+            DO UPDATE SET last_number = GREATEST(daily_order_counters.last_number, EXCLUDED.last_number)
+            """
+        ),
+        {'tz': tz, 'default_open': DEFAULT_OPEN_TIME}
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # 채워 넣은 카운터는 이전 리비전 스키마와도 호환되므로 그대로 둡니다.
+    pass
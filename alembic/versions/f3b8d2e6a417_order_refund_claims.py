@@ -0,0 +1,30 @@
+"""Order refund claims
+
+Revision ID: f3b8d2e6a417
+Revises: e1f5a7c3d926
+Create Date: 2026-10-18 13:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8d2e6a417'
+down_revision: Union[str, Sequence[str], None] = 'e1f5a7c3d926'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('order_refunds')}
+    if 'next_attempt_at' not in columns:
+        op.add_column('order_refunds', sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('order_refunds', 'next_attempt_at')
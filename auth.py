@@ -1,11 +1,17 @@
-from datetime import datetime, timedelta
+import asyncio
+import hashlib
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status
 from sqlalchemy.orm import Session
-import crud, database, schemas
+import crud, database, schemas, models
+from principals import Principal, get_principal
+from revocation import RevocationList
 import os
 from dotenv import load_dotenv
 
@@ -15,11 +21,25 @@ if not SECRET_KEY:
     raise ValueError("SECRET_KEY가 설정되지 않았습니다.")
 
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24시간 유효
+# ✨ 액세스 토큰은 권한 정보(role/store/brand/group)를 담아 짧게, 리프레시 토큰으로 다시 발급받습니다.
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
+
+# 계정 비활성화/권한 변경 시 이미 발급된 액세스 토큰을 거부하기 위한 목록 (액세스 토큰 수명 동안만 보관)
+revocation_list = RevocationList(retention_seconds=ACCESS_TOKEN_EXPIRE_MINUTES * 60 + 60)
 
 # 비밀번호 암호화 도구
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt 전용 스레드 (한 번에 100ms 이상 CPU를 쓰므로 이벤트 루프에서 돌리면 웹소켓/다른 요청이 멈춤)
+# 동시에 PASSWORD_HASH_WORKERS개까지 계산하고, 대기 중인 요청이 PASSWORD_HASH_MAX_PENDING개를 넘으면 바로 거절합니다.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_password_pending = 0
+
 # 토큰을 추출하는 도구 (Header: Authorization: Bearer {token})
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -27,19 +47,88 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
+# 1-1. 비밀번호 검증 (async 라우터용: bcrypt 전용 스레드에서 실행)
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    global _password_pending
+    if _password_pending >= PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="로그인 요청이 많습니다. 잠시 후 다시 시도해주세요.",
+            headers={"Retry-After": "1"},
+        )
+    _password_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, verify_password, plain_password, hashed_password)
+    finally:
+        _password_pending -= 1
+
 # 2. 비밀번호 암호화 (저장할 때 사용)
+# 계정 생성/수정 API는 동기 라우터(스레드풀)에서 호출되므로, 같은 bcrypt 전용 스레드에 맡겨 동시 계산 수를 제한합니다.
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return _password_executor.submit(pwd_context.hash, password).result()
+
+# 3. 출입증(Token) 발급: 로그인/재발급용 토큰 한 쌍 (권한 정보를 담은 액세스 토큰 + 리프레시 토큰)
+def create_user_tokens(user) -> dict:
+    now = time.time()
+    role = user.role.value if isinstance(user.role, models.UserRole) else user.role
+    access_token = jwt.encode({
+        "sub": user.email,
+        "typ": ACCESS_TOKEN_TYPE,
+        "uid": user.id,
+        "role": role,
+        "store_id": user.store_id,
+        "brand_id": user.brand_id,
+        "group_id": user.group_id,
+        "active": bool(user.is_active),
+        "iat": now, # 무효화 목록과 비교하므로 초 단위 소수까지 기록
+        "exp": int(now + ACCESS_TOKEN_EXPIRE_MINUTES * 60),
+    }, SECRET_KEY, algorithm=ALGORITHM)
+    refresh_token = jwt.encode({
+        "sub": user.email,
+        "typ": REFRESH_TOKEN_TYPE,
+        "uid": user.id,
+        "pwv": password_version(user.hashed_password), # 비밀번호를 바꾸면 기존 리프레시 토큰은 재발급 불가
+        "jti": uuid.uuid4().hex,
+        "iat": now,
+        "exp": int(now + REFRESH_TOKEN_EXPIRE_DAYS * 86400),
+    }, SECRET_KEY, algorithm=ALGORITHM)
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+def password_version(hashed_password: Optional[str]) -> str:
+    return hashlib.sha256((hashed_password or "").encode()).hexdigest()[:12]
+
+def decode_refresh_token(token: str) -> Optional[dict]:
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    return payload if payload.get("typ") == REFRESH_TOKEN_TYPE else None
+
+def revoke_user_tokens(user_id: int):
+    # 계정 수정/삭제/매장 연결 변경을 커밋한 뒤 호출 → 그 전에 발급된 액세스 토큰은 거부 (리프레시로 새 권한을 받아야 함)
+    revocation_list.revoke(user_id)
 
-# 3. 출입증(Token) 발급
-def create_access_token(data: dict):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+# 3-1. 해독된 토큰 → Principal (토큰에 권한 정보가 있으면 DB 조회 없음)
+def principal_from_payload(payload: dict, db: Session) -> Optional[Principal]:
+    token_type = payload.get("typ")
+    if token_type == ACCESS_TOKEN_TYPE and payload.get("uid") is not None and payload.get("role"):
+        if revocation_list.is_revoked(payload["uid"], payload.get("iat")):
+            return None
+        return Principal.from_claims(payload)
+    if token_type is not None:
+        return None # 리프레시 토큰 등은 API 인증에 사용할 수 없음
+    # 이전 방식 토큰(sub만 있음): 캐시된 사용자 정보로 확인
+    email = payload.get("sub")
+    return get_principal(db, email) if email else None
 
 # 4. 출입증 검사 (현재 로그인한 사장님이 누구인지 확인)
+# ✨ 토큰에 서명된 권한 정보로 Principal을 만들어 돌려줍니다. (이전 방식 토큰은 캐시된 사용자 정보 사용)
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -48,13 +137,10 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     )
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    user = crud.get_user_by_email(db, email=email)
+    user = principal_from_payload(payload, db)
     if user is None:
         raise credentials_exception
     return user
\ No newline at end of file
@@ -0,0 +1,123 @@
+# check_daily_number.py
+# 주문번호(daily_number) 발급 방식을 비교합니다.
+# - 기존: 영업일 범위의 주문을 daily_number 역순으로 조회해 마지막 번호 + 1 (동시 주문이면 같은 번호)
+# - 카운터: daily_order_counters UPSERT ... RETURNING (행 잠금 안에서 증가)
+# 기존 방식은 조회만, 카운터는 과거 날짜(SENTINEL_DATE) 행을 쓰고 끝나면 지웁니다. (실제 주문번호에 영향 없음)
+# 사용법: python check_daily_number.py [매장 ID] [동시 요청 수]
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+load_dotenv()
+
+import crud
+import models
+from database import SessionLocal, engine
+from store_schedule import get_store_schedule
+
+STORE_ID = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+CONCURRENCY = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+ITERATIONS = 200
+SENTINEL_DATE = date(2000, 1, 1)
+
+query_count = [0]
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_queries(*args):
+    query_count[0] += 1
+
+def legacy_next_number(db, start_dt, end_dt):
+    last_order = db.query(models.Order).filter(
+        models.Order.store_id == STORE_ID,
+        models.Order.created_at >= start_dt,
+        models.Order.created_at < end_dt
+    ).order_by(models.Order.daily_number.desc()).first()
+    return (last_order.daily_number + 1) if last_order else 1
+
+def counter_next_number(db, business_date):
+    return crud.next_daily_number(db, STORE_ID, business_date)
+
+def business_window():
+    db = SessionLocal()
+    try:
+        now = datetime.now().astimezone()
+        business_date = get_store_schedule(db, STORE_ID).business_date(now)
+    finally:
+        db.close()
+    # 영업일 범위는 오픈 시간과 무관하게 넉넉히 잡습니다. (조회 비용 비교용)
+    start_dt = datetime.combine(business_date, datetime.min.time()).astimezone()
+    return start_dt, start_dt + timedelta(days=2)
+
+def measure_sequential(start_dt, end_dt):
+    db = SessionLocal()
+    try:
+        query_count[0] = 0
+        started = time.perf_counter()
+        for _ in range(ITERATIONS):
+            legacy_next_number(db, start_dt, end_dt)
+            db.rollback()
+        legacy = ((time.perf_counter() - started) / ITERATIONS * 1e6, query_count[0] / ITERATIONS)
+
+        query_count[0] = 0
+        started = time.perf_counter()
+        for _ in range(ITERATIONS):
+            counter_next_number(db, SENTINEL_DATE)
+            db.commit()
+        counter = ((time.perf_counter() - started) / ITERATIONS * 1e6, query_count[0] / ITERATIONS)
+        return legacy, counter
+    finally:
+        cleanup(db)
+        db.close()
+
+def measure_concurrent(allocate):
+    # CONCURRENCY개의 요청이 동시에 번호를 받아 갈 때 중복 번호가 몇 개 나오는지
+    numbers, barrier = [], threading.Barrier(CONCURRENCY)
+    lock = threading.Lock()
+
+    def worker():
+        db = SessionLocal()
+        try:
+            barrier.wait()
+            number = allocate(db)
+            db.commit()
+            with lock:
+                numbers.append(number)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(CONCURRENCY)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return len(numbers) - len(set(numbers))
+
+def cleanup(db):
+    db.query(models.DailyOrderCounter).filter(
+        models.DailyOrderCounter.store_id == STORE_ID,
+        models.DailyOrderCounter.business_date == SENTINEL_DATE
+    ).delete(synchronize_session=False)
+    db.commit()
+
+def main():
+    start_dt, end_dt = business_window()
+    print(f"--- 🔢 매장 {STORE_ID} 주문번호 발급 비교 ({ITERATIONS}회, 동시 {CONCURRENCY}건) ---")
+
+    (legacy_us, legacy_q), (counter_us, counter_q) = measure_sequential(start_dt, end_dt)
+    print(f"   기존 (마지막 번호 조회) : {legacy_us:8.1f} µs/주문, 쿼리 {legacy_q:.1f}개/주문")
+    print(f"   카운터 (UPSERT+커밋)    : {counter_us:8.1f} µs/주문, 쿼리 {counter_q:.1f}개/주문")
+
+    legacy_dupes = measure_concurrent(lambda db: legacy_next_number(db, start_dt, end_dt))
+    db = SessionLocal()
+    try:
+        counter_dupes = measure_concurrent(lambda db: counter_next_number(db, SENTINEL_DATE))
+    finally:
+        cleanup(db)
+        db.close()
+    print(f"   동시 {CONCURRENCY}건 중복 번호 → 기존: {legacy_dupes}개, 카운터: {counter_dupes}개")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# check_feed_queries.py
+# 주방 현황판(GET /stores/{id}/orders, ?since= 델타 포함)과 주문 내역(GET /stores/{id}/orders/history)의
+# 쿼리 수가 열린 주문 수와 무관하게 고정인지 확인합니다.
+# - 임시 매장/테이블/주문을 한 트랜잭션 안에서 만들고 조회한 뒤 롤백하므로 DB에는 아무것도 남지 않습니다.
+# - 주문 수에 따라 쿼리 수가 늘어나면 (N+1 회귀) 종료 코드 1로 실패합니다.
+# 사용법: python check_feed_queries.py
+import sys
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+load_dotenv()
+
+import crud
+import models
+from database import SessionLocal, engine
+from principals import Principal
+from routers.orders import read_store_orders, read_store_order_history, HISTORY_MAX_PAGE_SIZE
+
+ORDER_COUNTS = (1, 10, 80)
+ITEMS_PER_ORDER = 3
+
+query_count = [0]
+
+# 앱이 실행한 SQL 문 단위로 셉니다. (SQLite가 일괄 INSERT를 행별 커서 실행으로 쪼개도 1개)
+@event.listens_for(engine, "before_execute")
+def _count_queries(*args):
+    query_count[0] += 1
+
+# 권한 검사에서 DB 조회가 없는 슈퍼 관리자로 호출합니다.
+SUPER_ADMIN = Principal.from_claims({"uid": 0, "sub": "check_feed_queries", "role": models.UserRole.SUPER_ADMIN.value})
+
+def seed_store(db, order_count: int) -> int:
+    store = models.Store(name="check_feed_queries")
+    db.add(store)
+    db.flush()
+    table = models.Table(store_id=store.id, name="T1", qr_token=f"check-feed-{store.id}")
+    db.add(table)
+    db.flush()
+    for number in range(1, order_count + 1):
+        order = models.Order(
+            store_id=store.id, table_id=table.id, daily_number=number, total_price=1000 * ITEMS_PER_ORDER,
+            payment_status="PAID", change_seq=crud.next_feed_version(db, store.id)
+        )
+        order.items = [
+            models.OrderItem(store_id=store.id, menu_name=f"메뉴{i}", price=1000, quantity=1)
+            for i in range(ITEMS_PER_ORDER)
+        ]
+        db.add(order)
+    db.flush()
+    db.expunge_all() # 조회가 세션에 남은 객체를 재사용하지 않고 실제로 DB를 읽도록
+    return store.id
+
+def count(call) -> int:
+    query_count[0] = 0
+    call()
+    return query_count[0]
+
+def count_endpoints(order_count: int) -> dict:
+    db = SessionLocal()
+    try:
+        store_id = seed_store(db, order_count)
+        return {
+            "현황판": count(lambda: read_store_orders(
+                store_id, since=None, if_none_match=None, db=db, current_user=SUPER_ADMIN)),
+            "현황판 델타": count(lambda: read_store_orders(
+                store_id, since=0, if_none_match=None, db=db, current_user=SUPER_ADMIN)),
+            "주문 내역": count(lambda: read_store_order_history(
+                store_id, cursor=None, limit=HISTORY_MAX_PAGE_SIZE, start_date=None, end_date=None,
+                payment_status=None, table_id=None, db=db, current_user=SUPER_ADMIN)),
+        }
+    finally:
+        db.rollback()
+        db.close()
+
+def main():
+    print(f"--- 📋 주문 목록 조회 쿼리 수 (주문당 메뉴 {ITEMS_PER_ORDER}개) ---")
+    results = {n: count_endpoints(n) for n in ORDER_COUNTS}
+    failed = False
+    for endpoint in results[ORDER_COUNTS[0]]:
+        counts = [results[n][endpoint] for n in ORDER_COUNTS]
+        print(f"   {endpoint}: " + ", ".join(f"주문 {n}개 → 쿼리 {c}개" for n, c in zip(ORDER_COUNTS, counts)))
+        failed = failed or len(set(counts)) != 1
+
+    if failed:
+        print("❌ 열린 주문 수에 따라 쿼리 수가 달라집니다. (N+1 회귀)")
+        sys.exit(1)
+    print("✅ 열린 주문 수와 무관하게 쿼리 수가 고정입니다.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# check_indexes.py
+# 주방 현황판 / 주문 내역 / 매출 통계 / 직원 호출 쿼리가 alembic 9e4a6b2d8c35의 전용 인덱스를 타는지 EXPLAIN으로 확인합니다.
+# 사용법: python check_indexes.py [store_id]
+import os
+import sys
+from datetime import date, timedelta
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+load_dotenv()
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
+
+from utils import parse_date_range
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL)
+store_id = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+
+# 매출 통계는 앱과 같이 parse_date_range로 만든 [시작일 00:00, 종료일 다음날 00:00) 범위로 조회합니다.
+today = date.today()
+stats_start, stats_end = parse_date_range((today - timedelta(days=30)).isoformat(), today.isoformat())
+
+# (이름, 앱과 같은 모양의 쿼리, 파라미터, 써야 하는 인덱스 - alembic 9e4a6b2d8c35에서 추가)
+QUERIES = (
+    ("주방 현황판 (GET /stores/{id}/orders)", """
+        SELECT * FROM orders
+        WHERE store_id = :store_id
+          AND payment_status IN ('PAID', 'DEFERRED', 'PARTIAL_CANCELLED', 'CANCELLED')
+          AND is_completed = false
+        ORDER BY id ASC
+    """, {}, "ix_orders_kitchen_feed"),
+    ("주문 내역 다음 페이지 (GET /stores/{id}/orders/history?cursor=)", """
+        SELECT * FROM orders
+        WHERE store_id = :store_id
+          AND id < :cursor
+        ORDER BY id DESC LIMIT :limit
+    """, {"cursor": 2 ** 31 - 1, "limit": 101}, "ix_orders_store_id_id"),
+    ("매출 통계 (GET /stores/{id}/stats, /hq/stats)", """
+        SELECT * FROM orders
+        WHERE store_id = :store_id
+          AND payment_status = 'PAID'
+          AND created_at >= :start_dt
+          AND created_at < :end_dt
+    """, {"start_dt": stats_start, "end_dt": stats_end}, "ix_orders_store_paid_created"),
+    ("직원 호출 (GET /stores/{id}/calls)", """
+        SELECT * FROM staff_calls
+        WHERE store_id = :store_id AND is_completed = false
+    """, {}, "ix_staff_calls_store_open"),
+)
+
+print(f"--- 🔎 인덱스 사용 진단 (store_id={store_id}) ---")
+
+with engine.connect() as conn:
+    # 테스트 DB처럼 행 수가 적으면 플래너가 Seq Scan을 고르므로, 진단 중에만 끕니다.
+    # (기존 단일 컬럼 인덱스 ix_orders_store_id로도 Index Scan이 나오므로 인덱스 이름까지 확인)
+    conn.execute(text("SET enable_seqscan = off"))
+    failed = 0
+    for name, sql, params, expected_index in QUERIES:
+        plan = "\n".join(row[0] for row in conn.execute(text(f"EXPLAIN {sql}"), {"store_id": store_id, **params}))
+        uses_index = expected_index in plan
+        failed += 0 if uses_index else 1
+        print(f"\n{'✅' if uses_index else '⚠️'} {name} → {expected_index}")
+        for line in plan.splitlines():
+            print(f"   {line}")
+
+if failed:
+    print(f"\n🚨 {failed}개 쿼리가 전용 인덱스를 타지 않습니다. 'alembic upgrade head'를 실행했는지 확인하세요.")
+    sys.exit(1)
+print("\n🎉 모든 핫패스 쿼리가 전용 인덱스를 사용합니다.")
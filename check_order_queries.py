@@ -0,0 +1,73 @@
+# check_order_queries.py
+# 주문 생성(POST /orders/)에 나가는 쿼리 수가 주문 항목 수와 무관하게 고정인지 확인합니다.
+# - 실제 매장 메뉴로 주문을 만들어 flush까지 수행한 뒤 롤백하므로 DB에는 아무것도 남지 않습니다.
+# - 항목 수에 따라 쿼리 수가 늘어나면 (N+1 회귀) 종료 코드 1로 실패합니다.
+# 사용법: python check_order_queries.py [매장 ID]
+import sys
+from datetime import datetime
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+load_dotenv()
+
+import crud
+import models
+import schemas
+from database import SessionLocal, engine
+from store_schedule import get_store_schedule
+
+STORE_ID = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+ITEM_COUNTS = (1, 5, 20)
+
+query_count = [0]
+
+# 앱이 실행한 SQL 문 단위로 셉니다. (항목 일괄 INSERT 1건을 SQLite가 행별 커서 실행으로 쪼개도 1개)
+@event.listens_for(engine, "before_execute")
+def _count_queries(*args):
+    query_count[0] += 1
+
+def count_create_order(menu_ids, table_id, item_count):
+    # routers/orders.py _create_order와 같은 순서로 조회/저장 (커밋 대신 롤백)
+    order = schemas.OrderCreate(
+        store_id=STORE_ID, table_id=table_id, is_post_pay=True,
+        items=[schemas.OrderItemCreate(menu_id=menu_ids[i % len(menu_ids)], quantity=1) for i in range(item_count)]
+    )
+    db = SessionLocal()
+    try:
+        query_count[0] = 0
+        schedule = get_store_schedule(db, STORE_ID)
+        schedule.closed_reason(datetime.now().astimezone())
+        menus = crud.get_menus_for_order(db, order)
+        table = db.query(models.Table).filter(models.Table.id == table_id).first()
+        created_order = crud.create_order(db=db, order=order, menus=menus, schedule=schedule, table=table)
+        schemas.OrderResponse.model_validate(created_order).model_dump()
+        return query_count[0]
+    finally:
+        db.rollback()
+        db.close()
+
+def main():
+    db = SessionLocal()
+    try:
+        menu_ids = [row.id for row in db.query(models.Menu.id).filter(models.Menu.store_id == STORE_ID).all()]
+        table = db.query(models.Table.id).filter(models.Table.store_id == STORE_ID).first()
+    finally:
+        db.close()
+    if not menu_ids or not table:
+        print(f"❌ 매장 {STORE_ID}에 메뉴 또는 테이블이 없습니다.")
+        sys.exit(1)
+
+    print(f"--- 🧾 매장 {STORE_ID} 주문 생성 쿼리 수 (메뉴 {len(menu_ids)}개) ---")
+    # 첫 호출은 매장 스케줄 캐시를 채우므로 측정에서 뺍니다.
+    count_create_order(menu_ids, table.id, 1)
+    counts = {n: count_create_order(menu_ids, table.id, n) for n in ITEM_COUNTS}
+    for n, count in counts.items():
+        print(f"   항목 {n:3d}개: 쿼리 {count}개")
+
+    if len(set(counts.values())) != 1:
+        print("❌ 항목 수에 따라 쿼리 수가 달라집니다. (N+1 회귀)")
+        sys.exit(1)
+    print("✅ 항목 수와 무관하게 쿼리 수가 고정입니다.")
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+# 실제 포트원 키/결제번호로 직접 조회하는 진단 스크립트입니다. (서버 없이 클라이언트 동작 확인은 check_portone_stub.py)
 import requests
 import json
 
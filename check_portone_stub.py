@@ -0,0 +1,129 @@
+# check_portone_stub.py
+# 포트원 클라이언트(portone.py)를 실제 PG 대신 아임포트 엔드포인트를 흉내 내는 스텁(httpx.MockTransport)으로 확인합니다.
+# - 동시 요청이 몰려도 /users/getToken은 1번만 호출되는지 (토큰 캐시)
+# - 401을 받으면 토큰을 재발급해서 한 번만 다시 요청하는지
+# - 응답하지 않는 서버에서 타임아웃이 httpx 예외로 바로 올라오는지 (요청이 붙잡히지 않음)
+# - /payments/{imp_uid}의 200이 아닌 응답은 None, 취소 API의 5xx는 재시도 가능 오류인지
+# 외부 네트워크/DB/API 키 없이 실행됩니다. (타임아웃 확인만 127.0.0.1에 임시 서버를 띄움) 하나라도 어긋나면 종료 코드 1로 실패합니다.
+# 사용법: python check_portone_stub.py
+import asyncio
+import sys
+import time
+import httpx
+
+from portone import PortOneClient, PortOneError
+
+CONCURRENCY = 20
+TIMEOUT_SECONDS = 0.3
+
+class PortOneStub:
+    """/users/getToken, /payments/{imp_uid}, /payments/cancel 만 흉내 내는 스텁"""
+    def __init__(self):
+        self.token_calls = 0
+        self.issued = []
+        self.revoked = set() # 이 토큰으로 오면 401 (다른 서버가 토큰을 재발급한 상황)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path == "/users/getToken":
+            self.token_calls += 1
+            await asyncio.sleep(0.05) # 발급이 느린 동안 다른 요청이 몰려도 발급은 1번이어야 함
+            token = f"T{self.token_calls}"
+            self.issued.append(token)
+            now = int(time.time())
+            return httpx.Response(200, json={"code": 0, "response": {"access_token": token, "now": now, "expired_at": now + 1800}})
+
+        if request.headers.get("Authorization") not in self.issued or request.headers.get("Authorization") in self.revoked:
+            return httpx.Response(401, json={"code": -1, "message": "Unauthorized", "response": None})
+        if path == "/payments/imp_missing":
+            return httpx.Response(404, json={"code": 1, "message": "존재하지 않는 결제정보입니다.", "response": None})
+        if path == "/payments/imp_down":
+            return httpx.Response(503, text="Service Unavailable")
+        if path.startswith("/payments/imp_"):
+            imp_uid = path.rsplit("/", 1)[1]
+            return httpx.Response(200, json={"code": 0, "response": {"imp_uid": imp_uid, "status": "paid", "amount": 1000}})
+        if path == "/payments/cancel":
+            return httpx.Response(503, text="Service Unavailable")
+        return httpx.Response(404, json={"code": 1, "response": None})
+
+def new_client(stub: PortOneStub) -> PortOneClient:
+    return PortOneClient("key", "secret", base_url="https://api.iamport.kr", transport=httpx.MockTransport(stub.handle))
+
+async def check_token_cache():
+    stub = PortOneStub()
+    client = new_client(stub)
+    try:
+        results = await asyncio.gather(*(client.get_payment(f"imp_{i}") for i in range(CONCURRENCY)))
+    finally:
+        await client.aclose()
+    ok = all(r and r["status"] == "paid" for r in results) and stub.token_calls == 1
+    return ok, f"동시 조회 {CONCURRENCY}건 → 토큰 발급 {stub.token_calls}번"
+
+async def check_refresh_on_401():
+    stub = PortOneStub()
+    client = new_client(stub)
+    try:
+        await client.get_payment("imp_1")
+        stub.revoked.add(stub.issued[-1]) # 캐시된 토큰이 서버에서 무효가 된 상황
+        result = await client.get_payment("imp_2")
+    finally:
+        await client.aclose()
+    ok = result is not None and stub.token_calls == 2
+    return ok, f"401 뒤 재발급 후 재요청 → 결과 {'있음' if result else '없음'}, 토큰 발급 {stub.token_calls}번"
+
+async def check_timeout():
+    # 연결은 받지만 응답하지 않는 로컬 서버로 실제 타임아웃 설정이 적용되는지 확인합니다.
+    async def hang(reader, writer):
+        await reader.read() # 클라이언트가 포기하고 연결을 닫을 때까지 응답하지 않음
+        writer.close()
+
+    server = await asyncio.start_server(hang, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    client = PortOneClient("key", "secret", base_url=f"http://127.0.0.1:{port}", timeout=httpx.Timeout(TIMEOUT_SECONDS))
+    started = time.perf_counter()
+    try:
+        await client.get_payment("imp_1")
+        return False, "응답 없는 서버에서 예외가 올라오지 않았습니다."
+    except httpx.TimeoutException as e:
+        elapsed = time.perf_counter() - started
+        return elapsed < TIMEOUT_SECONDS * 3, f"응답 없는 서버 → {elapsed:.2f}초 만에 {type(e).__name__}"
+    finally:
+        await client.aclose()
+        server.close()
+
+async def check_non_200():
+    stub = PortOneStub()
+    client = new_client(stub)
+    try:
+        missing = await client.get_payment("imp_missing")
+        down = await client.get_payment("imp_down")
+        try:
+            await client.cancel_payment("imp_1", 1000, "check")
+            retryable = None
+        except PortOneError as e:
+            retryable = e.retryable
+    finally:
+        await client.aclose()
+    ok = missing is None and down is None and retryable is True
+    return ok, f"조회 404 → {missing}, 조회 503 → {down}, 취소 503 → retryable={retryable}"
+
+async def main():
+    print("--- 🧪 포트원 클라이언트 스텁 확인 ---")
+    failed = 0
+    for name, check in (
+        ("토큰 캐시", check_token_cache),
+        ("401 재발급", check_refresh_on_401),
+        ("타임아웃", check_timeout),
+        ("200 아닌 응답", check_non_200),
+    ):
+        ok, detail = await check()
+        failed += 0 if ok else 1
+        print(f"   {'✅' if ok else '❌'} {name}: {detail}")
+
+    if failed:
+        print(f"🚨 {failed}개 항목이 실패했습니다.")
+        sys.exit(1)
+    print("🎉 모든 항목 통과")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+# check_store_menu.py
+# 손님 QR 접속 시 호출되는 GET /stores/{store_id} 응답 조립 비용을 비교합니다. (읽기 전용)
+# - 기존: 매장 직렬화 후 메뉴마다 연결 조회 + 연결마다 옵션 그룹 조회 (+ 옵션 지연 로딩)
+# - 조립: store_menu.build_store_response (메뉴 수와 무관한 고정 쿼리 수)
+# - 스냅샷: 한 번 직렬화해 둔 JSON 재사용 (쿼리 0개)
+# 사용법: python check_store_menu.py [매장 ID] [반복 횟수]
+import sys
+import time
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+load_dotenv()
+
+import models
+import schemas
+from database import SessionLocal, engine
+from store_menu import build_store_response, store_menu_cache
+
+STORE_ID = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+ITERATIONS = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+query_count = [0]
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_queries(*args):
+    query_count[0] += 1
+
+def legacy_read_store(db, store_id: int):
+    store = db.query(models.Store).filter(models.Store.id == store_id).first()
+    store_data = schemas.StoreResponse.model_validate(store).model_dump()
+    for category in store_data.get("categories", []):
+        for menu in category.get("menus", []):
+            links = db.query(models.MenuOptionLink).filter(models.MenuOptionLink.menu_id == menu["id"]).order_by(models.MenuOptionLink.order_index).all()
+            option_groups = []
+            for link in links:
+                og = db.query(models.OptionGroup).filter(models.OptionGroup.id == link.option_group_id).first()
+                if og:
+                    option_groups.append(schemas.OptionGroupResponse.model_validate(og).model_dump())
+            menu["option_groups"] = option_groups
+    return schemas.StoreResponse.model_validate(store_data).model_dump_json()
+
+def built_read_store(db, store_id: int):
+    return build_store_response(db, store_id).model_dump_json()
+
+def cached_read_store(db, store_id: int):
+    return store_menu_cache.get(db, store_id).body
+
+def measure(read, db):
+    query_count[0] = 0
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        db.expire_all() # 매 요청은 새 세션이라고 가정
+        read(db, STORE_ID)
+    elapsed = time.perf_counter() - started
+    return elapsed / ITERATIONS * 1000, query_count[0] / ITERATIONS
+
+def main():
+    db = SessionLocal()
+    try:
+        if not db.query(models.Store.id).filter(models.Store.id == STORE_ID).first():
+            print(f"❌ 매장 {STORE_ID}을(를) 찾을 수 없습니다.")
+            return
+        menu_count = db.query(models.Menu).filter(models.Menu.store_id == STORE_ID).count()
+        print(f"--- 📋 매장 {STORE_ID} 메뉴판 응답 조립 비용 (메뉴 {menu_count}개, {ITERATIONS}회) ---")
+
+        legacy_body = legacy_read_store(db, STORE_ID)
+        if built_read_store(db, STORE_ID) != legacy_body:
+            print("⚠️ 기존 응답과 조립 결과가 다릅니다!")
+
+        legacy_ms, legacy_q = measure(legacy_read_store, db)
+        built_ms, built_q = measure(built_read_store, db)
+        cached_ms, cached_q = measure(cached_read_store, db)
+        print(f"   기존 (메뉴/연결별 조회) : {legacy_ms:8.2f} ms/요청, 쿼리 {legacy_q:.1f}개/요청")
+        print(f"   조립 (고정 쿼리)        : {built_ms:8.2f} ms/요청, 쿼리 {built_q:.1f}개/요청")
+        print(f"   스냅샷 (직렬화 재사용)  : {cached_ms:8.2f} ms/요청, 쿼리 {cached_q:.1f}개/요청")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# check_store_schedule.py
+# 주문 시점 "지금 주문 받을 수 있나?" 판단 비용을 비교합니다. (읽기 전용)
+# - 기존: 요청마다 오늘 영업시간 조회 2번 (라우터 + crud) + break_time_list JSON 파싱
+# - 컴파일: store_schedule 캐시 (영업시간/브레이크/휴일을 미리 컴파일, DB 조회 없음)
+# 사용법: python check_store_schedule.py [매장 ID] [반복 횟수]
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+load_dotenv()
+
+import models
+from database import SessionLocal, engine
+from store_schedule import get_store_schedule, invalidate_store_schedule
+
+STORE_ID = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+ITERATIONS = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+query_count = [0]
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_queries(*args):
+    query_count[0] += 1
+
+def legacy_check(db, now):
+    # 기존 라우터: 오늘 영업시간 조회 + 브레이크 타임 JSON 파싱 (휴일 테이블은 확인하지 않음)
+    current_time_str = now.strftime("%H:%M")
+    today_hours = db.query(models.OperatingHour).filter(
+        models.OperatingHour.store_id == STORE_ID,
+        models.OperatingHour.day_of_week == now.weekday()
+    ).first()
+    closed_reason = None
+    if today_hours:
+        if today_hours.is_closed:
+            closed_reason = "오늘은 매장 휴무일입니다."
+        elif today_hours.break_time_list and today_hours.break_time_list != "[]":
+            try:
+                for bt in json.loads(today_hours.break_time_list):
+                    if bt.get("start") and bt.get("end") and bt["start"] <= current_time_str <= bt["end"]:
+                        closed_reason = "브레이크 타임"
+            except (ValueError, TypeError, AttributeError):
+                pass
+
+    # 기존 crud.create_order: 영업일 계산을 위해 같은 영업시간을 한 번 더 조회
+    op_hour = db.query(models.OperatingHour).filter(
+        models.OperatingHour.store_id == STORE_ID,
+        models.OperatingHour.day_of_week == now.weekday()
+    ).first()
+    open_time_str = op_hour.open_time if (op_hour and op_hour.open_time) else "09:00"
+    today_open_dt = datetime.strptime(f"{now.strftime('%Y-%m-%d')} {open_time_str}:00", "%Y-%m-%d %H:%M:%S")
+    business_date = (today_open_dt - timedelta(days=1)).date() if now < today_open_dt else today_open_dt.date()
+    return closed_reason, business_date
+
+def compiled_check(db, now):
+    schedule = get_store_schedule(db, STORE_ID)
+    return schedule.closed_reason(now), schedule.business_date(now)
+
+def measure(check, db):
+    query_count[0] = 0
+    now = datetime.now()
+    started = time.perf_counter()
+    for i in range(ITERATIONS):
+        check(db, now + timedelta(minutes=i))
+    elapsed = time.perf_counter() - started
+    return elapsed / ITERATIONS * 1e6, query_count[0] / ITERATIONS
+
+def main():
+    db = SessionLocal()
+    try:
+        if not db.query(models.Store.id).filter(models.Store.id == STORE_ID).first():
+            print(f"❌ 매장 {STORE_ID}을(를) 찾을 수 없습니다.")
+            return
+        print(f"--- 🕘 매장 {STORE_ID} 주문 가능 여부 판단 비용 ({ITERATIONS}회) ---")
+
+        invalidate_store_schedule(STORE_ID)
+        legacy_us, legacy_q = measure(legacy_check, db)
+        compiled_us, compiled_q = measure(compiled_check, db)
+        print(f"   기존 (조회 2번 + JSON 파싱) : {legacy_us:8.1f} µs/주문, 쿼리 {legacy_q:.2f}개/주문")
+        print(f"   컴파일 (캐시)               : {compiled_us:8.1f} µs/주문, 쿼리 {compiled_q:.2f}개/주문 (첫 컴파일 포함)")
+        print(f"   → 주문당 {legacy_us - compiled_us:.1f} µs, 쿼리 {legacy_q - compiled_q:.2f}개 절약 (DB 왕복 지연 제외)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# check_tenancy.py
+# 브랜드 관리자 요청 한 건의 매장 권한 확인 비용을 비교합니다. (읽기 전용)
+# - 기존: 요청마다 stores 테이블에서 매장 조회 후 brand_id 비교
+# - 색인: tenancy_index (메모리) 에서 brand_id 확인
+# 사용법: python check_tenancy.py [반복 횟수]
+import sys
+import time
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+load_dotenv()
+
+import models
+from database import SessionLocal, engine
+from tenancy import tenancy_index
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+query_count = [0]
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_queries(*args):
+    query_count[0] += 1
+
+def legacy_check(db, store_id: int, brand_id):
+    store = db.query(models.Store).filter(models.Store.id == store_id).first()
+    return bool(store) and store.brand_id == brand_id
+
+def indexed_check(db, store_id: int, brand_id):
+    tenancy = tenancy_index.get(db, store_id)
+    return bool(tenancy) and tenancy.brand_id == brand_id
+
+def measure(check, db, stores):
+    query_count[0] = 0
+    started = time.perf_counter()
+    for i in range(ITERATIONS):
+        store_id, brand_id = stores[i % len(stores)]
+        check(db, store_id, brand_id)
+    elapsed = time.perf_counter() - started
+    return elapsed / ITERATIONS * 1e6, query_count[0] / ITERATIONS
+
+def main():
+    db = SessionLocal()
+    try:
+        stores = db.query(models.Store.id, models.Store.brand_id).filter(models.Store.brand_id.isnot(None)).all()
+        if not stores:
+            print("❌ 브랜드에 속한 매장이 없습니다.")
+            return
+        print(f"--- 🏷️ 브랜드 관리자 매장 권한 확인 비용 (브랜드 매장 {len(stores)}개, {ITERATIONS}회) ---")
+
+        started = time.perf_counter()
+        tenancy_index.reload()
+        print(f"   색인 적재 (서버 시작 시 1회): {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        legacy_us, legacy_q = measure(legacy_check, db, stores)
+        indexed_us, indexed_q = measure(indexed_check, db, stores)
+        print(f"   기존 (stores 조회) : {legacy_us:8.1f} µs/요청, 쿼리 {legacy_q:.2f}개/요청")
+        print(f"   색인 (메모리)      : {indexed_us:8.1f} µs/요청, 쿼리 {indexed_q:.2f}개/요청")
+        print(f"   → 요청당 {legacy_us - indexed_us:.1f} µs, 쿼리 {legacy_q - indexed_q:.2f}개 절약 (DB 왕복 지연 제외)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
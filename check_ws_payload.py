@@ -0,0 +1,114 @@
+# check_ws_payload.py
+# 웹소켓 이벤트 한 건당 전송 바이트 수와 CPU 시간을 매장당 기기 1대 / 50대 기준으로 측정합니다.
+# - text: 압축 없음 (기존 방식)
+# - deflate: ?encoding=deflate 기기 (매장당 한 번만 압축해서 모든 기기가 같은 바이트를 받음)
+# - permessage-deflate: 웹소켓 확장 압축 추정치 (기기 연결마다 따로 압축)
+# 사용법: python check_ws_payload.py [이벤트 수]
+import asyncio
+import random
+import sys
+import time
+import zlib
+from datetime import datetime
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import events
+import connection_manager
+from connection_manager import ConnectionManager
+
+EVENT_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+STORE_ID = 1
+MENU_NAMES = ["불고기 덮밥", "김치찌개", "된장찌개", "제육볶음", "돈까스", "냉면", "비빔밥", "떡볶이", "순두부찌개", "치즈 김밥"]
+OPTIONS = ["", "곱빼기", "계란 추가", "맵게", "소스 많이", "밥 추가, 맵게"]
+
+# 묶음 대기 없이 이벤트 한 건씩의 비용을 재기 위해 BATCH 대기 시간을 끕니다.
+connection_manager.WS_COALESCE_SECONDS = 0
+
+class FakeSocket:
+    """실제 네트워크 대신 보낸 바이트 수만 세는 소켓"""
+    def __init__(self):
+        self.bytes_sent = 0
+        self.frames = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        self.bytes_sent += len(data.encode())
+        self.frames += 1
+
+    async def send_bytes(self, data: bytes):
+        self.bytes_sent += len(data)
+        self.frames += 1
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        pass
+
+def sample_event(order_id: int, item_count: int) -> events.NewOrderEvent:
+    rng = random.Random(order_id) # 같은 주문 번호면 측정 방식과 관계없이 같은 내용
+    return events.NewOrderEvent(
+        order_id=order_id,
+        daily_number=order_id % 500,
+        table_name=f"테이블 {rng.randint(1, 40)}",
+        created_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        items=[
+            events.OrderItemSummary(menu_name=rng.choice(MENU_NAMES), quantity=rng.randint(1, 3), options=rng.choice(OPTIONS))
+            for _ in range(item_count)
+        ],
+        is_post_pay=rng.random() < 0.3 or None
+    )
+
+async def measure(socket_count: int, item_count: int, encoding):
+    manager = ConnectionManager()
+    sockets = [FakeSocket() for _ in range(socket_count)]
+    for socket in sockets:
+        await manager.connect(socket, STORE_ID, encoding=encoding)
+    await asyncio.sleep(0.05) # HELLO 전송 끝날 때까지
+    base_bytes = sum(s.bytes_sent for s in sockets)
+
+    started = time.process_time()
+    for order_id in range(EVENT_COUNT):
+        await manager.broadcast(sample_event(order_id, item_count).encode(), store_id=STORE_ID)
+        for _ in range(3): # 기기별 전송 태스크가 대기열을 비울 때까지 양보
+            await asyncio.sleep(0)
+    cpu = time.process_time() - started
+
+    writers = [client.writer for client in manager.active_connections[STORE_ID].values()]
+    for socket in sockets:
+        manager.disconnect(socket, STORE_ID)
+    await asyncio.gather(*writers, return_exceptions=True) # 취소된 전송 태스크 정리
+    wire = (sum(s.bytes_sent for s in sockets) - base_bytes) / EVENT_COUNT / socket_count
+    return wire, cpu / EVENT_COUNT * 1e6
+
+def permessage_deflate_estimate(socket_count: int, item_count: int):
+    # 연결마다 독립된 압축 컨텍스트 (context takeover 포함, 서버 기본값과 같은 조건)
+    compressors = [zlib.compressobj(6, zlib.DEFLATED, -15) for _ in range(socket_count)]
+    total_bytes = 0
+    started = time.process_time()
+    for order_id in range(EVENT_COUNT):
+        frame = sample_event(order_id, item_count).encode().encode()
+        for compressor in compressors:
+            total_bytes += len(compressor.compress(frame) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4
+    cpu = time.process_time() - started
+    return total_bytes / EVENT_COUNT / socket_count, cpu / EVENT_COUNT * 1e6
+
+async def main():
+    print(f"--- 📡 웹소켓 이벤트 크기/CPU 진단 (이벤트 {EVENT_COUNT}건) ---")
+    for item_count in (3, 15):
+        raw = len(sample_event(1, item_count).encode().encode())
+        print(f"\n🧾 NEW_ORDER (메뉴 {item_count}개, 원본 {raw} bytes)")
+        for socket_count in (1, 50):
+            text_wire, text_cpu = await measure(socket_count, item_count, None)
+            deflate_wire, deflate_cpu = await measure(socket_count, item_count, "deflate")
+            pmd_wire, pmd_cpu = permessage_deflate_estimate(socket_count, item_count)
+            print(f"   기기 {socket_count:>2}대 | text {text_wire:7.0f} B, {text_cpu:7.1f} µs"
+                  f" | deflate {deflate_wire:7.0f} B, {deflate_cpu:7.1f} µs"
+                  f" | permessage-deflate(추정) {pmd_wire:7.0f} B, {pmd_cpu:7.1f} µs")
+    print("\n(B = 기기 1대가 이벤트 1건에 받는 바이트, µs = 이벤트 1건을 매장 전체에 보내는 데 쓴 CPU 시간)")
+    print("※ 브라우저는 permessage-deflate를 기본으로 요청하고 uvicorn도 기본으로 수락합니다. 바이트는 가장 적지만 기기마다 따로 압축하므로,")
+    print("   기기가 많은 매장에서 서버 CPU가 부족하면 --ws-per-message-deflate false + ?encoding=deflate 조합을 고려하세요.")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,31 +1,316 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+import zlib
+from collections import OrderedDict, deque
 from fastapi import WebSocket
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+from event_bus import create_event_bus
+import events
+import metrics
+
+# 기기 한 대에 메시지를 보내는 최대 시간 (초). 넘기면 끊긴 기기로 보고 연결 목록에서 제거합니다.
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "2.0"))
+# 기기별 전송 대기열 크기. 가득 차면(기기가 너무 느림) 연결을 끊고 재동기화를 요청합니다.
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "256"))
+# 이 시간(초) 안에 몰려 들어온 메시지는 BATCH 프레임 하나로 묶어서 보냅니다.
+WS_COALESCE_SECONDS = float(os.getenv("WS_COALESCE_SECONDS", "0.005"))
+WS_MAX_BATCH = 100
+# 대기열 초과로 끊을 때의 종료 코드 → 프론트는 다시 연결한 뒤 주문 목록을 새로 받아야 합니다.
+WS_RESYNC_CLOSE_CODE = 4409
+WS_RESYNC_REASON = "RESYNC_REQUIRED"
+# 매장별로 기억해 둘 최근 이벤트 수 (재연결한 기기에 놓친 이벤트를 다시 보내기 위함)
+WS_REPLAY_BUFFER_SIZE = int(os.getenv("WS_REPLAY_BUFFER_SIZE", "500"))
+# ?encoding=deflate 로 연결한 기기에는 이 크기 이상의 프레임을 zlib 압축 바이너리로 보냅니다.
+# (브라우저: new DecompressionStream("deflate")로 해제. 작은 프레임은 그대로 텍스트)
+WS_COMPRESS_MIN_BYTES = int(os.getenv("WS_COMPRESS_MIN_BYTES", "512"))
+WS_ENCODING_DEFLATE = "deflate"
+# 서버가 기기에 PING을 보내는 간격(초)과, PONG을 주던 기기가 이 시간(초) 동안 아무 메시지도 없으면 끊는 기준
+# (PONG을 한 번도 안 보낸 예전 프론트는 끊지 않고, uvicorn의 웹소켓 프로토콜 ping에만 맡깁니다)
+WS_HEARTBEAT_SECONDS = float(os.getenv("WS_HEARTBEAT_SECONDS", "20"))
+WS_IDLE_TIMEOUT_SECONDS = float(os.getenv("WS_IDLE_TIMEOUT_SECONDS", "60"))
+WS_IDLE_CLOSE_CODE = 4408
+WS_IDLE_REASON = "IDLE_TIMEOUT"
+
+class StoreEventLog:
+    """
+    매장별 이벤트 순번 + 최근 이벤트 링 버퍼.
+    순번은 이 워커 프로세스 안에서만 의미가 있으므로 epoch(프로세스 식별자)와 함께 씁니다.
+    (서버 재시작이나 다른 워커로 재연결하면 epoch가 달라져 전체 재동기화)
+    """
+    def __init__(self, size: int = WS_REPLAY_BUFFER_SIZE):
+        self.size = size
+        self.epoch = uuid.uuid4().hex[:12]
+        self._seq: Dict[int, int] = {}
+        self._events: Dict[int, deque] = {}
+
+    def current(self, store_id: int) -> int:
+        return self._seq.get(store_id, 0)
+
+    def append(self, store_id: int, message: str) -> str:
+        # 서버 이벤트(JSON 객체)에 seq를 맨 앞 키로 붙여 다시 직렬화합니다. (이미 seq가 있으면 덮어씀)
+        payload = json.loads(message)
+        seq = self._seq.get(store_id, 0) + 1
+        self._seq[store_id] = seq
+        payload.pop("seq", None)
+        stamped = json.dumps({"seq": seq, **payload}, ensure_ascii=False, separators=(",", ":"))
+        events = self._events.get(store_id)
+        if events is None:
+            events = self._events[store_id] = deque(maxlen=self.size)
+        events.append((seq, stamped))
+        return stamped
+
+    def since(self, store_id: int, last_seq: int, epoch: Optional[str]) -> Optional[List[str]]:
+        """last_seq 이후 이벤트 목록. 버퍼에서 이미 밀려났거나 epoch가 다르면 None (전체 재동기화 필요)"""
+        current = self.current(store_id)
+        if epoch != self.epoch or last_seq > current:
+            return None
+        if last_seq == current:
+            return []
+        events = self._events.get(store_id)
+        if not events or events[0][0] > last_seq + 1:
+            return None
+        return [stamped for seq, stamped in events if seq > last_seq]
+
+class ClientConnection:
+    """
+    기기(웹소켓) 하나의 전송 대기열과 전송 전담 태스크.
+    broadcast는 대기열에 넣기만 하므로 느린 기기가 다른 기기나 API 응답을 붙잡지 않습니다.
+    """
+    def __init__(self, websocket: WebSocket, store_id: int, manager: "ConnectionManager", compress: bool = False):
+        self.websocket = websocket
+        self.store_id = store_id
+        self.manager = manager
+        self.compress = compress
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=WS_QUEUE_SIZE)
+        self.writer: Optional[asyncio.Task] = None
+        self.closed = False
+        self.last_seen = time.monotonic() # 기기에서 마지막으로 메시지를 받은 시각
+        self.heartbeat = False # PING에 PONG으로 답하는 기기인지 (한 번이라도 답하면 True)
+
+    def start(self):
+        self.writer = asyncio.create_task(self._write_loop())
+
+    def is_live(self, now: float) -> bool:
+        return self.heartbeat and now - self.last_seen <= WS_IDLE_TIMEOUT_SECONDS
+
+    def close(self):
+        # cancel()만으로는 부족: 전송(wait_for)이 막 끝난 순간의 취소는 무시될 수 있어서 플래그로도 루프를 멈춥니다.
+        self.closed = True
+        if self.writer and self.writer is not asyncio.current_task():
+            self.writer.cancel()
+
+    def enqueue(self, message: str, server_event: bool = True) -> bool:
+        try:
+            self.queue.put_nowait((message, server_event))
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _write_loop(self):
+        while not self.closed:
+            messages = [await self.queue.get()]
+            # 잠깐 기다렸다가 그 사이 쌓인 메시지를 함께 보냅니다. (마감 시 완료 처리 몰림 등)
+            if WS_COALESCE_SECONDS > 0:
+                await asyncio.sleep(WS_COALESCE_SECONDS)
+            while len(messages) < WS_MAX_BATCH and not self.queue.empty():
+                messages.append(self.queue.get_nowait())
+
+            for frame in _build_frames(messages):
+                if self.closed:
+                    return
+                started = time.perf_counter()
+                try:
+                    if self.compress and len(frame) >= WS_COMPRESS_MIN_BYTES:
+                        send = self.websocket.send_bytes(self.manager.compressed(frame))
+                    else:
+                        send = self.websocket.send_text(frame)
+                    await asyncio.wait_for(send, timeout=self.manager.send_timeout)
+                    metrics.WS_SEND_SECONDS.observe(time.perf_counter() - started)
+                except Exception as e:
+                    print(f"전송 실패 (연결 해제): {e!r}")
+                    metrics.WS_SEND_ERROR.inc()
+                    self.manager.drop(self, close_code=None)
+                    return
+
+def _build_frames(messages: List[Tuple[str, bool]]) -> List[str]:
+    # 연속된 서버 이벤트(encode()로 만든 JSON 객체)만 다시 파싱하지 않고 BATCH 하나로 이어 붙입니다.
+    # 기기끼리 주고받는 텍스트는 모양과 관계없이 따로 한 프레임으로 보냅니다. (순서는 그대로)
+    frames: List[str] = []
+    batch: List[str] = []
+
+    def flush():
+        if len(batch) == 1:
+            frames.append(batch[0])
+        elif batch:
+            frames.append('{"type": "BATCH", "events": [' + ", ".join(batch) + "]}")
+        batch.clear()
+
+    for message, server_event in messages:
+        if server_event:
+            batch.append(message)
+        else:
+            flush()
+            frames.append(message)
+    flush()
+    return frames
+
+def _is_pong(data: str) -> bool:
+    # 기기 → 서버 하트비트 응답: {"type": "PONG"} (공백 유무 무관, 파싱 없이 확인)
+    return len(data) <= 64 and data.replace(" ", "").startswith('{"type":"PONG"')
 
 class ConnectionManager:
-    def __init__(self):
-        # 어떤 가게(int)에 어떤 소켓들(List)이 연결되어 있는지 관리하는 딕셔너리
-        self.active_connections: Dict[int, List[WebSocket]] = {}
+    def __init__(self, bus=None, send_timeout: float = WS_SEND_TIMEOUT_SECONDS):
+        # 어떤 가게(int)에 어떤 기기들이 연결되어 있는지 관리하는 딕셔너리 {store_id: {websocket: ClientConnection}}
+        self.active_connections: Dict[int, Dict[WebSocket, ClientConnection]] = {}
+        self.send_timeout = send_timeout
+        self._closing = set() # 정리 중인 소켓 close 작업 (GC 방지용 참조)
+        # ✨ 워커 간 이벤트 전달 (broadcast → 버스 → 각 워커의 deliver_local)
+        self.bus = bus or create_event_bus()
+        self.bus.subscribe(self.deliver_local)
+        self.event_log = StoreEventLog()
+        # 같은 매장 기기들은 보통 같은 프레임을 받으므로 압축 결과를 잠깐 재사용합니다. (프레임 → 압축 바이트)
+        self._compressed: OrderedDict = OrderedDict()
+        self._reaper: Optional[asyncio.Task] = None
+
+    async def start(self):
+        await self.bus.start()
+        self._reaper = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+        await self.bus.stop()
 
-    async def connect(self, websocket: WebSocket, store_id: int):
+    async def connect(self, websocket: WebSocket, store_id: int, last_seq: Optional[int] = None, epoch: Optional[str] = None, encoding: Optional[str] = None):
         await websocket.accept()
-        if store_id not in self.active_connections:
-            self.active_connections[store_id] = []
-        self.active_connections[store_id].append(websocket)
-        print(f"--- Store {store_id}: 새로운 기기가 연결되었습니다. ---")
+        compress = encoding == WS_ENCODING_DEFLATE
+        client = ClientConnection(websocket, store_id, self, compress=compress)
+
+        # 처음 보내는 HELLO에 현재 순번을 알려주고, 재연결이면 놓친 이벤트를 이어서 보냅니다.
+        # (연결 등록과 대기열 적재 사이에 await가 없으므로 새 이벤트와 순서가 섞이지 않음)
+        missed = self.event_log.since(store_id, last_seq, epoch) if last_seq is not None else []
+        if missed and len(missed) >= WS_QUEUE_SIZE:
+            missed = None # 대기열에 다 못 담을 만큼 밀렸으면 다시 받는 편이 빠릅니다.
+        client.enqueue(events.SessionEvent(
+            type="HELLO" if missed is not None else WS_RESYNC_REASON,
+            epoch=self.event_log.epoch,
+            seq=self.event_log.current(store_id),
+            encoding=WS_ENCODING_DEFLATE if compress else None
+        ).encode())
+        for message in missed or []:
+            client.enqueue(message)
+        self.active_connections.setdefault(store_id, {})[websocket] = client
+        metrics.WS_CONNECTIONS.labels(store_id=str(store_id)).inc()
+        client.start()
+        print(f"--- Store {store_id}: 새로운 기기가 연결되었습니다. (놓친 이벤트 {len(missed) if missed else 0}건 재전송) ---")
 
     def disconnect(self, websocket: WebSocket, store_id: int):
-        if store_id in self.active_connections:
-            if websocket in self.active_connections[store_id]:
-                self.active_connections[store_id].remove(websocket)
+        clients = self.active_connections.get(store_id)
+        if not clients:
+            return
+        client = clients.pop(websocket, None)
+        if not clients:
+            del self.active_connections[store_id]
+        if client:
+            metrics.WS_CONNECTIONS.labels(store_id=str(store_id)).dec()
+            client.close()
+
+    def received(self, websocket: WebSocket, store_id: int, data: str) -> bool:
+        """기기에서 받은 메시지 기록. PONG(하트비트 응답)이면 True → 다른 기기로 전달하지 않음"""
+        client = self.active_connections.get(store_id, {}).get(websocket)
+        if client is None:
+            return False
+        client.last_seen = time.monotonic()
+        if _is_pong(data):
+            client.heartbeat = True
+            return True
+        return False
+
+    def reap(self, now: float) -> int:
+        """
+        하트비트 한 바퀴: 전송 태스크가 죽은 연결과 응답 없는 기기를 정리하고, 나머지에는 PING을 보냅니다.
+        (전원이 꺼진 태블릿처럼 close 없이 사라진 연결이 목록에 계속 남지 않도록)
+        """
+        ping = events.HeartbeatEvent(type="PING", ts=int(time.time())).encode()
+        reaped = 0
+        for store_id, clients in list(self.active_connections.items()):
+            for client in list(clients.values()):
+                if client.writer is not None and client.writer.done():
+                    self.disconnect(client.websocket, store_id)
+                elif client.heartbeat and not client.is_live(now):
+                    metrics.WS_IDLE_TIMEOUT.inc()
+                    self.drop(client, close_code=WS_IDLE_CLOSE_CODE, reason=WS_IDLE_REASON)
+                elif client.enqueue(ping):
+                    continue
+                else:
+                    metrics.WS_QUEUE_FULL.inc()
+                    self.drop(client, close_code=WS_RESYNC_CLOSE_CODE)
+                reaped += 1
+        return reaped
+
+    def connection_counts(self, store_id: int) -> Dict[str, int]:
+        # connected: 이 워커가 들고 있는 연결 수 / live: 하트비트에 제때 답하고 있는 기기 수
+        now = time.monotonic()
+        clients = list(self.active_connections.get(store_id, {}).values())
+        return {"connected": len(clients), "live": sum(1 for client in clients if client.is_live(now))}
 
-    # 특정 가게에 연결된 모든 기기(주방태블릿, 카운터PC 등)에 메시지 전송
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(WS_HEARTBEAT_SECONDS)
+            reaped = self.reap(time.monotonic())
+            if reaped:
+                print(f"--- 응답 없는 웹소켓 연결 {reaped}개 정리 ---")
+
+    def compressed(self, frame: str) -> bytes:
+        data = self._compressed.get(frame)
+        if data is None:
+            data = zlib.compress(frame.encode(), 6)
+            self._compressed[frame] = data
+            if len(self._compressed) > 64:
+                self._compressed.popitem(last=False)
+        return data
+
+    def drop(self, client: ClientConnection, close_code: Optional[int], reason: str = WS_RESYNC_REASON):
+        # 끊긴/느린 기기를 목록에서 빼고 백그라운드에서 소켓을 닫습니다.
+        self.disconnect(client.websocket, client.store_id)
+        task = asyncio.create_task(self._close_quietly(client.websocket, close_code, reason))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    # 특정 가게에 연결된 모든 기기(주방태블릿, 카운터PC 등)에 서버 이벤트 전송 (다른 워커에 붙은 기기 포함)
     async def broadcast(self, message: str, store_id: int):
-        if store_id in self.active_connections:
-            for connection in self.active_connections[store_id]:
-                try:
-                    await connection.send_text(message)
-                except Exception as e:
-                    print(f"전송 실패: {e}")
+        await self.bus.publish(store_id, message, server_event=True)
+
+    # 기기에서 받은 텍스트를 같은 매장의 다른 기기들에 그대로 전달 (순번/재전송 대상 아님)
+    async def relay(self, message: str, store_id: int):
+        await self.bus.publish(store_id, message, server_event=False)
+
+    # 이 워커에 연결된 기기들의 대기열에 넣기 (실제 전송은 기기별 전송 태스크가 담당)
+    async def deliver_local(self, store_id: int, message: str, server_event: bool = True):
+        # 서버 이벤트에만 매장별 순번을 붙여 링 버퍼에 남깁니다. (기기끼리 주고받는 텍스트는 모양과 관계없이 제외)
+        if server_event:
+            message = self.event_log.append(store_id, message)
+        started = time.perf_counter()
+        for client in list(self.active_connections.get(store_id, {}).values()):
+            if not client.enqueue(message, server_event):
+                print(f"--- Store {store_id}: 전송 대기열 초과, 재동기화 요청 후 연결 해제 ---")
+                metrics.WS_QUEUE_FULL.inc()
+                self.drop(client, close_code=WS_RESYNC_CLOSE_CODE)
+        metrics.WS_BROADCAST_FANOUT_SECONDS.observe(time.perf_counter() - started)
+
+    async def _close_quietly(self, websocket: WebSocket, close_code: Optional[int], reason: str):
+        try:
+            if close_code is None:
+                await asyncio.wait_for(websocket.close(), timeout=self.send_timeout)
+            else:
+                await asyncio.wait_for(websocket.close(code=close_code, reason=reason), timeout=self.send_timeout)
+        except Exception:
+            pass
 
 # 전역에서 하나만 쓸 매니저 객체 생성
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager()
@@ -1,6 +1,11 @@
+import json
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from models import Order, OrderItem
 import models, schemas, auth
+from store_schedule import StoreSchedule, get_store_schedule
+from database import dialect_insert
+from principals import invalidate_principal
 from datetime import datetime, timedelta
 
 # =========================================================
@@ -33,6 +38,11 @@ def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate):
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
     if not db_user: return None
     
+    # 권한/활성 상태/비밀번호가 바뀌면 이미 발급된 액세스 토큰도 무효화
+    claims_changed = bool(user_update.password) or \
+        (user_update.is_active is not None and user_update.is_active != db_user.is_active) or \
+        (user_update.role is not None and user_update.role != db_user.role)
+
     if user_update.password: db_user.hashed_password = auth.get_password_hash(user_update.password)
     if user_update.name is not None: db_user.name = user_update.name
     if user_update.phone is not None: db_user.phone = user_update.phone
@@ -40,6 +50,9 @@ def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate):
     if user_update.role is not None: db_user.role = user_update.role
     
     db.commit()
+    invalidate_principal(db_user.email)
+    if claims_changed:
+        auth.revoke_user_tokens(db_user.id)
     db.refresh(db_user)
     return db_user
 
@@ -140,72 +153,121 @@ def create_table(db: Session, table: schemas.TableCreate, store_id: int):
     db.refresh(db_table)
     return db_table
 
-def create_order(db: Session, order: schemas.OrderCreate):
-    now = datetime.now()
-    today_str = now.strftime("%Y-%m-%d")
-    weekday = now.weekday()
+def get_menus_for_order(db: Session, order: schemas.OrderCreate):
+    # 🔥 주문에 담긴 메뉴들을 IN 쿼리 한 번으로 가져옵니다. (해당 매장 메뉴만)
+    menu_ids = {item.menu_id for item in order.items}
+    if not menu_ids:
+        return {}
+    menus = db.query(models.Menu).filter(
+        models.Menu.id.in_(menu_ids),
+        models.Menu.store_id == order.store_id
+    ).all()
+    return {menu.id: menu for menu in menus}
 
-    op_hour = db.query(models.OperatingHour).filter(
-        models.OperatingHour.store_id == order.store_id,
-        models.OperatingHour.day_of_week == weekday
-    ).first()
+def _price_order_item(menu: models.Menu, item: schemas.OrderItemCreate):
+    # 메뉴 가격 + 선택한 옵션 가격 (옵션 가격은 기존과 동일하게 요청값 사용)
+    item_price = menu.price
+    for opt in item.options:
+        item_price += opt.price
+    return item_price
 
-    open_time_str = op_hour.open_time if (op_hour and op_hour.open_time) else "09:00"
-    today_open_dt = datetime.strptime(f"{today_str} {open_time_str}:00", "%Y-%m-%d %H:%M:%S")
+def next_daily_number(db: Session, store_id: int, business_date):
+    """
+    매장별 영업일 카운터를 UPSERT 한 번으로 증가시키고 새 번호를 돌려받습니다.
+    행 잠금 안에서 증가하므로 여러 워커가 동시에 주문해도 번호가 겹치지 않습니다.
+    """
+    insert = dialect_insert(db)
+    counter = models.DailyOrderCounter.__table__
+    stmt = insert(counter).values(store_id=store_id, business_date=business_date, last_number=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[counter.c.store_id, counter.c.business_date],
+        set_={"last_number": counter.c.last_number + 1}
+    ).returning(counter.c.last_number)
+    return db.execute(stmt).scalar_one()
 
-    if now < today_open_dt:
-        end_dt = today_open_dt
-        start_dt = end_dt - timedelta(days=1)
-    else:
-        start_dt = today_open_dt
-        end_dt = start_dt + timedelta(days=1)
+def next_feed_version(db: Session, store_id: int):
+    """
+    매장 주문 피드 버전을 1 올리고 새 값을 돌려받습니다. 주문을 바꾸는 모든 곳에서
+    order.change_seq에 이 값을 기록해야 주방 델타 동기화(?since=)에 잡힙니다.
+    버전 행 잠금이 커밋까지 유지되므로 같은 매장 안에서는 커밋 순서 = 버전 순서가 보장됩니다.
+    """
+    insert = dialect_insert(db)
+    versions = models.StoreFeedVersion.__table__
+    stmt = insert(versions).values(store_id=store_id, version=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[versions.c.store_id],
+        set_={"version": versions.c.version + 1}
+    ).returning(versions.c.version)
+    return db.execute(stmt).scalar_one()
 
-    last_order = db.query(models.Order).filter(
-        models.Order.store_id == order.store_id,
-        models.Order.created_at >= str(start_dt),
-        models.Order.created_at < str(end_dt)
-    ).order_by(models.Order.daily_number.desc()).first()
+def get_feed_version(db: Session, store_id: int):
+    version = db.query(models.StoreFeedVersion.version).filter(models.StoreFeedVersion.store_id == store_id).scalar()
+    return version or 0
 
-    next_daily_number = (last_order.daily_number + 1) if last_order else 1
+def create_order(db: Session, order: schemas.OrderCreate, menus: dict = None, schedule: StoreSchedule = None, table: models.Table = None):
+    """
+    주문서와 상세 주문(OrderItem)을 한 번의 flush로 저장합니다.
+    커밋은 호출하는 쪽에서 정확히 한 번만 수행합니다.
+    """
+    now = datetime.now().astimezone()
 
-    db_order = models.Order(
-        store_id=order.store_id,
-        table_id=order.table_id,
-        daily_number=next_daily_number,
-        total_price=0,
-        is_completed=False,
-        created_at=now 
-    )
-    db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
+    if menus is None:
+        menus = get_menus_for_order(db, order)
+
+    if schedule is None:
+        schedule = get_store_schedule(db, order.store_id)
 
+    daily_number = next_daily_number(db, order.store_id, schedule.business_date(now))
+
+    # 가격 계산은 이미 불러온 메뉴로 메모리에서 끝냅니다.
     total_price = 0
+    db_items = []
     for item in order.items:
-        # 🔥 주문 항목 생성 시 해당 매장의 메뉴인지 다시 한번 필터링 검증
-        menu = db.query(models.Menu).filter(
-            models.Menu.id == item.menu_id,
-            models.Menu.store_id == order.store_id
-        ).first()
+        menu = menus.get(item.menu_id)
         if not menu: continue
-        
-        current_item_price = menu.price
-        for opt in item.options:
-            current_item_price += opt.price
-        
+
+        current_item_price = _price_order_item(menu, item)
         total_price += current_item_price * item.quantity
 
-        db_item = models.OrderItem(
+        db_items.append(models.OrderItem(
             store_id=order.store_id, # 🔥 [추가] 상세 주문(OrderItem)도 매장에 소속되도록 강제
-            order_id=db_order.id,
             menu_name=menu.name,
             price=current_item_price,
             quantity=item.quantity,
-            options_desc=item.options_desc 
-        )
-        db.add(db_item)
+            options_desc=item.options_desc
+        ))
 
-    db_order.total_price = total_price
-    db.commit()
-    db.refresh(db_order)
-    return db_order
\ No newline at end of file
+    db_order = models.Order(
+        store_id=order.store_id,
+        table_id=order.table_id,
+        daily_number=daily_number,
+        total_price=total_price,
+        is_completed=False,
+        # 후불 주문은 PG 결제를 거치지 않으므로 처음부터 '후불 결제 대기' 상태로 저장
+        payment_status="DEFERRED" if order.is_post_pay else "PENDING",
+        created_at=now,
+        change_seq=next_feed_version(db, order.store_id),
+        items=db_items
+    )
+    if table is not None:
+        db_order.table = table
+    db.add(db_order)
+    db.flush()
+    return db_order
+
+def get_refunding_item_ids(db: Session, order_id: int):
+    # 환불이 아직 끝나지 않은(PENDING/PROCESSING) 취소 요청에 담긴 메뉴 ID (같은 메뉴 중복 취소 방지)
+    rows = db.query(models.OrderRefund.cancelled_item_ids).filter(
+        models.OrderRefund.order_id == order_id,
+        models.OrderRefund.status.in_(["PENDING", "PROCESSING"])
+    ).all()
+    return {item_id for row in rows for item_id in json.loads(row.cancelled_item_ids or "[]")}
+
+def get_refundable_amount(db: Session, order: models.Order):
+    # PG 결제 주문은 실제 결제 금액, 후불 주문은 주문 금액에서 지금까지 취소한 금액(실패 건 제외)을 뺀 값
+    base = order.paid_amount if order.imp_uid else order.total_price
+    cancelled = db.query(func.coalesce(func.sum(models.OrderRefund.amount), 0)).filter(
+        models.OrderRefund.order_id == order.id,
+        models.OrderRefund.status != "FAILED"
+    ).scalar()
+    return (base or 0) - cancelled
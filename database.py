@@ -4,6 +4,7 @@ import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
+from metrics import TimedQueuePool
 
 # 1. .env 파일 로드 (환경변수 읽기)
 load_dotenv()
@@ -18,8 +19,10 @@ if not SQLALCHEMY_DATABASE_URL:
 # SQLite와 달리 check_same_thread 옵션은 필요 없습니다.
 # pool_size: 동시에 처리할 수 있는 연결 수 (상용 트래픽 대비)
 # max_overflow: 풀이 꽉 찼을 때 추가로 허용할 연결 수
+# poolclass: 풀 대기 시간을 Prometheus 지표로 남기는 QueuePool (metrics.py)
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
+    poolclass=TimedQueuePool,
     pool_size=20,
     max_overflow=10
 )
@@ -28,6 +31,14 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+def dialect_insert(db):
+    # ON CONFLICT(UPSERT) 구문을 쓰기 위해 연결된 DB 종류에 맞는 insert를 반환 (운영: PostgreSQL)
+    if db.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert
+
 def get_db():
     db = SessionLocal()
     try:
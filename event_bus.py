@@ -0,0 +1,137 @@
+import asyncio
+import base64
+import json
+import os
+import uuid
+import zlib
+from typing import Awaitable, Callable, Optional
+
+# 웹소켓 이벤트를 워커(프로세스/컨테이너) 사이에 전달하는 방식
+# memory: 단일 워커 (기본) / postgres: PostgreSQL LISTEN/NOTIFY로 모든 워커에 전달
+EVENT_BUS_BACKEND = os.getenv("EVENT_BUS_BACKEND", "memory")
+EVENT_BUS_CHANNEL = os.getenv("EVENT_BUS_CHANNEL", "toryorder_events")
+# NOTIFY 페이로드 최대 크기는 8000바이트 → 넘으면 압축해서 보냅니다.
+NOTIFY_PAYLOAD_LIMIT = 7900
+LISTEN_RECONNECT_SECONDS = 3
+
+# (store_id, message, server_event) → 이 워커에 연결된 기기들에 전송하는 함수
+# server_event: 서버가 만든 이벤트(JSON 객체)면 True, 기기끼리 주고받는 텍스트를 그대로 전달하면 False
+Handler = Callable[[int, str, bool], Awaitable[None]]
+
+class InProcessEventBus:
+    """같은 프로세스 안에서 바로 전달 (워커 1개, 로컬 개발/테스트용)"""
+    def __init__(self):
+        self._handler: Optional[Handler] = None
+
+    def subscribe(self, handler: Handler):
+        self._handler = handler
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, store_id: int, message: str, server_event: bool = True):
+        if self._handler is not None:
+            await self._handler(store_id, message, server_event)
+
+class PostgresEventBus:
+    """
+    PostgreSQL LISTEN/NOTIFY 기반 이벤트 버스.
+    - 발행한 워커는 자기 기기들에 바로 보내고, NOTIFY로 다른 워커들에 알립니다.
+    - 각 워커는 전용 연결 하나로 LISTEN 하다가 받은 이벤트를 자기 기기들에만 보냅니다. (자기가 보낸 건 건너뜀)
+    - LISTEN 연결이 끊기면 자동으로 다시 연결합니다. (그동안 다른 워커 이벤트는 유실 → 주방은 델타 동기화로 복구)
+    """
+    def __init__(self, dsn: str, channel: str = EVENT_BUS_CHANNEL):
+        self.dsn = dsn
+        self.channel = channel
+        self.origin = uuid.uuid4().hex[:12] # 이 워커 식별자
+        self._handler: Optional[Handler] = None
+        self._pool = None
+        self._listen_conn = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def subscribe(self, handler: Handler):
+        self._handler = handler
+
+    async def start(self):
+        import asyncpg
+        self._stopping = False
+        self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=4)
+        await self._listen()
+
+    async def stop(self):
+        self._stopping = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            await asyncio.gather(self._reconnect_task, return_exceptions=True)
+        if self._listen_conn is not None and not self._listen_conn.is_closed():
+            await self._listen_conn.close()
+        if self._pool is not None:
+            await self._pool.close()
+        self._listen_conn = self._pool = None
+
+    async def publish(self, store_id: int, message: str, server_event: bool = True):
+        if self._handler is not None:
+            await self._handler(store_id, message, server_event)
+        if self._pool is None:
+            return # 아직 시작 전이면 이 워커 기기에만 전달
+
+        try:
+            await self._pool.execute("SELECT pg_notify($1, $2)", self.channel, self._encode(store_id, message, server_event))
+        except Exception as e:
+            print(f"이벤트 버스 발행 실패 (다른 워커에는 전달되지 않음): {e!r}")
+
+    def _encode(self, store_id: int, message: str, server_event: bool) -> str:
+        payload = json.dumps({"o": self.origin, "s": store_id, "m": message, "e": 1 if server_event else 0}, ensure_ascii=False)
+        if len(payload.encode()) > NOTIFY_PAYLOAD_LIMIT:
+            payload = "z:" + base64.b64encode(zlib.compress(payload.encode())).decode()
+        return payload
+
+    @staticmethod
+    def _decode(payload: str) -> dict:
+        if payload.startswith("z:"):
+            payload = zlib.decompress(base64.b64decode(payload[2:])).decode()
+        return json.loads(payload)
+
+    async def _listen(self):
+        import asyncpg
+        self._listen_conn = await asyncpg.connect(self.dsn)
+        self._listen_conn.add_termination_listener(self._on_terminated)
+        await self._listen_conn.add_listener(self.channel, self._on_notify)
+
+    async def _on_notify(self, connection, pid, channel, payload):
+        try:
+            event = self._decode(payload)
+        except Exception:
+            return
+        if event.get("o") == self.origin or self._handler is None:
+            return
+        # "e"가 없는 페이로드(배포 중 이전 버전 워커)는 기기 텍스트로 보고 순번을 붙이지 않습니다.
+        await self._handler(int(event["s"]), event["m"], bool(event.get("e", 0)))
+
+    def _on_terminated(self, connection):
+        if not self._stopping and (self._reconnect_task is None or self._reconnect_task.done()):
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        while not self._stopping:
+            await asyncio.sleep(LISTEN_RECONNECT_SECONDS)
+            try:
+                await self._listen()
+                print("이벤트 버스 LISTEN 연결 복구")
+                return
+            except Exception as e:
+                print(f"이벤트 버스 LISTEN 재연결 실패: {e!r}")
+
+def _asyncpg_dsn(database_url: str) -> str:
+    # SQLAlchemy 주소(postgresql+psycopg2://...)를 asyncpg가 읽는 주소(postgresql://...)로 변환
+    from sqlalchemy.engine import make_url
+    return make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+def create_event_bus():
+    if EVENT_BUS_BACKEND == "postgres":
+        return PostgresEventBus(_asyncpg_dsn(os.getenv("EVENT_BUS_DATABASE_URL") or os.getenv("DATABASE_URL")))
+    return InProcessEventBus()
@@ -0,0 +1,98 @@
+import json
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+
+import models
+
+# =========================================================
+# 📡 주방/카운터 화면으로 보내는 웹소켓 이벤트 정의
+# 이벤트 모양은 여기서만 정하고, 보내는 쪽은 encode()로 한 번만 직렬화한 문자열을 broadcast 합니다.
+# (연결된 기기 수와 관계없이 매장당 직렬화 1번)
+# =========================================================
+
+class WsEvent(BaseModel):
+    type: str
+
+    def encode(self) -> str:
+        # 값이 없는 필드는 빼고, 공백 없는 JSON으로 직렬화 (한글은 이스케이프하지 않음)
+        return self.model_dump_json(exclude_none=True)
+
+class OrderItemSummary(BaseModel):
+    menu_name: str
+    quantity: int
+    options: str = ""
+
+class NewOrderEvent(WsEvent):
+    type: Literal["NEW_ORDER"] = "NEW_ORDER"
+    order_id: int
+    daily_number: int
+    table_name: str
+    created_at: str
+    items: List[OrderItemSummary]
+    is_post_pay: Optional[bool] = None # 후불 주문이면 True (프론트에 후불임을 알려줌)
+
+    @classmethod
+    def from_order(cls, order: models.Order, is_post_pay: Optional[bool] = None):
+        return cls(
+            order_id=order.id,
+            daily_number=order.daily_number,
+            table_name=order.table.name if order.table else "Unknown",
+            created_at=order.created_at.astimezone().strftime("%Y-%m-%d %H:%M:%S"),
+            items=[
+                OrderItemSummary(menu_name=item.menu_name, quantity=item.quantity, options=item.options_desc or "")
+                for item in order.items
+            ],
+            is_post_pay=is_post_pay
+        )
+
+class OrderCompletedEvent(WsEvent):
+    type: Literal["ORDER_COMPLETED"] = "ORDER_COMPLETED"
+    order_id: int
+
+class OrdersStatusChangedEvent(WsEvent):
+    type: Literal["ORDERS_STATUS_CHANGED"] = "ORDERS_STATUS_CHANGED"
+    status: str
+    order_ids: List[int]
+
+class OrderCancelledEvent(WsEvent):
+    type: Literal["ORDER_CANCELLED"] = "ORDER_CANCELLED"
+    order_id: int
+    payment_status: str
+    amount: int
+    cancelled_item_ids: List[int] = []
+
+    @classmethod
+    def from_refund(cls, order: models.Order, refund: models.OrderRefund):
+        return cls(
+            order_id=order.id,
+            payment_status=order.payment_status,
+            amount=refund.amount,
+            cancelled_item_ids=json.loads(refund.cancelled_item_ids or "[]")
+        )
+
+class OrderDueEvent(WsEvent):
+    type: Literal["ORDER_NEAR_DUE", "ORDER_OVERDUE"]
+    order_id: int
+    due_at: str
+
+class NewCallEvent(WsEvent):
+    type: Literal["NEW_CALL"] = "NEW_CALL"
+    call_id: int
+    table_id: Optional[int] = None
+    message: str
+
+class CallCompletedEvent(WsEvent):
+    type: Literal["CALL_COMPLETED"] = "CALL_COMPLETED"
+    call_id: int
+
+class HeartbeatEvent(WsEvent):
+    # 서버 → 기기 PING. 기기는 {"type": "PONG"} 으로 답합니다. (seq 없음, 재전송 대상 아님)
+    type: Literal["PING"] = "PING"
+    ts: int
+
+class SessionEvent(WsEvent):
+    # 연결 직후 첫 메시지: HELLO(정상) 또는 RESYNC_REQUIRED(놓친 이벤트를 재전송할 수 없음)
+    type: Literal["HELLO", "RESYNC_REQUIRED"]
+    epoch: str
+    seq: int
+    encoding: Optional[str] = None
@@ -0,0 +1,204 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+import models
+from database import SessionLocal, dialect_insert
+
+# 첫 응답을 보관하는 시간 (초) - 식당 와이파이 재시도/더블탭을 충분히 덮는 정도
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# 처리 중 표시가 남아 있을 수 있는 최대 시간 (워커가 죽어도 키가 영원히 잠기지 않도록)
+IDEMPOTENCY_PENDING_TTL_SECONDS = 60
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "50000"))
+# memory: 워커 프로세스 메모리 (기본) / database: idempotency_keys 테이블 (여러 워커가 공유)
+IDEMPOTENCY_BACKEND = os.getenv("IDEMPOTENCY_BACKEND", "memory")
+# 만료된 기록을 지우는 주기 (초)와 한 번에 지우는 행 수 (긴 잠금/큰 트랜잭션 방지)
+IDEMPOTENCY_PURGE_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_SECONDS", "300"))
+IDEMPOTENCY_PURGE_BATCH = 1000
+
+# 저장소가 돌려주는 기존 기록: (요청 해시, 응답 본문 JSON 문자열 또는 처리 중이면 None)
+Record = Tuple[str, Optional[str]]
+
+class MemoryIdempotencyStore:
+    """오래된 키부터 밀어내는 크기 제한 LRU 저장소 (워커 프로세스 단위)"""
+    def __init__(self, max_entries: int = IDEMPOTENCY_MAX_ENTRIES, ttl: int = IDEMPOTENCY_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict() # key -> (request_hash, body, expires_at)
+        self._lock = threading.Lock()
+
+    def reserve(self, key: str, request_hash: str) -> Optional[Record]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[2] > now:
+                self._entries.move_to_end(key)
+                return entry[0], entry[1]
+
+            self._entries[key] = (request_hash, None, now + IDEMPOTENCY_PENDING_TTL_SECONDS)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return None
+
+    def save(self, key: str, request_hash: str, body: str):
+        with self._lock:
+            self._entries[key] = (request_hash, body, time.monotonic() + self.ttl)
+
+    def release(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def purge(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if entry[2] <= now]
+            for key in expired:
+                del self._entries[key]
+        return len(expired)
+
+class DatabaseIdempotencyStore:
+    """idempotency_keys 테이블을 사용하는 저장소 (uvicorn 워커/컨테이너가 여러 개일 때)"""
+    def __init__(self, ttl: int = IDEMPOTENCY_TTL_SECONDS):
+        self.ttl = ttl
+
+    def reserve(self, key: str, request_hash: str) -> Optional[Record]:
+        now = datetime.now().astimezone()
+        db = SessionLocal()
+        try:
+            # 만료된 기록은 지우고 새로 예약
+            db.query(models.IdempotencyKey).filter(
+                models.IdempotencyKey.key == key,
+                models.IdempotencyKey.expires_at <= now
+            ).delete(synchronize_session=False)
+
+            table = models.IdempotencyKey.__table__
+            stmt = dialect_insert(db)(table).values(
+                key=key, request_hash=request_hash, response_body=None,
+                expires_at=now + timedelta(seconds=IDEMPOTENCY_PENDING_TTL_SECONDS)
+            ).on_conflict_do_nothing(index_elements=[table.c.key])
+            inserted = db.execute(stmt).rowcount
+            db.commit()
+            if inserted == 1:
+                return None
+
+            row = db.query(models.IdempotencyKey).filter(models.IdempotencyKey.key == key).first()
+            return (row.request_hash, row.response_body) if row else None
+        finally:
+            db.close()
+
+    def save(self, key: str, request_hash: str, body: str):
+        db = SessionLocal()
+        try:
+            db.query(models.IdempotencyKey).filter(models.IdempotencyKey.key == key).update({
+                "request_hash": request_hash,
+                "response_body": body,
+                "expires_at": datetime.now().astimezone() + timedelta(seconds=self.ttl)
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def release(self, key: str):
+        db = SessionLocal()
+        try:
+            db.query(models.IdempotencyKey).filter(models.IdempotencyKey.key == key).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def purge(self, batch_size: int = IDEMPOTENCY_PURGE_BATCH) -> int:
+        # 다시 쓰이지 않는 키는 reserve에서 지워지지 않으므로, expires_at 인덱스로 만료분을 나눠서 지웁니다.
+        now = datetime.now().astimezone()
+        purged = 0
+        db = SessionLocal()
+        try:
+            while True:
+                expired = db.query(models.IdempotencyKey.key).filter(
+                    models.IdempotencyKey.expires_at <= now
+                ).order_by(models.IdempotencyKey.expires_at).limit(batch_size).scalar_subquery()
+                deleted = db.query(models.IdempotencyKey).filter(
+                    models.IdempotencyKey.key.in_(expired),
+                    models.IdempotencyKey.expires_at <= now
+                ).delete(synchronize_session=False)
+                db.commit()
+                purged += deleted
+                if deleted < batch_size:
+                    return purged
+        finally:
+            db.close()
+
+store = DatabaseIdempotencyStore() if IDEMPOTENCY_BACKEND == "database" else MemoryIdempotencyStore()
+
+class ExpiredKeyPurger:
+    """만료된 Idempotency-Key 기록을 주기적으로 지웁니다. (idempotency_keys 테이블이 계속 커지지 않도록)"""
+    def __init__(self, interval: float = IDEMPOTENCY_PURGE_SECONDS):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._purge_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _purge_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                purged = await run_in_threadpool(store.purge)
+                if purged:
+                    print(f"--- 만료된 Idempotency-Key {purged}건 정리 ---")
+            except Exception as e:
+                print(f"Idempotency-Key 정리 실패: {e!r}")
+
+purger = ExpiredKeyPurger()
+
+def _request_hash(payload) -> str:
+    return hashlib.sha256(json.dumps(jsonable_encoder(payload), sort_keys=True).encode()).hexdigest()
+
+def begin(scope: str, idempotency_key: Optional[str], payload) -> Optional[JSONResponse]:
+    """
+    Idempotency-Key 처리 시작.
+    - 처음 보는 키: None 반환 → 엔드포인트가 실제 처리 후 complete()/abort() 호출
+    - 이미 완료된 키: 저장된 첫 응답을 그대로 돌려줌 (DB/PG 재호출 없음)
+    """
+    if not idempotency_key:
+        return None
+
+    key = f"{scope}:{idempotency_key}"
+    request_hash = _request_hash(payload)
+    record = store.reserve(key, request_hash)
+    if record is None:
+        return None
+
+    saved_hash, body = record
+    if saved_hash != request_hash:
+        raise HTTPException(status_code=422, detail="이미 다른 요청에 사용된 Idempotency-Key 입니다.")
+    if body is None:
+        raise HTTPException(status_code=409, detail="같은 요청을 처리하고 있습니다. 잠시 후 다시 시도해주세요.")
+    return JSONResponse(content=json.loads(body), headers={"Idempotent-Replayed": "true"})
+
+def complete(scope: str, idempotency_key: Optional[str], payload, response):
+    if idempotency_key:
+        body = json.dumps(jsonable_encoder(response), ensure_ascii=False)
+        store.save(f"{scope}:{idempotency_key}", _request_hash(payload), body)
+    return response
+
+def abort(scope: str, idempotency_key: Optional[str]):
+    # 실패한 요청은 기록하지 않아야 재시도 시 다시 처리됩니다.
+    if idempotency_key:
+        store.release(f"{scope}:{idempotency_key}")
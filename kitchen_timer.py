@@ -0,0 +1,217 @@
+import asyncio
+import heapq
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+
+import models
+import events
+from database import SessionLocal
+from connection_manager import manager
+from store_schedule import get_store_schedule
+
+# 목표 조리시간 마감 몇 초 전에 "곧 지연" 알림을 보낼지
+SLA_NEAR_DUE_SECONDS = int(os.getenv("SLA_NEAR_DUE_SECONDS", "120"))
+# 주방 현황판에 떠 있는 주문의 결제 상태 (취소된 주문도 화면에는 표시)
+KITCHEN_PAYMENT_STATUSES = ["PAID", "DEFERRED", "PARTIAL_CANCELLED", "CANCELLED"]
+# 조리 마감 타이머 대상 결제 상태 (취소된 주문은 조리하지 않으므로 제외)
+SLA_PAYMENT_STATUSES = ["PAID", "DEFERRED", "PARTIAL_CANCELLED"]
+# 다른 워커에서 생성/마감 변경/완료된 주문을 반영하기 위해 DB의 열린 주문 목록과 맞추는 주기 (초)
+SLA_RESYNC_SECONDS = float(os.getenv("SLA_RESYNC_SECONDS", "15"))
+
+NEAR_DUE = "ORDER_NEAR_DUE"
+OVERDUE = "ORDER_OVERDUE"
+
+def order_deadline(created_at: datetime, target_time: Optional[int]) -> float:
+    # 주문 시각 + 목표 조리시간(분) → 마감 시각 (epoch 초)
+    return (created_at + timedelta(minutes=target_time or 15)).timestamp()
+
+class KitchenSLATimer:
+    """
+    모든 매장의 미완료 주문 마감 시각을 힙 하나로 관리하는 타이머.
+    - 주문 등록/마감 변경/완료 처리: O(log n) (힙 push, 지난 항목은 꺼낼 때 버리는 방식)
+    - 주문마다 폴링하지 않고, 가장 빠른 마감 시각까지 한 번만 잠들었다가 깨어납니다.
+    - 워커마다 하나씩 돌면서 DB의 오늘 열린 주문 목록과 주기적으로 맞추고, 알림은 이 워커에 연결된 기기에만 보냅니다.
+      (이벤트 버스로 다시 퍼뜨리면 워커 수만큼 같은 알림이 중복 전송됨)
+    """
+    def __init__(self, near_due_seconds: int = SLA_NEAR_DUE_SECONDS):
+        self.near_due_seconds = near_due_seconds
+        # (알림 시각, 세대, 주문 ID, 이벤트 종류)
+        self._heap: List[Tuple[float, int, int, str]] = []
+        # 주문 ID → (매장 ID, 마감 시각, 세대). 마감이 바뀌면 세대가 올라가 이전 힙 항목은 무효가 됩니다.
+        self._orders: Dict[int, Tuple[int, float, int]] = {}
+        self._generation = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        # 서버 재시작 전에 열려 있던 (오늘 영업일의) 주문들을 다시 등록
+        await self.resync()
+        self._tasks = [asyncio.create_task(self._run()), asyncio.create_task(self._resync_loop())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def __len__(self):
+        return len(self._orders)
+
+    def track(self, order_id: int, store_id: int, due_at: float):
+        """주문의 마감 시각을 등록하거나 새 마감으로 다시 설정합니다."""
+        self._generation += 1
+        generation = self._generation
+        self._orders[order_id] = (store_id, due_at, generation)
+
+        near_at = due_at - self.near_due_seconds
+        if near_at > time.time():
+            self._push((near_at, generation, order_id, NEAR_DUE))
+        self._push((due_at, generation, order_id, OVERDUE))
+
+    def untrack(self, order_id: int):
+        # 힙에 남은 항목은 세대가 맞지 않아 꺼낼 때 버려집니다.
+        self._orders.pop(order_id, None)
+
+    async def resync(self):
+        started_generation = self._generation
+        open_orders = await run_in_threadpool(_load_open_orders)
+        self.apply_open_orders(open_orders, started_generation, time.time())
+
+    def apply_open_orders(self, open_orders: List[Tuple[int, int, float]], started_generation: int, now: float):
+        """
+        DB에서 읽은 열린 주문 목록으로 타이머를 맞춥니다.
+        - 조회 시작 이후 이 워커에서 track된 주문은 더 최신이므로 건드리지 않습니다.
+        - 이미 마감이 지난 주문은 (재시작 전/다른 워커에서) 알렸거나 알릴 때를 놓친 것이므로 다시 울리지 않습니다.
+        """
+        listed = set()
+        for order_id, store_id, due_at in open_orders:
+            listed.add(order_id)
+            state = self._orders.get(order_id)
+            if state is not None and (state[2] > started_generation or _same_deadline(state[1], due_at)):
+                continue
+            if due_at <= now:
+                self._orders.pop(order_id, None)
+                continue
+            self.track(order_id, store_id, due_at)
+        for order_id, (_, _, generation) in list(self._orders.items()):
+            if order_id not in listed and generation <= started_generation:
+                self.untrack(order_id) # 다른 워커에서 완료/취소된 주문
+
+    def _push(self, entry):
+        wake = not self._heap or entry[0] < self._heap[0][0]
+        heapq.heappush(self._heap, entry)
+        # 무효 항목이 너무 쌓이면 한 번 정리 (마감 변경이 잦은 매장 대비)
+        if len(self._heap) > 2 * len(self._orders) + 1024:
+            self._heap = [e for e in self._heap if self._is_live(e)]
+            heapq.heapify(self._heap)
+        if wake and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _is_live(self, entry) -> bool:
+        state = self._orders.get(entry[2])
+        return state is not None and state[2] == entry[1]
+
+    def pop_due(self, now: float) -> List[Tuple[str, int, int, float]]:
+        """now까지 알림 시각이 된 (이벤트 종류, 주문 ID, 매장 ID, 마감 시각) 목록"""
+        fired = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if not self._is_live(entry):
+                continue
+            _, _, order_id, kind = entry
+            store_id, due_at, _ = self._orders[order_id]
+            if kind == OVERDUE:
+                # 지연 알림까지 보냈으면 더 할 일이 없으므로 추적 종료 (마감이 늘어나면 다시 track)
+                del self._orders[order_id]
+            fired.append((kind, order_id, store_id, due_at))
+        return fired
+
+    async def _resync_loop(self):
+        while True:
+            await asyncio.sleep(SLA_RESYNC_SECONDS)
+            try:
+                await self.resync()
+            except Exception as e:
+                print(f"주방 타이머 동기화 실패 (기존 목록 유지): {e!r}")
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            fired = self.pop_due(time.time())
+            if fired:
+                try:
+                    await self._notify(fired)
+                except Exception as e:
+                    print(f"주방 타이머 알림 실패: {e!r}")
+
+            timeout = max(self._heap[0][0] - time.time(), 0) if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _notify(self, fired: List[Tuple[str, int, int, float]]):
+        # 보내기 직전에 DB로 아직 열린 주문인지, 마감이 그대로인지 한 번에 확인합니다. (다른 워커의 완료/변경 반영)
+        deadlines = await run_in_threadpool(_load_deadlines, [order_id for _, order_id, _, _ in fired])
+        for kind, order_id, store_id, due_at in fired:
+            current = deadlines.get(order_id)
+            if current is None:
+                self.untrack(order_id)
+                continue
+            if not _same_deadline(current, due_at):
+                if current > time.time():
+                    self.track(order_id, store_id, current)
+                continue
+            message = events.OrderDueEvent(
+                type=kind,
+                order_id=order_id,
+                due_at=datetime.fromtimestamp(due_at).strftime("%Y-%m-%d %H:%M:%S")
+            ).encode()
+            await manager.deliver_local(store_id, message)
+
+def _same_deadline(a: float, b: float) -> bool:
+    return abs(a - b) < 1
+
+def _load_open_orders():
+    # 타이머 대상인 미완료 주문 중 매장의 오늘 영업일 주문만 (지난 영업일에 완료 처리를 안 한 주문 제외)
+    now = datetime.now().astimezone()
+    db = SessionLocal()
+    try:
+        rows = db.query(
+            models.Order.id, models.Order.store_id, models.Order.created_at, models.Order.target_time
+        ).filter(
+            models.Order.payment_status.in_(SLA_PAYMENT_STATUSES),
+            models.Order.is_completed == False,
+            models.Order.created_at >= now - timedelta(days=2)
+        ).all()
+        open_orders = []
+        for order_id, store_id, created_at, target_time in rows:
+            if not created_at:
+                continue
+            schedule = get_store_schedule(db, store_id)
+            if schedule.business_date(created_at) != schedule.business_date(now):
+                continue
+            open_orders.append((order_id, store_id, order_deadline(created_at, target_time)))
+        return open_orders
+    finally:
+        db.close()
+
+def _load_deadlines(order_ids: List[int]) -> Dict[int, float]:
+    # 아직 타이머 대상인 주문의 현재 마감 시각
+    db = SessionLocal()
+    try:
+        rows = db.query(models.Order.id, models.Order.created_at, models.Order.target_time).filter(
+            models.Order.id.in_(order_ids),
+            models.Order.payment_status.in_(SLA_PAYMENT_STATUSES),
+            models.Order.is_completed == False
+        ).all()
+        return {order_id: order_deadline(created_at, target_time) for order_id, created_at, target_time in rows if created_at}
+    finally:
+        db.close()
+
+# 전역에서 하나만 쓸 주방 SLA 타이머
+sla_timer = KitchenSLATimer()
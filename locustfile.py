@@ -1,3 +1,4 @@
+import os
 from locust import HttpUser, task, between
 
 class ToryOrderUser(HttpUser):
@@ -7,4 +8,69 @@ class ToryOrderUser(HttpUser):
     @task
     def view_brands(self):
         # 현재 우리가 만든 API 중 로그인 없이 누구나 조회 가능한 /brands/ 주소를 찌릅니다!
-        self.client.get("/brands/")
\ No newline at end of file
+        self.client.get("/brands/")
+
+# ✨ [신규] 점심 피크 재현: 한 매장에 주문이 동시에 몰리는 상황
+# 실행 예) LOAD_STORE_ID=1 LOAD_TABLE_ID=1 LOAD_MENU_IDS=1,2,3 locust -f locustfile.py OrderRushUser -u 200 -r 50
+# 부하 후 아래 쿼리로 같은 영업일에 중복 발급된 주문번호가 없는지 확인합니다.
+#   SELECT daily_number, COUNT(*) FROM orders WHERE store_id = 1 GROUP BY daily_number HAVING COUNT(*) > 1;
+class OrderRushUser(HttpUser):
+    wait_time = between(0, 0.5)
+
+    store_id = int(os.getenv("LOAD_STORE_ID", "1"))
+    table_id = int(os.getenv("LOAD_TABLE_ID", "1"))
+    menu_ids = [int(x) for x in os.getenv("LOAD_MENU_IDS", "1").split(",")]
+
+    @task
+    def create_order(self):
+        self.client.post("/orders/", json={
+            "store_id": self.store_id,
+            "table_id": self.table_id,
+            "items": [{"menu_id": menu_id, "quantity": 1, "options": []} for menu_id in self.menu_ids],
+            "is_post_pay": True
+        }, name="/orders/")
+
+# ✨ [신규] 출근 시간 로그인 폭주 재현: 로그인(bcrypt)이 몰리는 동안 다른 API 지연이 얼마나 늘어나는지 확인
+# 실행 예) LOAD_LOGIN_EMAIL=staff@tory.com LOAD_PROBE_EMAIL=owner@tory.com LOAD_STORE_ID=1 \
+#          locust -f locustfile.py LoginStormUser KitchenProbeUser -u 120 -r 40
+# Locust 통계에서 KitchenProbeUser의 "/brands/"와 "/stores/{id}/orders" 응답 시간(p95/p99)을 로그인 폭주 전후로 비교합니다.
+# (LoginStormUser 는 맞는/틀린 비밀번호를 섞어서 보내므로 429 응답은 로그인 제한이 정상 동작한다는 뜻입니다.
+#  bcrypt 부담 자체를 보려면 LOGIN_IP_BURST / LOGIN_ACCOUNT_BURST 를 크게 올려서 서버를 띄우세요)
+class LoginStormUser(HttpUser):
+    weight = 3
+    wait_time = between(0, 0.2)
+
+    email = os.getenv("LOAD_LOGIN_EMAIL", "staff@tory.com")
+    password = os.getenv("LOAD_LOGIN_PASSWORD", "1234")
+
+    @task(3)
+    def login(self):
+        with self.client.post("/token", data={"username": self.email, "password": self.password}, name="/token", catch_response=True) as response:
+            if response.status_code in (200, 429, 503):
+                response.success()
+
+    @task(1)
+    def wrong_password(self):
+        with self.client.post("/token", data={"username": self.email, "password": "wrong"}, name="/token (wrong)", catch_response=True) as response:
+            if response.status_code in (401, 429, 503):
+                response.success()
+
+class KitchenProbeUser(HttpUser):
+    weight = 1
+    wait_time = between(0.2, 0.5)
+
+    store_id = int(os.getenv("LOAD_STORE_ID", "1"))
+
+    def on_start(self):
+        response = self.client.post("/token", data={
+            "username": os.getenv("LOAD_PROBE_EMAIL", "owner@tory.com"),
+            "password": os.getenv("LOAD_PROBE_PASSWORD", "1234")
+        }, name="/token (probe)")
+        token = response.json().get("access_token") if response.status_code == 200 else None
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+
+    @task
+    def kitchen_feed(self):
+        self.client.get("/brands/", name="/brands/")
+        if self.headers:
+            self.client.get(f"/stores/{self.store_id}/orders", headers=self.headers, name="/stores/{id}/orders")
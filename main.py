@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from jose import jwt
 from dotenv import load_dotenv
+from contextlib import asynccontextmanager
 import os, uuid, shutil
 
 # 환경변수 로드
@@ -11,7 +12,13 @@ load_dotenv()
 # DB 및 내부 모듈
 from database import engine, SessionLocal
 from connection_manager import manager
-import models, crud
+from portone import portone_client
+from payments import payment_queue
+from kitchen_timer import sla_timer
+from refunds import refund_queue
+import idempotency
+import models, metrics
+from tenancy import tenancy_index
 import auth  # 루트 디렉토리의 auth.py (JWT 설정용)
 
 # ✨ 라우터들 임포트 (auth 라우터는 내부 모듈과 이름이 겹치지 않게 별칭 사용)
@@ -20,7 +27,32 @@ from routers import auth as auth_router, stores, menus, orders, tables, system
 # DB 테이블 자동 생성
 models.Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="ToryOrder API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 매장 소속 색인 + 워커 간 이벤트 버스 + 포트원 웹훅 결제 확인 워커 + PG 환불 워커 + 주방 SLA 타이머
+    # + 만료된 Idempotency-Key 정리 시작
+    await tenancy_index.start()
+    await auth.revocation_list.start()
+    await manager.start()
+    await payment_queue.start()
+    await refund_queue.start()
+    await sla_timer.start()
+    await idempotency.purger.start()
+    yield
+    # 서버 종료 시 워커/타이머와 포트원 커넥션 풀 정리
+    await idempotency.purger.stop()
+    await sla_timer.stop()
+    await refund_queue.stop()
+    await payment_queue.stop()
+    await manager.stop()
+    await auth.revocation_list.stop()
+    await tenancy_index.stop()
+    await portone_client.aclose()
+
+app = FastAPI(title="ToryOrder API", lifespan=lifespan)
+
+# ✨ Prometheus 지표: HTTP 요청(라우트별) + 웹소켓/주문/결제/DB 풀 지표를 /metrics 로 노출
+metrics.setup(app)
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,6 +60,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  
     allow_headers=["*"],  
+    # 프론트엔드(다른 도메인)에서 읽어야 하는 주문 피드/내역 커서 헤더
+    expose_headers=["ETag", "X-Feed-Cursor", "X-Next-Cursor"],
 )
 
 os.makedirs("uploads", exist_ok=True)
@@ -48,7 +82,7 @@ async def upload_image(request: Request, file: UploadFile = File(...)):
 # 🔥 주방 현황판 실시간 웹소켓 (복구 완료!)
 # =========================================================
 @app.websocket("/ws/{store_id}")
-async def websocket_endpoint(websocket: WebSocket, store_id: int, token: str = Query(None)):
+async def websocket_endpoint(websocket: WebSocket, store_id: int, token: str = Query(None), last_seq: int = Query(None), epoch: str = Query(None), encoding: str = Query(None)):
     if token is None:
         print("❌ [웹소켓 거절] 토큰이 없습니다.")
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
@@ -73,9 +107,15 @@ async def websocket_endpoint(websocket: WebSocket, store_id: int, token: str = Q
         
     db = SessionLocal()
     try:
-        user = crud.get_user_by_email(db, email=email)
+        # ✨ 권한 정보가 담긴 토큰이면 DB 조회 없이 확인 (이전 방식 토큰은 캐시된 사용자 정보)
+        user = auth.principal_from_payload(payload, db)
         if not user:
-            print("❌ [웹소켓 거절] DB에서 해당 유저를 찾을 수 없습니다.")
+            print("❌ [웹소켓 거절] 유저를 찾을 수 없거나 무효화된 토큰입니다.")
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+        if not user.is_active:
+            # HTTP API(get_current_active_user)와 같이 비활성 계정은 거절합니다.
+            print(f"❌ [웹소켓 거절] 비활성화된 계정입니다. (User: {user.id})")
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
             return
         
@@ -83,8 +123,8 @@ async def websocket_endpoint(websocket: WebSocket, store_id: int, token: str = Q
         if user.role == models.UserRole.SUPER_ADMIN: 
             has_permission = True
         elif user.role == models.UserRole.BRAND_ADMIN:
-            store = db.query(models.Store).filter(models.Store.id == store_id).first()
-            if store and store.brand_id == user.brand_id: 
+            tenancy = tenancy_index.get(db, store_id)
+            if tenancy and tenancy.brand_id == user.brand_id: 
                 has_permission = True
         elif user.role in [models.UserRole.STORE_OWNER, models.UserRole.STAFF]:
             if user.store_id == store_id: 
@@ -98,14 +138,20 @@ async def websocket_endpoint(websocket: WebSocket, store_id: int, token: str = Q
         db.close()
 
     # 모든 검증을 통과하면 웹소켓 연결을 승인합니다!
-    await manager.connect(websocket, store_id)
+    # ✨ 재연결 시 ?last_seq=마지막으로 받은 seq&epoch=HELLO에서 받은 epoch 를 보내면 놓친 이벤트만 다시 받습니다.
+    # ✨ 서버가 WS_HEARTBEAT_SECONDS마다 {"type": "PING"}을 보내면 {"type": "PONG"}으로 답해주세요. (답하던 기기가 조용해지면 연결 정리)
+    # ✨ ?encoding=deflate 를 붙이면 큰 프레임(주문 목록이 긴 NEW_ORDER, BATCH 등)을 압축 바이너리로 받습니다.
+    await manager.connect(websocket, store_id, last_seq=last_seq, epoch=epoch, encoding=encoding)
     try:
         while True:
             # 클라이언트(주방)가 연결을 끊을 때까지 대기
             data = await websocket.receive_text()
+            # ✨ 하트비트 응답(PONG)은 기록만 하고 다른 기기로 넘기지 않음
+            if manager.received(websocket, store_id, data):
+                continue
 
             # ✨ [신규] 받은 데이터를 같은 매장의 다른 기기 화면들에 그대로 전달 (화면 동기화)
-            await manager.broadcast(data, store_id)
+            await manager.relay(data, store_id)
     except WebSocketDisconnect:
         manager.disconnect(websocket, store_id)
 
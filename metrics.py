@@ -0,0 +1,65 @@
+import time
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_fastapi_instrumentator import Instrumentator
+from sqlalchemy.pool import QueuePool
+
+# =========================================================
+# 📈 Prometheus 지표 (/metrics, prometheus.yml 의 tory_backend 잡이 수집)
+# - HTTP 요청 수/지연: 라우트 템플릿(/stores/{store_id}/orders 등) 기준으로 묶어서 기록
+# - 핫패스에서는 라벨 조회 없이 미리 만들어 둔 지표에 observe/inc 만 합니다.
+# - 워커가 여러 개면 PROMETHEUS_MULTIPROC_DIR 환경변수를 설정하세요. (워커별 값을 합쳐서 노출)
+# =========================================================
+
+# 지연 구간(초): 웹소켓 대기열 적재는 µs 단위, 주문/결제는 ms~s 단위
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+REQUEST_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+WS_CONNECTIONS = Gauge(
+    "tory_ws_connections", "매장별 웹소켓 연결 수", ["store_id"], multiprocess_mode="livesum"
+)
+WS_BROADCAST_FANOUT_SECONDS = Histogram(
+    "tory_ws_broadcast_fanout_seconds", "이벤트 하나를 매장 기기들의 전송 대기열에 넣는 데 걸린 시간", buckets=FAST_BUCKETS
+)
+WS_SEND_SECONDS = Histogram(
+    "tory_ws_send_seconds", "기기 하나에 프레임 하나를 보내는 데 걸린 시간", buckets=FAST_BUCKETS
+)
+WS_SEND_FAILURES = Counter(
+    "tory_ws_send_failures_total", "기기 전송 실패로 연결을 정리한 횟수", ["reason"]
+)
+WS_SEND_ERROR = WS_SEND_FAILURES.labels(reason="send_error")      # 전송 오류/시간 초과
+WS_QUEUE_FULL = WS_SEND_FAILURES.labels(reason="queue_full")      # 느린 기기 (재동기화 요청)
+WS_IDLE_TIMEOUT = WS_SEND_FAILURES.labels(reason="idle_timeout")  # 하트비트 무응답
+
+ORDER_CREATE_SECONDS = Histogram(
+    "tory_order_create_seconds", "주문 생성 처리 시간 (검증~커밋~주방 알림)", buckets=REQUEST_BUCKETS
+)
+PAYMENT_VERIFY_SECONDS = Histogram(
+    "tory_payment_verify_seconds", "결제 검증 처리 시간 (PG 조회 포함)", ["source"], buckets=REQUEST_BUCKETS
+)
+PAYMENT_VERIFY_CLIENT = PAYMENT_VERIFY_SECONDS.labels(source="client")    # /payments/complete
+PAYMENT_VERIFY_WEBHOOK = PAYMENT_VERIFY_SECONDS.labels(source="webhook")  # 포트원 웹훅 워커
+
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "tory_db_pool_checkout_seconds", "DB 커넥션 풀에서 연결을 얻기까지 기다린 시간", buckets=FAST_BUCKETS
+)
+
+def setup(app):
+    # HTTP 지표 미들웨어 + /metrics 엔드포인트 (문서에는 노출하지 않음)
+    Instrumentator(
+        should_group_status_codes=True,
+        should_ignore_untemplated=True, # 없는 경로(404 스캔 등)로 라벨이 늘어나지 않도록
+        excluded_handlers=["/metrics"],
+    ).instrument(app).expose(app, include_in_schema=False)
+
+class TimedQueuePool(QueuePool):
+    """
+    풀에서 연결을 꺼낼 때(대기 포함) 걸린 시간을 기록하는 QueuePool. (풀이 꽉 차서 요청이 줄 서는지 확인용)
+    create_engine(poolclass=...)로 지정하며, 공개 API인 Pool.connect()만 감싸므로 SQLAlchemy 내부 구현에 의존하지 않습니다.
+    (engine.connect()/세션이 연결을 얻을 때 모두 이 메서드를 거침)
+    """
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started)
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Date, Time, Float, DateTime, Enum as SAEnum
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Date, Time, Float, DateTime, Index, Enum as SAEnum
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
@@ -212,7 +212,8 @@ class Order(Base):
     daily_number = Column(Integer, default=1)
     total_price = Column(Integer)
     is_completed = Column(Boolean, default=False)
-    created_at = Column(String, default=lambda: str(datetime.now()))
+    # ✨ [수정] 문자열 → 타임존 포함 시각 (기간 검색이 인덱스를 탈 수 있도록)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now().astimezone())
     table_id = Column(Integer, ForeignKey("tables.id"), nullable=True)
     
     payment_status = Column(String, default="PENDING") 
@@ -223,6 +224,8 @@ class Order(Base):
     imp_uid = Column(String, nullable=True)
     merchant_uid = Column(String, unique=True, nullable=True)
     paid_amount = Column(Integer, default=0)
+    # ✨ [신규] 마지막으로 변경될 때 받은 매장 피드 버전 (주방 현황판 델타 동기화용)
+    change_seq = Column(Integer, default=0, nullable=False)
 
     store = relationship("Store", back_populates="orders")
     table = relationship("Table", back_populates="orders")
@@ -232,6 +235,27 @@ class Order(Base):
     def table_name(self):
         return self.table.name if self.table else "포장/미지정"
 
+    # 🔥 실제 조회 패턴에 맞춘 복합 인덱스
+    __table_args__ = (
+        Index("ix_orders_kitchen_feed", "store_id", "payment_status", "is_completed"),  # 주방 현황판
+        Index("ix_orders_store_id_id", "store_id", "id"),                               # 주문 내역 (최신순)
+        Index("ix_orders_store_paid_created", "store_id", "payment_status", "created_at"),  # 매출 통계
+        Index("ix_orders_store_change_seq", "store_id", "change_seq"),                  # 주방 델타 동기화
+    )
+
+# ✨ [신규] 매장별 영업일 주문번호 카운터 (동시 주문에도 번호가 겹치지 않도록 원자적으로 증가)
+class DailyOrderCounter(Base):
+    __tablename__ = "daily_order_counters"
+    store_id = Column(Integer, ForeignKey("stores.id"), primary_key=True)
+    business_date = Column(Date, primary_key=True)
+    last_number = Column(Integer, nullable=False, default=0)
+
+# ✨ [신규] 매장별 주문 피드 버전 (주문이 생성/변경될 때마다 1씩 증가 → 커서/ETag로 사용)
+class StoreFeedVersion(Base):
+    __tablename__ = "store_feed_versions"
+    store_id = Column(Integer, ForeignKey("stores.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
 class OrderItem(Base):
     __tablename__ = "order_items"
     id = Column(Integer, primary_key=True, index=True)
@@ -244,6 +268,34 @@ class OrderItem(Base):
     is_cancelled = Column(Boolean, default=False)
     order = relationship("Order", back_populates="items")
 
+# ✨ [신규] 주문 취소/환불 기록 (PG 환불은 백그라운드 대기열이 처리하고 결과를 여기에 남김)
+class OrderRefund(Base):
+    __tablename__ = "order_refunds"
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), index=True, nullable=False)
+    store_id = Column(Integer, ForeignKey("stores.id"), index=True, nullable=False)
+    imp_uid = Column(String, nullable=True) # 후불(PG 미결제) 주문이면 None → PG 호출 없이 완료
+    amount = Column(Integer, nullable=False)
+    checksum = Column(Integer, nullable=True) # 포트원에 보낸 취소 직전 남은 결제 금액 (PG 중복 환불 방지, 환불 대기열이 보낼 때 기록)
+    reason = Column(String, nullable=True)
+    cancelled_item_ids = Column(String, default="[]") # JSON 배열
+    status = Column(String, default="PENDING") # PENDING → PROCESSING(워커가 가져감) → DONE / FAILED (일시 오류면 다시 PENDING)
+    attempts = Column(Integer, default=0)
+    last_error = Column(String, nullable=True)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True) # PENDING: 재시도 가능 시각 / PROCESSING: 처리 만료 시각 (워커가 죽으면 이후 다른 워커가 가져감)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now().astimezone())
+
+    order = relationship("Order")
+
+# ✨ [신규] 토큰 무효화 기록 (계정 비활성화/권한 변경 시 그 이전에 발급된 액세스 토큰을 거부)
+# 워커마다 이 테이블을 주기적으로 읽어 메모리의 무효화 목록을 맞춥니다.
+class TokenRevocation(Base):
+    __tablename__ = "token_revocations"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, index=True, nullable=False) # 삭제된 계정도 기록해야 하므로 FK 없음
+    revoked_before = Column(Float, nullable=False) # 이 시각(epoch 초) 이전에 발급된 토큰은 무효
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now().astimezone())
+
 class StaffCall(Base):
     __tablename__ = "staff_calls"
     id = Column(Integer, primary_key=True, index=True)
@@ -251,10 +303,14 @@ class StaffCall(Base):
     table_id = Column(Integer, ForeignKey("tables.id"))
     message = Column(String, default="직원 호출")
     is_completed = Column(Boolean, default=False)
-    created_at = Column(String, default=lambda: str(datetime.now()))
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now().astimezone())
     store = relationship("Store", back_populates="staff_calls")
     table = relationship("Table", back_populates="staff_calls")
 
+    __table_args__ = (
+        Index("ix_staff_calls_store_open", "store_id", "is_completed"),
+    )
+
 class Notice(Base):
     __tablename__ = "notices"
     id = Column(Integer, primary_key=True, index=True)
@@ -273,6 +329,14 @@ class NoticeRead(Base):
     notice_id = Column(Integer, ForeignKey("notices.id"))
     read_at = Column(DateTime, default=datetime.utcnow)
 
+# ✨ [신규] 멱등성 키 (다중 워커 환경에서 재시도 요청의 첫 응답을 공유하기 위한 저장소)
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    key = Column(String, primary_key=True)               # "{scope}:{Idempotency-Key}"
+    request_hash = Column(String, nullable=False)
+    response_body = Column(String, nullable=True)        # NULL이면 첫 요청이 아직 처리 중
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
 # ✨ [신규 추가] 시스템 감사 로그 (블랙박스)
 class AuditLog(Base):
     __tablename__ = "audit_logs"
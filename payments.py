@@ -0,0 +1,210 @@
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Optional
+from sqlalchemy import exists
+from sqlalchemy.orm import Session, aliased
+from starlette.concurrency import run_in_threadpool
+
+import models
+import crud
+import events
+import metrics
+from database import SessionLocal
+from connection_manager import manager
+from portone import portone_client
+from utils import send_discord_alert
+from kitchen_timer import sla_timer, order_deadline
+
+# 결제 확인 워커 수 / 대기열 크기 (대기열이 가득 차면 웹훅에 503을 돌려 포트원이 재전송하게 함)
+PAYMENT_WORKER_COUNT = int(os.getenv("PAYMENT_WORKER_COUNT", "4"))
+PAYMENT_QUEUE_SIZE = int(os.getenv("PAYMENT_QUEUE_SIZE", "1000"))
+# 중복 웹훅 판별을 위해 기억해 둘 최근 imp_uid 개수
+PAYMENT_DEDUPE_SIZE = 10000
+# 다시 확인해도 결과가 바뀌지 않는 포트원 결제 상태 ("ready"는 아직 결제 전이므로 제외)
+PAYMENT_TERMINAL_STATUSES = ("cancelled", "failed")
+
+# =========================================================
+# 💳 결제 검증 공통 로직 (/payments/complete 와 웹훅 워커가 함께 사용)
+# =========================================================
+
+def parse_order_id(merchant_uid: str) -> int:
+    # merchant_uid의 "_" 구분 두 번째 값이 주문 ID (예: "ORD_123_...")
+    return int(merchant_uid.split("_")[1])
+
+async def fetch_payment(imp_uid: str, merchant_uid: str) -> Optional[dict]:
+    # imp_uid로 조회하고, 실패하면 merchant_uid로 재조회
+    payment_data = await portone_client.get_payment(imp_uid)
+    if not payment_data:
+        payment_data = await portone_client.find_payment(merchant_uid)
+    return payment_data
+
+def payment_mismatch(payment_data: dict, merchant_uid: str, total_price: int) -> Optional[str]:
+    """
+    포트원 결제 정보가 이 주문을 결제한 건이 아니면 거절 사유, 맞으면 None.
+    (웹훅은 인증이 없으므로 금액만 맞춰 다른 주문의 결제 건을 재사용하는 요청을 막습니다)
+    """
+    if payment_data.get("status") != "paid":
+        return "결제가 완료되지 않았습니다."
+    if payment_data.get("merchant_uid") != merchant_uid:
+        return "주문 번호 불일치 (다른 주문의 결제 건)"
+    if int(payment_data["amount"]) != total_price:
+        return "결제 금액 불일치 (위변조 의심)"
+    return None
+
+def imp_uid_taken(db: Session, imp_uid: str, order_id: int) -> bool:
+    # 이미 다른 주문에 기록된 결제 건인지
+    return db.query(models.Order.id).filter(
+        models.Order.imp_uid == imp_uid,
+        models.Order.id != order_id
+    ).first() is not None
+
+def mark_order_paid(db: Session, order_id: int, store_id: int, imp_uid: str, merchant_uid: str, amount: int) -> bool:
+    """
+    결제 대기(PENDING) 주문만 조건부 UPDATE로 PAID 처리합니다.
+    (PAID/DEFERRED/CANCELLED/PARTIAL_CANCELLED는 이미 정산된 주문 → 환불 후 결제 확인을 다시 보내도 PAID로 되돌리지 않음)
+    브라우저와 웹훅이 동시에 확인해도 실제로 상태를 바꾼 쪽만 True를 받습니다. (주방 알림 중복 방지)
+    같은 imp_uid가 다른 주문에 이미 기록되어 있으면 바꾸지 않습니다.
+    """
+    other = aliased(models.Order)
+    updated = db.query(models.Order).filter(
+        models.Order.id == order_id,
+        models.Order.payment_status == "PENDING",
+        ~exists().where(other.imp_uid == imp_uid, other.id != order_id)
+    ).update({
+        "payment_status": "PAID",
+        "imp_uid": imp_uid,
+        "merchant_uid": merchant_uid,
+        "paid_amount": amount,
+        "change_seq": crud.next_feed_version(db, store_id)
+    }, synchronize_session=False)
+    if updated != 1:
+        db.rollback() # 이미 정산된 주문이면 올려둔 피드 버전도 되돌립니다.
+        return False
+    db.commit()
+    return True
+
+# =========================================================
+# 📨 포트원 웹훅 → 비동기 결제 확인 워커
+# =========================================================
+
+class PaymentConfirmationQueue:
+    """
+    웹훅으로 받은 결제 건을 대기열에 넣고, 고정된 수의 워커가 PG 검증 → PAID 처리 → 주방 알림을 수행합니다.
+    웹훅 요청 자체는 대기열에 넣기만 하고 바로 응답하므로 결제가 몰려도 응답 시간이 일정합니다.
+    """
+    def __init__(self, worker_count: int = PAYMENT_WORKER_COUNT, maxsize: int = PAYMENT_QUEUE_SIZE):
+        self.worker_count = worker_count
+        self.maxsize = maxsize
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        # 처리가 끝난(PAID 반영 또는 더 볼 필요 없는 결과) imp_uid (오래된 것부터 밀려남)
+        self._seen = OrderedDict()
+        # 대기열에 들어가 있거나 처리 중인 imp_uid
+        self._pending = set()
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def enqueue(self, imp_uid: str, merchant_uid: str) -> bool:
+        # 이미 대기 중이거나 처리한 결제는 다시 넣지 않고 성공으로 응답 (포트원 재전송 중복 제거)
+        if imp_uid in self._seen or imp_uid in self._pending:
+            return True
+        if self._queue is None:
+            return False
+        try:
+            self._queue.put_nowait((imp_uid, merchant_uid))
+        except asyncio.QueueFull:
+            return False
+        self._pending.add(imp_uid)
+        return True
+
+    def _remember(self, imp_uid: str):
+        self._seen[imp_uid] = True
+        if len(self._seen) > PAYMENT_DEDUPE_SIZE:
+            self._seen.popitem(last=False)
+
+    async def _worker(self):
+        while True:
+            imp_uid, merchant_uid = await self._queue.get()
+            try:
+                with metrics.PAYMENT_VERIFY_WEBHOOK.time():
+                    done = await self._confirm(imp_uid, merchant_uid)
+                # 아직 결제 전(ready) 등으로 끝나지 않은 건은 기억하지 않아 포트원 재전송 때 다시 확인합니다.
+                if done:
+                    self._remember(imp_uid)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await run_in_threadpool(send_discord_alert, f"웹훅 결제 확인 중 에러 발생!\nimp_uid: {imp_uid}\n내용: {str(e)}")
+            finally:
+                self._pending.discard(imp_uid)
+                self._queue.task_done()
+
+    async def _confirm(self, imp_uid: str, merchant_uid: str) -> bool:
+        """결제 건 처리가 끝났으면 True (PAID 반영 / 이미 정산된 주문 / 없는 주문 / 다른 주문의 결제·금액 불일치 / 취소·실패 결제)"""
+        order_id = parse_order_id(merchant_uid)
+
+        unpaid = await run_in_threadpool(_get_unpaid_order, order_id)
+        if unpaid is None:
+            return True # 없는 주문이거나 이미 정산된 주문 (PAID/취소 등)
+        store_id, total_price = unpaid
+
+        payment_data = await fetch_payment(imp_uid, merchant_uid)
+        if not payment_data:
+            return False
+        if payment_data.get("status") != "paid":
+            return payment_data.get("status") in PAYMENT_TERMINAL_STATUSES
+        mismatch = payment_mismatch(payment_data, merchant_uid, total_price)
+        if mismatch is None and await run_in_threadpool(_imp_uid_taken, imp_uid, order_id):
+            mismatch = "다른 주문에 이미 사용된 결제 건"
+        if mismatch:
+            await run_in_threadpool(send_discord_alert, f"웹훅 결제 검증 실패: {mismatch}\n주문번호: {order_id}\nimp_uid: {imp_uid}")
+            return True
+
+        result = await run_in_threadpool(_mark_paid_and_build_message, order_id, store_id, imp_uid, merchant_uid, payment_data["amount"])
+        if result:
+            message, due_at = result
+            sla_timer.track(order_id, store_id, due_at)
+            try:
+                await manager.broadcast(message, store_id=store_id)
+            except Exception:
+                pass # 웹소켓 전송에 실패해도 결제는 정상 완료 처리되어야 함
+        return True
+
+def _get_unpaid_order(order_id: int):
+    db = SessionLocal()
+    try:
+        order = db.query(models.Order).filter(models.Order.id == order_id).first()
+        if not order or order.payment_status != "PENDING":
+            return None
+        return order.store_id, order.total_price
+    finally:
+        db.close()
+
+def _imp_uid_taken(imp_uid: str, order_id: int) -> bool:
+    db = SessionLocal()
+    try:
+        return imp_uid_taken(db, imp_uid, order_id)
+    finally:
+        db.close()
+
+def _mark_paid_and_build_message(order_id: int, store_id: int, imp_uid: str, merchant_uid: str, amount: int):
+    db = SessionLocal()
+    try:
+        if not mark_order_paid(db, order_id, store_id, imp_uid, merchant_uid, amount):
+            return None
+        order = db.query(models.Order).filter(models.Order.id == order_id).first()
+        return events.NewOrderEvent.from_order(order).encode(), order_deadline(order.created_at, order.target_time)
+    finally:
+        db.close()
+
+# 전역에서 하나만 쓸 결제 확인 대기열
+payment_queue = PaymentConfirmationQueue()
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import time
+from typing import Optional
+import httpx
+
+# 포트원 API 키 설정 (.env 또는 환경 변수에서 로드)
+PORTONE_API_KEY = os.getenv("PORTONE_API_KEY")
+PORTONE_API_SECRET = os.getenv("PORTONE_API_SECRET")
+# 로컬 스텁 서버로 테스트할 때는 PORTONE_API_URL=http://127.0.0.1:9000 처럼 바꿔서 사용
+# (서버 없이 확인할 때는 PortOneClient(transport=httpx.MockTransport(...)) - check_portone_stub.py 참고)
+PORTONE_API_URL = os.getenv("PORTONE_API_URL", "https://api.iamport.kr")
+
+# PG 응답이 늦어도 요청이 무한정 붙잡히지 않도록 연결/응답 시간을 엄격하게 제한
+PORTONE_TIMEOUT = httpx.Timeout(connect=3.0, read=5.0, write=5.0, pool=3.0)
+# 토큰 만료 이 시간(초) 전에 미리 재발급
+TOKEN_REFRESH_MARGIN = 60
+
+class PortOneError(Exception):
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        # True: PG 장애/토큰 발급 실패처럼 잠시 후 다시 시도하면 될 수 있는 오류
+        self.retryable = retryable
+
+class PortOneClient:
+    """
+    포트원(아임포트) REST API 비동기 클라이언트.
+    커넥션 풀을 재사용하고, 액세스 토큰은 만료 직전까지 모든 요청이 공유합니다.
+    """
+    def __init__(self, api_key: Optional[str], api_secret: Optional[str], base_url: str = PORTONE_API_URL, timeout: httpx.Timeout = PORTONE_TIMEOUT, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.transport = transport # 스텁 확인용 (None이면 실제 네트워크)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._token: Optional[str] = None
+        self._token_expires_at = 0.0
+        self._token_lock = asyncio.Lock()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                transport=self.transport,
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20)
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get_access_token(self, force_refresh: bool = False) -> str:
+        if not force_refresh and self._token and time.time() < self._token_expires_at - TOKEN_REFRESH_MARGIN:
+            return self._token
+
+        # 동시에 여러 결제가 들어와도 토큰 발급 요청은 한 번만 나가도록 잠급니다.
+        async with self._token_lock:
+            if not force_refresh and self._token and time.time() < self._token_expires_at - TOKEN_REFRESH_MARGIN:
+                return self._token
+
+            res = await self.client.post("/users/getToken", json={"imp_key": self.api_key, "imp_secret": self.api_secret})
+            if res.status_code != 200:
+                raise PortOneError("PG사 토큰 발급 실패", retryable=True)
+
+            data = res.json()["response"]
+            self._token = data["access_token"]
+            # expired_at은 포트원 서버 기준 시각이므로, 남은 시간(expired_at - now)만 우리 시계에 더합니다.
+            self._token_expires_at = time.time() + (data["expired_at"] - data.get("now", time.time()))
+            return self._token
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        token = await self.get_access_token()
+        res = await self.client.request(method, path, headers={"Authorization": token}, **kwargs)
+        if res.status_code == 401:
+            # 다른 곳에서 토큰이 재발급되어 무효화된 경우 한 번만 재시도
+            token = await self.get_access_token(force_refresh=True)
+            res = await self.client.request(method, path, headers={"Authorization": token}, **kwargs)
+        return res
+
+    async def _get(self, path: str) -> Optional[dict]:
+        res = await self._request("GET", path)
+        if res.status_code != 200:
+            return None
+        return res.json().get("response")
+
+    async def get_payment(self, imp_uid: str) -> Optional[dict]:
+        return await self._get(f"/payments/{imp_uid}")
+
+    async def find_payment(self, merchant_uid: str) -> Optional[dict]:
+        return await self._get(f"/payments/find/{merchant_uid}")
+
+    async def cancel_payment(self, imp_uid: str, amount: int, reason: str, checksum: Optional[int] = None) -> dict:
+        """
+        결제 전액/부분 취소. checksum(취소 전 환불 가능 금액)을 보내면 같은 취소가 두 번 실행되지 않습니다.
+        PG 장애(5xx)는 retryable=True, 이미 취소됨/금액 불일치 같은 거절은 retryable=False로 올라갑니다.
+        (네트워크 오류는 httpx 예외 그대로 올라가므로 호출 쪽에서 재시도)
+        """
+        body = {"imp_uid": imp_uid, "amount": amount, "reason": reason}
+        if checksum is not None:
+            body["checksum"] = checksum
+        res = await self._request("POST", "/payments/cancel", json=body)
+        if res.status_code >= 500:
+            raise PortOneError(f"PG사 응답 오류 ({res.status_code})", retryable=True)
+
+        data = res.json() if res.status_code == 200 else {}
+        if data.get("code") != 0 or not data.get("response"):
+            raise PortOneError(data.get("message") or f"결제 취소 실패 ({res.status_code})")
+        return data["response"]
+
+# 전역에서 하나만 쓸 클라이언트 객체 생성 (커넥션 풀/토큰 공유)
+portone_client = PortOneClient(PORTONE_API_KEY, PORTONE_API_SECRET)
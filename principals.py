@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from sqlalchemy.orm import Session
+
+import models
+
+# 로그인 사용자 정보를 워커 메모리에 보관하는 시간 (초).
+# 다른 워커에서 바뀐 권한/비활성화도 이 시간 안에는 반영됩니다. (같은 워커는 즉시 invalidate)
+PRINCIPAL_TTL_SECONDS = float(os.getenv("PRINCIPAL_TTL_SECONDS", "30"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+
+class Principal:
+    """
+    인증된 사용자의 권한 판단에 필요한 값만 담은 읽기 전용 객체 (ORM 세션과 무관).
+    라우터에서는 기존 current_user(models.User)처럼 .id / .role / .store_id 등을 그대로 씁니다.
+    """
+    __slots__ = ("id", "email", "name", "phone", "role", "store_id", "brand_id", "group_id", "is_active", "loaded_at")
+
+    def __init__(self, user: models.User):
+        self.id = user.id
+        self.email = user.email
+        self.name = user.name
+        self.phone = user.phone
+        self.role = user.role
+        self.store_id = user.store_id
+        self.brand_id = user.brand_id
+        self.group_id = user.group_id
+        self.is_active = user.is_active
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def from_claims(cls, claims: dict) -> "Principal":
+        # 액세스 토큰에 서명되어 들어 있는 값으로 만듭니다. (DB 조회 없음, 이름/전화번호는 토큰에 없음)
+        principal = cls.__new__(cls)
+        principal.id = claims["uid"]
+        principal.email = claims.get("sub")
+        principal.name = None
+        principal.phone = None
+        principal.role = models.UserRole(claims["role"])
+        principal.store_id = claims.get("store_id")
+        principal.brand_id = claims.get("brand_id")
+        principal.group_id = claims.get("group_id")
+        principal.is_active = claims.get("active", True)
+        principal.loaded_at = time.monotonic()
+        return principal
+
+class PrincipalCache:
+    """토큰 subject(이메일) → Principal. TTL + 크기 제한 LRU (워커 프로세스 단위)"""
+    def __init__(self, max_entries: int = PRINCIPAL_CACHE_SIZE, ttl: float = PRINCIPAL_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Principal]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, email: str) -> Optional[Principal]:
+        with self._lock:
+            principal = self._entries.get(email)
+            if principal and time.monotonic() - principal.loaded_at < self.ttl:
+                self._entries.move_to_end(email)
+                return principal
+
+        user = db.query(models.User).filter(models.User.email == email).first()
+        if user is None:
+            self.invalidate(email)
+            return None
+
+        principal = Principal(user)
+        with self._lock:
+            self._entries[email] = principal
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return principal
+
+    def invalidate(self, email: Optional[str]):
+        if email:
+            with self._lock:
+                self._entries.pop(email, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# 전역에서 하나만 쓸 로그인 사용자 캐시
+principal_cache = PrincipalCache()
+
+def get_principal(db: Session, email: str) -> Optional[Principal]:
+    return principal_cache.get(db, email)
+
+def invalidate_principal(email: Optional[str]):
+    # 계정 수정/삭제/매장 연결 변경을 커밋한 뒤 호출하세요.
+    principal_cache.invalidate(email)
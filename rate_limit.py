@@ -0,0 +1,46 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+# 로그인 시도 제한 (토큰 버킷)
+# - 계정별: 연속 LOGIN_ACCOUNT_BURST회까지, 이후 LOGIN_ACCOUNT_REFILL_SECONDS마다 1회씩 다시 허용
+# - IP별: 매장 하나가 같은 공유기(IP)로 출근 시간에 몰아서 로그인하므로 넉넉하게
+LOGIN_ACCOUNT_BURST = int(os.getenv("LOGIN_ACCOUNT_BURST", "5"))
+LOGIN_ACCOUNT_REFILL_SECONDS = float(os.getenv("LOGIN_ACCOUNT_REFILL_SECONDS", "30"))
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "30"))
+LOGIN_IP_REFILL_SECONDS = float(os.getenv("LOGIN_IP_REFILL_SECONDS", "2"))
+RATE_LIMIT_MAX_KEYS = 100000
+
+class TokenBucketLimiter:
+    """키(계정/IP)별 토큰 버킷. 오래 안 쓴 키부터 밀어내는 크기 제한 LRU (워커 프로세스 단위)"""
+    def __init__(self, burst: int, refill_seconds: float, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.burst = burst
+        self.refill_seconds = refill_seconds
+        self.max_keys = max_keys
+        self._buckets = OrderedDict() # key -> (남은 토큰, 마지막 계산 시각)
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str) -> Tuple[bool, float]:
+        """토큰 1개 사용. (허용 여부, 거절이면 다시 시도할 수 있을 때까지 남은 초)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) / self.refill_seconds)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) * self.refill_seconds
+
+    def reset(self, key: str):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+# 전역에서 하나씩 쓸 로그인 제한기
+login_account_limiter = TokenBucketLimiter(LOGIN_ACCOUNT_BURST, LOGIN_ACCOUNT_REFILL_SECONDS)
+login_ip_limiter = TokenBucketLimiter(LOGIN_IP_BURST, LOGIN_IP_REFILL_SECONDS)
@@ -0,0 +1,282 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional
+import httpx
+from sqlalchemy import and_, exists, func, or_
+from sqlalchemy.orm import aliased
+from starlette.concurrency import run_in_threadpool
+
+import models
+import crud
+import events
+from database import SessionLocal
+from connection_manager import manager
+from kitchen_timer import sla_timer
+from portone import portone_client, PortOneError
+from utils import send_discord_alert
+
+# 환불 워커 수 / 최대 시도 횟수 / 재시도 간격 (5초, 10초, 20초 ... 로 늘어남)
+REFUND_WORKER_COUNT = int(os.getenv("REFUND_WORKER_COUNT", "2"))
+REFUND_MAX_ATTEMPTS = int(os.getenv("REFUND_MAX_ATTEMPTS", "5"))
+REFUND_RETRY_BASE_SECONDS = float(os.getenv("REFUND_RETRY_BASE_SECONDS", "5"))
+# 다른 워커에서 생성/재시도 대기/처리 만료된 환불 건을 찾는 주기 (초)
+REFUND_POLL_SECONDS = float(os.getenv("REFUND_POLL_SECONDS", "10"))
+# 워커가 가져간(PROCESSING) 건을 이 시간 안에 끝내지 못하면 (워커 종료 등) 다른 워커가 다시 가져갑니다.
+REFUND_CLAIM_SECONDS = float(os.getenv("REFUND_CLAIM_SECONDS", "120"))
+
+# 처리 중인 환불 상태 (같은 주문의 뒤 환불은 이 상태의 앞 환불이 끝날 때까지 기다림)
+IN_FLIGHT_REFUND_STATUSES = ("PENDING", "PROCESSING")
+
+# =========================================================
+# 💸 PG 환불 대기열 (취소 API는 DB만 바꾸고 바로 응답, PG 호출은 여기서)
+# =========================================================
+
+class RefundQueue:
+    """
+    order_refunds의 PENDING 건을 워커가 포트원에 취소 요청합니다.
+    - 워커(프로세스)마다 대기열을 두지만, 실제 처리는 DB에서 PENDING → PROCESSING 조건부 UPDATE로 가져간 쪽만 합니다. (PG 중복 취소 방지)
+    - 한 주문의 환불은 id 순서대로 하나씩 처리합니다. (앞 환불이 끝나야 남은 결제 금액 = checksum이 확정됨)
+    - 일시적인 PG 오류는 간격을 늘려가며 재시도하고, 환불이 끝난 뒤에야 주문 상태를 바꾸고 주방에 취소 알림을 보냅니다.
+    - 처리 상태는 DB에 있으므로 서버가 재시작되어도, 다른 워커가 만든 건이어도 주기적으로 찾아 이어서 처리합니다.
+    """
+    def __init__(self, worker_count: int = REFUND_WORKER_COUNT):
+        self.worker_count = worker_count
+        self._queue: Optional[asyncio.Queue] = None
+        self._queued = set()
+        self._workers = []
+        self._retry_tasks = set()
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        self._workers.append(asyncio.create_task(self._poll_loop()))
+
+    async def stop(self):
+        tasks = self._workers + list(self._retry_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._retry_tasks.clear()
+
+    def enqueue(self, refund_id: int):
+        # 대기열이 아직 없으면(워커 미시작) DB에 PENDING으로 남아 있다가 폴링 때 다시 읽힘
+        if self._queue is not None and refund_id not in self._queued:
+            self._queued.add(refund_id)
+            self._queue.put_nowait(refund_id)
+
+    async def _poll_loop(self):
+        while True:
+            try:
+                for refund_id in await run_in_threadpool(_load_due_refund_ids):
+                    self.enqueue(refund_id)
+            except Exception as e:
+                print(f"환불 대기 건 조회 실패: {e!r}")
+            await asyncio.sleep(REFUND_POLL_SECONDS)
+
+    async def _worker(self):
+        while True:
+            refund_id = await self._queue.get()
+            self._queued.discard(refund_id)
+            try:
+                await self._process(refund_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await run_in_threadpool(send_discord_alert, f"환불 처리 중 에러 발생!\n환불번호: {refund_id}\n내용: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, refund_id: int):
+        refund = await run_in_threadpool(_claim_refund, refund_id)
+        if refund is None:
+            return # 이미 처리됐거나, 다른 워커가 처리 중이거나, 같은 주문의 앞 환불을 기다리는 중
+
+        if refund["imp_uid"]:
+            try:
+                await portone_client.cancel_payment(refund["imp_uid"], refund["amount"], refund["reason"], checksum=refund["checksum"])
+            except (PortOneError, httpx.HTTPError) as e:
+                retryable = e.retryable if isinstance(e, PortOneError) else True
+                # 처리 만료 후 다시 가져간 건이면 앞선 시도가 이미 성공했을 수 있습니다. (checksum 불일치로 거절됨)
+                if retryable or not await _is_already_refunded(refund):
+                    await self._handle_failure(refund_id, refund, e, retryable)
+                    return
+
+        result = await run_in_threadpool(_mark_refund_done, refund_id)
+        if result:
+            store_id, message, is_full_cancel = result
+            if is_full_cancel:
+                sla_timer.untrack(refund["order_id"])
+            try:
+                await manager.broadcast(message, store_id=store_id)
+            except Exception:
+                pass
+        await self._enqueue_next(refund["order_id"])
+
+    async def _handle_failure(self, refund_id: int, refund: dict, error: Exception, retryable: bool):
+        attempts = refund["attempts"] + 1
+        give_up = not retryable or attempts >= REFUND_MAX_ATTEMPTS
+        delay = REFUND_RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+        if not await run_in_threadpool(_record_refund_failure, refund_id, str(error), give_up, delay):
+            return # 그사이 다른 경로에서 끝난 건
+        if give_up:
+            await run_in_threadpool(send_discord_alert, f"PG 환불 실패 (수동 확인 필요)\n주문번호: {refund['order_id']}\n금액: {refund['amount']}원\n시도: {attempts}회\n내용: {str(error)}")
+            await self._enqueue_next(refund["order_id"])
+        else:
+            self._retry_later(refund_id, delay)
+
+    async def _enqueue_next(self, order_id: int):
+        # 같은 주문에서 이 환불을 기다리던 다음 환불을 바로 이어서 처리
+        for refund_id in await run_in_threadpool(_load_due_refund_ids, order_id):
+            self.enqueue(refund_id)
+
+    def _retry_later(self, refund_id: int, delay: float):
+        async def _sleep_and_enqueue():
+            await asyncio.sleep(delay)
+            self.enqueue(refund_id)
+
+        task = asyncio.create_task(_sleep_and_enqueue())
+        self._retry_tasks.add(task)
+        task.add_done_callback(self._retry_tasks.discard)
+
+async def _is_already_refunded(refund: dict) -> bool:
+    # 포트원의 누적 취소 금액이 이 환불까지 반영된 값 이상이면 이미 환불된 것으로 봅니다.
+    try:
+        payment = await portone_client.get_payment(refund["imp_uid"])
+    except (PortOneError, httpx.HTTPError):
+        return False
+    if not payment or refund["checksum"] is None:
+        return False
+    expected = int(payment["amount"]) - (refund["checksum"] - refund["amount"])
+    return int(payment.get("cancel_amount") or 0) >= expected
+
+def _now():
+    return datetime.now().astimezone()
+
+def _due_filter(now: datetime):
+    # 재시도 대기 시각이 지난 PENDING 건 + 처리 만료 시각이 지난 PROCESSING 건
+    return or_(
+        and_(models.OrderRefund.status == "PENDING",
+             or_(models.OrderRefund.next_attempt_at.is_(None), models.OrderRefund.next_attempt_at <= now)),
+        and_(models.OrderRefund.status == "PROCESSING", models.OrderRefund.next_attempt_at <= now)
+    )
+
+def _no_earlier_in_flight():
+    # 같은 주문에 이 환불보다 앞선(id가 작은) 처리 중 환불이 없어야 함
+    earlier = aliased(models.OrderRefund)
+    return ~exists().where(
+        earlier.order_id == models.OrderRefund.order_id,
+        earlier.id < models.OrderRefund.id,
+        earlier.status.in_(IN_FLIGHT_REFUND_STATUSES)
+    )
+
+def _load_due_refund_ids(order_id: Optional[int] = None) -> List[int]:
+    db = SessionLocal()
+    try:
+        query = db.query(models.OrderRefund.id).filter(_due_filter(_now()), _no_earlier_in_flight())
+        if order_id is not None:
+            query = query.filter(models.OrderRefund.order_id == order_id)
+        return [row.id for row in query.order_by(models.OrderRefund.id).all()]
+    finally:
+        db.close()
+
+def _refunded_amount(db, order_id: int) -> int:
+    return db.query(func.coalesce(func.sum(models.OrderRefund.amount), 0)).filter(
+        models.OrderRefund.order_id == order_id,
+        models.OrderRefund.status == "DONE"
+    ).scalar()
+
+def _claim_refund(refund_id: int):
+    """
+    환불 건을 PROCESSING으로 바꿔 이 워커가 가져갑니다. (조건부 UPDATE라 여러 워커 중 한 곳만 성공)
+    같은 주문의 앞 환불이 아직 처리 중이면 가져가지 않습니다. 가져가면서 보낼 checksum을 확정합니다.
+    """
+    db = SessionLocal()
+    try:
+        now = _now()
+        claimed = db.query(models.OrderRefund).filter(
+            models.OrderRefund.id == refund_id,
+            _due_filter(now),
+            _no_earlier_in_flight()
+        ).update({"status": "PROCESSING", "next_attempt_at": now + timedelta(seconds=REFUND_CLAIM_SECONDS)}, synchronize_session=False)
+        if claimed != 1:
+            db.rollback()
+            return None
+
+        refund = db.query(models.OrderRefund).filter(models.OrderRefund.id == refund_id).first()
+        checksum = None
+        if refund.imp_uid:
+            # 앞 환불이 모두 끝났으므로 포트원에 남은 취소 가능 금액 = 결제 금액 - 완료된 환불 합계
+            checksum = (refund.order.paid_amount or 0) - _refunded_amount(db, refund.order_id)
+            refund.checksum = checksum
+        result = {
+            "order_id": refund.order_id,
+            "imp_uid": refund.imp_uid,
+            "amount": refund.amount,
+            "checksum": checksum,
+            "reason": refund.reason,
+            "attempts": refund.attempts or 0
+        }
+        db.commit()
+        return result
+    finally:
+        db.close()
+
+def _record_refund_failure(refund_id: int, error: str, give_up: bool, retry_delay: float) -> bool:
+    # 이 워커가 가져간(PROCESSING) 건만 갱신합니다. 늦게 도착한 실패가 끝난(DONE) 환불을 덮어쓰지 않도록.
+    db = SessionLocal()
+    try:
+        values = {"attempts": models.OrderRefund.attempts + 1, "last_error": error[:500]}
+        if give_up:
+            values["status"] = "FAILED"
+            values["next_attempt_at"] = None
+        else:
+            values["status"] = "PENDING"
+            values["next_attempt_at"] = _now() + timedelta(seconds=retry_delay)
+        updated = db.query(models.OrderRefund).filter(
+            models.OrderRefund.id == refund_id,
+            models.OrderRefund.status == "PROCESSING"
+        ).update(values, synchronize_session=False)
+        db.commit()
+        return updated == 1
+    finally:
+        db.close()
+
+def _mark_refund_done(refund_id: int):
+    """
+    환불 완료 처리와 함께 주문에 취소를 반영합니다. (PG 환불이 확인된 뒤에만 주문 상태가 바뀜)
+    남은 환불 가능 금액이 0이면 전액 취소(CANCELLED), 아니면 부분 취소(PARTIAL_CANCELLED)입니다.
+    """
+    db = SessionLocal()
+    try:
+        updated = db.query(models.OrderRefund).filter(
+            models.OrderRefund.id == refund_id,
+            models.OrderRefund.status == "PROCESSING"
+        ).update({"status": "DONE", "attempts": models.OrderRefund.attempts + 1, "last_error": None, "next_attempt_at": None}, synchronize_session=False)
+        if updated != 1:
+            db.rollback()
+            return None
+
+        refund = db.query(models.OrderRefund).filter(models.OrderRefund.id == refund_id).first()
+        # 취소 API와 동시에 주문을 바꾸지 않도록 주문 행을 잠급니다.
+        order = db.query(models.Order).filter(models.Order.id == refund.order_id).with_for_update().first()
+        cancelled_item_ids = set(json.loads(refund.cancelled_item_ids or "[]"))
+        # 아직 처리 중인 뒤 환불은 빼고, 실제로 끝난 환불만으로 전액 취소인지 판단
+        is_full_cancel = (order.paid_amount or 0) - _refunded_amount(db, order.id) <= 0
+        for item in order.items:
+            if is_full_cancel or item.id in cancelled_item_ids:
+                item.is_cancelled = True
+        order.payment_status = "CANCELLED" if is_full_cancel else "PARTIAL_CANCELLED"
+        order.change_seq = crud.next_feed_version(db, order.store_id)
+        db.flush()
+        message = events.OrderCancelledEvent.from_refund(order, refund).encode()
+        store_id = refund.store_id
+        db.commit()
+        return store_id, message, is_full_cancel
+    finally:
+        db.close()
+
+# 전역에서 하나만 쓸 환불 대기열
+refund_queue = RefundQueue()
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Optional
+from starlette.concurrency import run_in_threadpool
+
+import models
+from database import SessionLocal
+
+# 다른 워커에서 무효화한 토큰을 반영하는 주기 (초)
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "2"))
+
+class RevocationList:
+    """
+    계정별 "이 시각 이전에 발급된 액세스 토큰은 무효" 목록 (워커 프로세스 단위 메모리).
+    - 무효화는 token_revocations 테이블에 남기고, 각 워커가 새 행만 주기적으로 읽어 맞춥니다.
+    - 액세스 토큰 수명이 지난 기록은 의미가 없으므로 메모리에서 버립니다. (목록이 계속 작게 유지됨)
+    """
+    def __init__(self, retention_seconds: float):
+        self.retention_seconds = retention_seconds
+        self._cutoffs: Dict[int, float] = {} # user_id -> revoked_before
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        await run_in_threadpool(self.sync)
+        self._task = asyncio.create_task(self._sync_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(REVOCATION_SYNC_SECONDS)
+            try:
+                await run_in_threadpool(self.sync)
+            except Exception as e:
+                print(f"토큰 무효화 목록 동기화 실패: {e!r}")
+
+    def sync(self):
+        # 마지막으로 읽은 이후의 무효화 기록만 가져옵니다. (PK 범위 조회)
+        oldest = time.time() - self.retention_seconds
+        db = SessionLocal()
+        try:
+            rows = db.query(models.TokenRevocation.id, models.TokenRevocation.user_id, models.TokenRevocation.revoked_before).filter(
+                models.TokenRevocation.id > self._last_id,
+                models.TokenRevocation.revoked_before > oldest
+            ).order_by(models.TokenRevocation.id).all()
+        finally:
+            db.close()
+        with self._lock:
+            for row_id, user_id, revoked_before in rows:
+                self._apply(user_id, revoked_before)
+                self._last_id = max(self._last_id, row_id)
+            self._cutoffs = {user_id: cutoff for user_id, cutoff in self._cutoffs.items() if cutoff > oldest}
+
+    def _apply(self, user_id: int, revoked_before: float):
+        if revoked_before > self._cutoffs.get(user_id, 0):
+            self._cutoffs[user_id] = revoked_before
+
+    def revoke(self, user_id: int):
+        """user_id의 지금까지 발급된 액세스 토큰을 모두 무효화 (이 워커는 즉시, 다른 워커는 다음 동기화 때)"""
+        revoked_before = time.time()
+        db = SessionLocal()
+        try:
+            db.add(models.TokenRevocation(user_id=user_id, revoked_before=revoked_before))
+            db.commit()
+        finally:
+            db.close()
+        with self._lock:
+            self._apply(user_id, revoked_before)
+
+    def is_revoked(self, user_id: int, issued_at: Optional[float]) -> bool:
+        cutoff = self._cutoffs.get(user_id)
+        return cutoff is not None and (issued_at is None or issued_at < cutoff)
+
+    def __len__(self):
+        return len(self._cutoffs)
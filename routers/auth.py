@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import math
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List
 
@@ -13,6 +15,8 @@ from database import get_db
 
 # 공통 함수 (utils.py)
 from utils import create_audit_log
+from principals import invalidate_principal
+from rate_limit import login_account_limiter, login_ip_limiter
 
 # ✨ 라우터 생성
 router = APIRouter(tags=["Auth & Users"])
@@ -21,21 +25,65 @@ router = APIRouter(tags=["Auth & Users"])
 # 🔐 로그인 및 인증 API
 # =========================================================
 
+def _throttled(retry_after: float):
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="로그인 시도가 너무 많습니다. 잠시 후 다시 시도해주세요.",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
 @router.post("/token", response_model=dict)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.get_user_by_email(db, email=form_data.username)
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    # ✨ 무차별 대입 방지: IP별/계정별 토큰 버킷을 bcrypt 계산 전에 확인
+    client_ip = request.client.host if request.client else "unknown"
+    allowed, retry_after = login_ip_limiter.acquire(client_ip)
+    if not allowed:
+        raise _throttled(retry_after)
+    account = form_data.username.strip().lower()
+    allowed, retry_after = login_account_limiter.acquire(account)
+    if not allowed:
+        raise _throttled(retry_after)
+
+    # ✨ async 핸들러이므로 계정 조회(DB)와 bcrypt 검증은 이벤트 루프 밖에서 수행
+    user = await run_in_threadpool(crud.get_user_by_email, db, email=form_data.username)
+    if not user or not await auth.verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="이메일 또는 비밀번호가 일치하지 않습니다.",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = auth.create_access_token(data={"sub": user.email})
-    return {"access_token": access_token, "token_type": "bearer"}
+    # 비활성 계정에는 토큰을 발급하지 않습니다. (비밀번호가 맞을 때만 알려줌)
+    if not user.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="비활성화된 계정입니다.")
+    login_account_limiter.reset(account) # 로그인에 성공하면 계정 제한은 초기화
+    # ✨ 권한 정보(role/store/brand/group)를 담은 짧은 액세스 토큰 + 리프레시 토큰
+    return auth.create_user_tokens(user)
+
+@router.post("/token/refresh", response_model=schemas.Token)
+def refresh_access_token(payload: schemas.TokenRefreshRequest, db: Session = Depends(get_db)):
+    # 리프레시 때만 DB에서 계정을 다시 읽어 최신 권한으로 새 토큰을 발급합니다.
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="다시 로그인해주세요.",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    claims = auth.decode_refresh_token(payload.refresh_token)
+    if not claims:
+        raise credentials_exception
+    user = crud.get_user(db, user_id=claims.get("uid"))
+    if not user or not user.is_active or user.email != claims.get("sub"):
+        raise credentials_exception
+    if claims.get("pwv") != auth.password_version(user.hashed_password):
+        raise credentials_exception
+    return auth.create_user_tokens(user)
 
 @router.get("/users/me", response_model=schemas.UserResponse)
-def read_users_me(current_user: models.User = Depends(dependencies.get_current_user)):
-    return current_user
+def read_users_me(db: Session = Depends(get_db), current_user: models.User = Depends(dependencies.get_current_user)):
+    # 토큰에는 이름/전화번호가 없으므로 내 정보 화면은 DB에서 읽습니다.
+    user = crud.get_user(db, user_id=current_user.id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
 
 
 # =========================================================
@@ -108,4 +156,6 @@ def delete_user_by_admin(user_id: int, db: Session = Depends(get_db), current_us
     
     db.delete(user_to_delete)
     db.commit()
+    invalidate_principal(user_to_delete.email)
+    auth.revoke_user_tokens(user_id)
     return {"message": "User deleted"}
\ No newline at end of file
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response, status
+from pydantic import TypeAdapter
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session, joinedload, selectinload
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional, Union
 import json
-import os
-import requests
 from datetime import datetime
 
 # 프로젝트 내부 모듈
@@ -11,15 +12,18 @@ import models
 import schemas
 import crud
 import dependencies
+import idempotency
+import events
+import metrics
 from database import get_db
 from connection_manager import manager  # 웹소켓 브로드캐스트를 위해 임포트
+from store_schedule import get_store_schedule
+from kitchen_timer import sla_timer, order_deadline, KITCHEN_PAYMENT_STATUSES, SLA_PAYMENT_STATUSES
+from refunds import refund_queue
+from payments import parse_order_id, fetch_payment, payment_mismatch, imp_uid_taken, mark_order_paid, payment_queue
 
 # 공통 함수 (utils.py)
-from utils import verify_store_permission, send_discord_alert
-
-# 포트원 API 키 설정 (.env 또는 환경 변수에서 로드)
-PORTONE_API_KEY = os.getenv("PORTONE_API_KEY")
-PORTONE_API_SECRET = os.getenv("PORTONE_API_SECRET")
+from utils import verify_store_permission, send_discord_alert, parse_date_range
 
 # ✨ 라우터 생성
 router = APIRouter(tags=["Orders & Payments"])
@@ -29,97 +33,127 @@ router = APIRouter(tags=["Orders & Payments"])
 # =========================================================
 
 @router.post("/orders/", response_model=schemas.OrderResponse)
-async def create_order(order: schemas.OrderCreate, db: Session = Depends(get_db)):
-    now = datetime.now()
-    current_time_str = now.strftime("%H:%M") 
-    current_weekday = now.weekday()          
-
-    # 영업 시간 및 브레이크 타임 검증
-    today_hours = db.query(models.OperatingHour).filter(
-        models.OperatingHour.store_id == order.store_id, 
-        models.OperatingHour.day_of_week == current_weekday
-    ).first()
-    
-    if today_hours:
-        if today_hours.is_closed:
-            raise HTTPException(status_code=400, detail="오늘은 매장 휴무일입니다.")
-        if today_hours.break_time_list and today_hours.break_time_list != "[]":
-            try:
-                break_times = json.loads(today_hours.break_time_list)
-                for bt in break_times:
-                    if bt.get("start") and bt.get("end"):
-                        if bt["start"] <= current_time_str <= bt["end"]:
-                            raise HTTPException(
-                                status_code=400, 
-                                detail=f"현재 브레이크 타임({bt['start']} ~ {bt['end']}) 중이므로 주문할 수 없습니다. ☕"
-                            )
-            except: 
-                pass 
-
-    # 요청된 메뉴가 실제 존재하는지 확인
+async def create_order(order: schemas.OrderCreate, db: Session = Depends(get_db), idempotency_key: Optional[str] = Header(None)):
+    # 더블탭/와이파이 재시도: 같은 Idempotency-Key면 첫 응답을 그대로 재전송 (주문 중복 생성 방지)
+    # (database 저장소는 DB를 쓰므로 기록 조회/저장은 이벤트 루프 밖에서 수행)
+    replayed = await run_in_threadpool(idempotency.begin, "orders", idempotency_key, order)
+    if replayed:
+        return replayed
+    try:
+        with metrics.ORDER_CREATE_SECONDS.time():
+            result = await _create_order(order, db)
+    except Exception:
+        await run_in_threadpool(idempotency.abort, "orders", idempotency_key)
+        raise
+    return await run_in_threadpool(idempotency.complete, "orders", idempotency_key, order, result)
+
+async def _create_order(order: schemas.OrderCreate, db: Session):
+    # 영업일/휴일/브레이크 타임 검증 (캐시된 매장 스케줄 사용, DB 조회 없음)
+    schedule = get_store_schedule(db, order.store_id)
+    closed_reason = schedule.closed_reason(datetime.now().astimezone())
+    if closed_reason:
+        raise HTTPException(status_code=400, detail=closed_reason)
+
+    # 요청된 메뉴가 실제 존재하는지 확인 (IN 쿼리 한 번으로 일괄 조회)
+    menus = crud.get_menus_for_order(db, order)
     for item in order.items:
-        menu = db.query(models.Menu).filter(
-            models.Menu.id == item.menu_id, 
-            models.Menu.store_id == order.store_id
-        ).first()
-        if not menu: 
+        if item.menu_id not in menus:
             raise HTTPException(status_code=400, detail=f"잘못된 메뉴 요청입니다 (ID: {item.menu_id})")
-        
-    created_order = crud.create_order(db=db, order=order)
-    
-    # ✨ [핵심 수정] 후불 결제(POST_PAY)인 경우 처리 로직
+
+    table = db.query(models.Table).filter(models.Table.id == order.table_id).first()
+
+    # 주문서 + 상세 주문을 한 번의 flush로 저장한 뒤, 커밋 전에 응답을 미리 직렬화합니다.
+    # (커밋 후 만료된 속성을 다시 읽느라 refresh/lazy-load 쿼리가 추가로 나가지 않도록)
+    created_order = crud.create_order(db=db, order=order, menus=menus, schedule=schedule, table=table)
+    order_data = schemas.OrderResponse.model_validate(created_order).model_dump()
+    due_at = order_deadline(created_order.created_at, created_order.target_time)
+    # 후불 주문의 주방 알림도 커밋 전에 미리 직렬화 (아래 설명 참고)
+    new_order_message = events.NewOrderEvent.from_order(created_order, is_post_pay=True).encode() if order.is_post_pay else None
+    db.commit()
+
+    # ✨ [핵심 수정] 후불 결제(POST_PAY)인 경우: PG결제를 안 하므로, 주문 즉시 주방으로 웹소켓 알림을 쏩니다!
+    # (선불일 경우 PENDING 상태 그대로 두고, 이후 포트원 검증 API에서 PAID로 바뀜)
     if order.is_post_pay:
-        created_order.payment_status = "DEFERRED" # 상태를 '후불 결제 대기'로 변경
-        db.commit()
-        db.refresh(created_order)
-        
-        # PG결제를 안 하므로, 주문 즉시 주방으로 웹소켓 알림을 쏩니다!
+        sla_timer.track(order_data["id"], order.store_id, due_at)
         try:
-            items_list = [{"menu_name": item.menu_name, "quantity": item.quantity, "options": item.options_desc or ""} for item in created_order.items]
-            created_at_val = created_order.created_at
-            created_at_str = created_at_val.strftime("%Y-%m-%d %H:%M:%S") if hasattr(created_at_val, 'strftime') else str(created_at_val)
-
-            message = json.dumps({
-                "type": "NEW_ORDER", 
-                "order_id": created_order.id, 
-                "daily_number": created_order.daily_number,
-                "table_name": created_order.table.name if created_order.table else "Unknown", 
-                "created_at": created_at_str, 
-                "items": items_list,
-                "is_post_pay": True # 프론트에 후불임을 알려줌
-            }, ensure_ascii=False)
-            await manager.broadcast(message, store_id=int(created_order.store_id))
+            await manager.broadcast(new_order_message, store_id=order.store_id)
         except: 
             pass
-    else:
-        db.commit() # 선불일 경우 PENDING 상태 그대로 둠 (이후 포트원 검증 API에서 PAID로 바뀜)
         
-    return created_order
+    return order_data
 
 
 # =========================================================
 # 📋 주문 내역 조회 및 상태 변경 (점주/관리자용)
 # =========================================================
 
-@router.get("/stores/{store_id}/orders", response_model=List[schemas.OrderResponse]) 
-def read_store_orders(store_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(dependencies.get_current_user)):
-    verify_store_permission(db, current_user, store_id)
-    
-    # ✨ [수정] "DEFERRED"(후불 대기) 상태인 주문도 주방 모니터에 뜨도록 리스트에 추가!
-    orders = db.query(models.Order).filter(
-        models.Order.store_id == store_id,
-        models.Order.payment_status.in_(["PAID", "DEFERRED", "PARTIAL_CANCELLED", "CANCELLED"]),
-        models.Order.is_completed == False 
-    ).order_by(models.Order.id.asc()).all()
+_order_list_adapter = TypeAdapter(List[schemas.OrderResponse])
 
+def _to_order_responses(orders: List[models.Order], missing_table_name: str) -> List[schemas.OrderResponse]:
     result = []
     for o in orders:
-        order_data = schemas.OrderResponse.model_validate(o).model_dump()
-        order_data["table_name"] = o.table.name if o.table else "알수없음"
+        order_data = schemas.OrderResponse.model_validate(o)
+        if not o.table:
+            order_data.table_name = missing_table_name
         result.append(order_data)
-        
     return result
 
+def _order_list_response(orders: List[models.Order], missing_table_name: str, headers: dict = None):
+    # ORM → 스키마 변환 1번, JSON 직렬화 1번으로 끝냅니다.
+    # (Response를 직접 돌려주므로 FastAPI가 response_model로 다시 검증하지 않음)
+    result = _to_order_responses(orders, missing_table_name)
+    return Response(content=_order_list_adapter.dump_json(result), media_type="application/json", headers=headers)
+
+# 응답을 Response로 직접 만들어 보내므로 response_model 대신 문서용 응답 모양만 적어 둡니다.
+@router.get("/stores/{store_id}/orders", response_model=None, responses={
+    200: {
+        "model": Union[List[schemas.OrderResponse], schemas.OrderFeedDelta],
+        "description": "기본: 미완료 주문 목록 / ?since=: 바뀐 주문만 담은 OrderFeedDelta"
+    },
+    304: {"description": "If-None-Match의 ETag와 피드 버전이 같음 (본문 없음, ?since= 없을 때만)"}
+})
+def read_store_orders(
+    store_id: int,
+    since: Optional[int] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(dependencies.get_current_user)
+):
+    """
+    주방 현황판 주문 목록.
+    - 기본: 미완료 주문 전체 + ETag(매장 피드 버전). 바뀐 게 없으면 304만 돌려줍니다.
+    - ?since=커서: 그 이후 바뀐 주문만 {"cursor", "orders"}로 돌려줍니다. (완료 처리된 주문 포함)
+    """
+    verify_store_permission(db, current_user, store_id)
+
+    # 버전을 먼저 읽어야 조회 도중 들어온 변경이 다음 폴링에서 빠지지 않습니다.
+    version = crud.get_feed_version(db, store_id)
+    etag = f'W/"{store_id}-{version}"'
+    headers = {"ETag": etag, "X-Feed-Cursor": str(version)}
+
+    # 테이블/상세 주문은 미리 한꺼번에 불러옵니다. (주문 수와 관계없이 쿼리 수 고정)
+    query = db.query(models.Order).options(
+        joinedload(models.Order.table),
+        selectinload(models.Order.items)
+    ).filter(
+        models.Order.store_id == store_id,
+        models.Order.payment_status.in_(KITCHEN_PAYMENT_STATUSES)
+    )
+
+    if since is not None:
+        if since >= version:
+            return Response(content=schemas.OrderFeedDelta(cursor=version).model_dump_json(), media_type="application/json", headers=headers)
+        orders = query.filter(models.Order.change_seq > since).order_by(models.Order.id.asc()).all()
+        delta = schemas.OrderFeedDelta(cursor=version, orders=_to_order_responses(orders, missing_table_name="알수없음"))
+        return Response(content=delta.model_dump_json(), media_type="application/json", headers=headers)
+
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    # ✨ [수정] "DEFERRED"(후불 대기) 상태인 주문도 주방 모니터에 뜨도록 리스트에 추가!
+    orders = query.filter(models.Order.is_completed == False).order_by(models.Order.id.asc()).all()
+    return _order_list_response(orders, missing_table_name="알수없음", headers=headers)
+
 @router.patch("/orders/{order_id}/complete")
 async def complete_order(order_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(dependencies.get_current_user)):
     order = db.query(models.Order).filter(models.Order.id == order_id).first()
@@ -128,11 +162,13 @@ async def complete_order(order_id: int, db: Session = Depends(get_db), current_u
         
     verify_store_permission(db, current_user, order.store_id)
     order.is_completed = True 
+    order.change_seq = crud.next_feed_version(db, order.store_id)
     db.commit()
+    sla_timer.untrack(order_id)
 
     # ✨ [추가된 부분] 매장의 다른 주방 모니터에도 완료되었다고 실시간 알림 전송
     try:
-        message = json.dumps({"type": "ORDER_COMPLETED", "order_id": order_id}, ensure_ascii=False)
+        message = events.OrderCompletedEvent(order_id=order_id).encode()
         await manager.broadcast(message, store_id=int(order.store_id))
     except: 
         pass
@@ -140,17 +176,171 @@ async def complete_order(order_id: int, db: Session = Depends(get_db), current_u
     return {"message": "Order completed"}
 
 
+@router.patch("/stores/{store_id}/orders/status", response_model=schemas.OrderBulkStatusResult)
+async def bulk_update_order_status(store_id: int, payload: schemas.OrderBulkStatusUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(dependencies.get_current_user)):
+    """
+    여러 주문을 한 번에 조리 시작(COOKING) 또는 완료(COMPLETED) 처리합니다.
+    권한 검사 1번, 조건부 UPDATE 1번, 웹소켓 알림 1번으로 끝납니다.
+    """
+    verify_store_permission(db, current_user, store_id)
+
+    order_ids = list(dict.fromkeys(payload.order_ids))
+    # 이 매장의 아직 완료되지 않은 주문만 바꿉니다. (다른 매장 주문 id가 섞여 와도 무시)
+    conditions = [
+        models.Order.store_id == store_id,
+        models.Order.id.in_(order_ids),
+        models.Order.is_completed == False
+    ]
+    if payload.status == "COOKING":
+        values = {"cooking_status": "COOKING"}
+        conditions.append(or_(models.Order.cooking_status.is_(None), models.Order.cooking_status != "COOKING"))
+    else:
+        values = {"is_completed": True}
+
+    values["change_seq"] = crud.next_feed_version(db, store_id)
+    stmt = update(models.Order).where(*conditions).values(**values).returning(models.Order.id)
+    updated_ids = sorted(db.execute(stmt).scalars().all())
+    if not updated_ids:
+        db.rollback() # 바뀐 주문이 없으면 피드 버전도 올리지 않습니다.
+    else:
+        db.commit()
+        if payload.status == "COMPLETED":
+            for order_id in updated_ids:
+                sla_timer.untrack(order_id)
+
+        try:
+            message = events.OrdersStatusChangedEvent(status=payload.status, order_ids=updated_ids).encode()
+            await manager.broadcast(message, store_id=store_id)
+        except:
+            pass
+
+    updated = set(updated_ids)
+    return {
+        "status": payload.status,
+        "updated_ids": updated_ids,
+        "skipped_ids": [order_id for order_id in order_ids if order_id not in updated]
+    }
+
+# =========================================================
+# ❌ 주문 취소 / 부분 환불
+# =========================================================
+
+# 취소할 수 있는 결제 상태 (결제 전 PENDING 주문은 PG 결제 창을 닫으면 그만이므로 제외)
+CANCELLABLE_PAYMENT_STATUSES = ["PAID", "DEFERRED", "PARTIAL_CANCELLED"]
+
+@router.post("/orders/{order_id}/cancel")
+async def cancel_order(order_id: int, payload: schemas.OrderCancelRequest, db: Session = Depends(get_db), current_user: models.User = Depends(dependencies.get_current_user)):
+    """
+    주문 전체 또는 일부 메뉴/금액을 취소합니다.
+    - 후불(PG 미결제) 주문은 주문/메뉴 취소 표시와 환불 기록을 한 트랜잭션으로 저장하고 바로 반영합니다.
+    - PG 결제 주문은 환불 기록(PENDING)만 남기고 응답합니다. 환불 대기열이 포트원 취소에 성공해야
+      주문/메뉴가 취소 상태로 바뀌고 주방에 ORDER_CANCELLED 알림이 갑니다. (환불 실패 시 주문은 그대로라 다시 취소 가능)
+    """
+    # 동시에 두 번 취소해도 환불 가능 금액을 한 번만 쓰도록 주문 행을 잠급니다.
+    order = db.query(models.Order).options(selectinload(models.Order.items)).filter(models.Order.id == order_id).with_for_update().first()
+    if not order:
+        raise HTTPException(status_code=404, detail="주문을 찾을 수 없습니다.")
+
+    verify_store_permission(db, current_user, order.store_id)
+    if order.payment_status not in CANCELLABLE_PAYMENT_STATUSES:
+        raise HTTPException(status_code=400, detail="취소할 수 없는 주문 상태입니다.")
+
+    items_by_id = {item.id: item for item in order.items}
+    refunding_item_ids = crud.get_refunding_item_ids(db, order.id)
+    target_items = []
+    for item_id in dict.fromkeys(payload.cancelled_item_ids):
+        item = items_by_id.get(item_id)
+        if not item:
+            raise HTTPException(status_code=400, detail=f"이 주문에 없는 메뉴입니다 (ID: {item_id})")
+        if item.is_cancelled or item.id in refunding_item_ids:
+            raise HTTPException(status_code=400, detail=f"이미 취소된 메뉴입니다 (ID: {item_id})")
+        target_items.append(item)
+
+    refundable = crud.get_refundable_amount(db, order)
+    items_amount = min(sum(item.price * item.quantity for item in target_items), refundable)
+    if payload.amount is not None:
+        amount = payload.amount
+        if target_items:
+            # 메뉴와 금액을 함께 보내면 금액은 선택한 메뉴 금액까지만 허용하고,
+            # 메뉴 금액 전부를 돌려줄 때만 메뉴를 취소 표시합니다. (적은 금액 환불로 비싼 메뉴가 취소되지 않도록)
+            if amount > items_amount:
+                raise HTTPException(status_code=400, detail=f"선택한 메뉴 금액({items_amount}원)보다 많이 취소할 수 없습니다.")
+            if amount < items_amount:
+                target_items = []
+    elif target_items:
+        amount = items_amount
+    else:
+        amount = refundable # 금액/메뉴 지정이 없으면 남은 금액 전액 취소
+    if amount <= 0 or amount > refundable:
+        raise HTTPException(status_code=400, detail=f"취소 가능 금액({refundable}원)을 확인해주세요.")
+
+    is_full_cancel = amount == refundable
+    if not order.imp_uid:
+        # 후불(PG 미결제) 주문은 돌려줄 결제가 없으므로 바로 취소 반영 (부분 취소는 남은 금액을 계속 '후불 대기'로 둠)
+        for item in (order.items if is_full_cancel else target_items):
+            item.is_cancelled = True
+        if is_full_cancel:
+            order.payment_status = "CANCELLED"
+        order.change_seq = crud.next_feed_version(db, order.store_id)
+
+    # PG 결제 주문의 checksum(남은 결제 금액)은 환불 대기열이 앞선 환불을 끝낸 뒤 보낼 때 확정합니다.
+    refund = models.OrderRefund(
+        order_id=order.id,
+        store_id=order.store_id,
+        imp_uid=order.imp_uid,
+        amount=amount,
+        reason=payload.reason,
+        cancelled_item_ids=json.dumps([item.id for item in target_items]),
+        status="PENDING" if order.imp_uid else "DONE"
+    )
+    db.add(refund)
+    db.flush()
+    refund_id, store_id, payment_status = refund.id, order.store_id, order.payment_status
+    message = None if order.imp_uid else events.OrderCancelledEvent.from_refund(order, refund).encode()
+    db.commit()
+
+    if message is None:
+        refund_queue.enqueue(refund_id)
+    else:
+        if is_full_cancel:
+            sla_timer.untrack(order_id)
+        try:
+            await manager.broadcast(message, store_id=store_id)
+        except:
+            pass
+
+    return {
+        "status": "REFUND_PENDING" if message is None else "CANCELLED",
+        "refund_id": refund_id,
+        "payment_status": payment_status,
+        "amount": amount,
+        "refundable_amount": refundable - amount
+    }
+
 # =========================================================
 # 💳 포트원(아임포트) 결제 사후 검증
 # =========================================================
 
 @router.post("/payments/complete")
-async def verify_payment(payload: schemas.PaymentVerifyRequest, db: Session = Depends(get_db)):
+async def verify_payment(payload: schemas.PaymentVerifyRequest, db: Session = Depends(get_db), idempotency_key: Optional[str] = Header(None)):
+    # 재시도 요청은 PG 검증을 다시 하지 않고 첫 응답을 재전송
+    replayed = await run_in_threadpool(idempotency.begin, "payments", idempotency_key, payload)
+    if replayed:
+        return replayed
+    try:
+        with metrics.PAYMENT_VERIFY_CLIENT.time():
+            result = await _verify_payment(payload, db)
+    except Exception:
+        await run_in_threadpool(idempotency.abort, "payments", idempotency_key)
+        raise
+    return await run_in_threadpool(idempotency.complete, "payments", idempotency_key, payload, result)
+
+async def _verify_payment(payload: schemas.PaymentVerifyRequest, db: Session):
     clean_imp_uid = payload.imp_uid.strip()
     clean_merchant_uid = payload.merchant_uid.strip()
     
     try: 
-        order_id = int(clean_merchant_uid.split("_")[1])
+        order_id = parse_order_id(clean_merchant_uid)
     except: 
         raise HTTPException(status_code=400, detail="잘못된 주문 번호 형식")
 
@@ -158,76 +348,32 @@ async def verify_payment(payload: schemas.PaymentVerifyRequest, db: Session = De
     if not order: 
         raise HTTPException(status_code=404, detail="주문을 찾을 수 없습니다.")
         
-    if order.payment_status == "PAID": 
+    # 결제 대기(PENDING)가 아니면 이미 정산된 주문 (환불로 취소된 주문을 다시 PAID로 되돌리지 않음)
+    if order.payment_status != "PENDING":
         return {"status": "already_paid", "message": "이미 처리된 주문입니다."}
 
     try:
-        # 1. 포트원 인증 토큰 발급
-        token_res = requests.post(
-            "https://api.iamport.kr/users/getToken", 
-            json={"imp_key": PORTONE_API_KEY, "imp_secret": PORTONE_API_SECRET}
-        )
-        if token_res.status_code != 200: 
-            raise HTTPException(status_code=500, detail="PG사 토큰 발급 실패") 
-        access_token = token_res.json()["response"]["access_token"]
-
-        payment_data = None
-        
-        # 2. imp_uid로 결제 정보 조회
-        res1 = requests.get(
-            f"https://api.iamport.kr/payments/{clean_imp_uid}", 
-            headers={"Authorization": access_token}
-        )
-        if res1.status_code == 200: 
-            payment_data = res1.json().get("response")
-        
-        # 3. (혹시 실패시) merchant_uid로 결제 정보 재조회
-        if not payment_data:
-            res2 = requests.get(
-                f"https://api.iamport.kr/payments/find/{clean_merchant_uid}", 
-                headers={"Authorization": access_token}
-            )
-            if res2.status_code == 200: 
-                payment_data = res2.json().get("response")
+        # 1. imp_uid(실패 시 merchant_uid)로 결제 정보 조회 (토큰은 클라이언트가 캐시해서 재사용)
+        payment_data = await fetch_payment(clean_imp_uid, clean_merchant_uid)
 
         if not payment_data: 
             raise HTTPException(status_code=404, detail="결제 정보를 찾을 수 없습니다.")
             
-        # 4. 결제 금액 변조 확인 (매우 중요)
-        if int(payment_data['amount']) != order.total_price: 
-            raise HTTPException(status_code=400, detail="결제 금액 불일치 (위변조 의심)")
-
-        # 5. DB 업데이트
-        order.payment_status = "PAID"
-        order.imp_uid = clean_imp_uid
-        order.merchant_uid = clean_merchant_uid
-        order.paid_amount = payment_data['amount']
-        db.commit()
+        # 2. 결제 상태/주문 번호/금액 변조 확인 (매우 중요, 다른 주문의 결제 건 재사용 방지)
+        mismatch = payment_mismatch(payment_data, clean_merchant_uid, order.total_price)
+        if mismatch:
+            raise HTTPException(status_code=400, detail=mismatch)
+        if imp_uid_taken(db, clean_imp_uid, order.id):
+            raise HTTPException(status_code=400, detail="다른 주문에 이미 사용된 결제 건입니다.")
 
-        # 6. 매장 POS(주문 모니터)로 웹소켓 실시간 알림 전송
+        # 3. DB 업데이트 (웹훅 워커가 먼저 처리했다면 알림은 보내지 않음)
+        if not mark_order_paid(db, order.id, order.store_id, clean_imp_uid, clean_merchant_uid, payment_data['amount']):
+            return {"status": "already_paid", "message": "이미 처리된 주문입니다."}
+        sla_timer.track(order.id, order.store_id, order_deadline(order.created_at, order.target_time))
+
+        # 4. 매장 POS(주문 모니터)로 웹소켓 실시간 알림 전송
         try:
-            items_list = [
-                {
-                    "menu_name": item.menu_name, 
-                    "quantity": item.quantity, 
-                    "options": item.options_desc or ""
-                } for item in order.items
-            ]
-            
-            created_at_val = order.created_at
-            created_at_str = created_at_val.strftime("%Y-%m-%d %H:%M:%S") if hasattr(created_at_val, 'strftime') else str(created_at_val)
-
-            message = json.dumps({
-                "type": "NEW_ORDER", 
-                "order_id": order.id, 
-                "daily_number": order.daily_number,
-                "table_name": order.table.name if order.table else "Unknown", 
-                "created_at": created_at_str, 
-                "items": items_list
-            }, ensure_ascii=False)
-            
-            await manager.broadcast(message, store_id=int(order.store_id))
-            
+            await manager.broadcast(events.NewOrderEvent.from_order(order).encode(), store_id=int(order.store_id))
         except: 
             pass # 웹소켓 전송에 실패해도 결제는 정상 완료 처리되어야 함
 
@@ -237,29 +383,73 @@ async def verify_payment(payload: schemas.PaymentVerifyRequest, db: Session = De
         # 치명적 오류 발생 시 디스코드로 알림
         send_discord_alert(f"결제 검증 중 치명적 에러 발생!\n주문번호: {order_id}\n내용: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
-    
+
+@router.post("/payments/webhook")
+async def portone_webhook(payload: schemas.PortOneWebhookRequest):
+    # 포트원 서버 → 우리 서버 결제 알림. 대기열에 넣기만 하고 즉시 응답합니다.
+    # (실제 검증/PAID 처리/주방 알림은 백그라운드 워커가 수행)
+    if payload.status and payload.status != "paid":
+        return {"status": "ignored"}
+
+    if not payment_queue.enqueue(payload.imp_uid.strip(), payload.merchant_uid.strip()):
+        # 대기열이 가득 찬 경우 5xx를 돌려주면 포트원이 나중에 재전송합니다.
+        raise HTTPException(status_code=503, detail="결제 확인 대기열이 가득 찼습니다.")
+    return {"status": "queued"}
+
     # =========================================================
 # 🕰️ 과거 주문 내역 조회 (결제 내역)
 # =========================================================
 
+HISTORY_PAGE_SIZE = 100
+HISTORY_MAX_PAGE_SIZE = 500
+
 @router.get("/stores/{store_id}/orders/history", response_model=List[schemas.OrderResponse])
-def read_store_order_history(store_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(dependencies.get_current_user)):
+def read_store_order_history(
+    store_id: int,
+    cursor: Optional[int] = None,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    payment_status: Optional[str] = None,
+    table_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(dependencies.get_current_user)
+):
+    """
+    과거 주문 내역 (최신순, 커서 기반 페이지).
+    - 다음 페이지가 있으면 X-Next-Cursor 헤더에 커서가 담기며, ?cursor=값으로 이어서 조회합니다.
+    - OFFSET 없이 (store_id, id) 인덱스에서 커서 다음 위치부터 읽으므로 몇 페이지를 넘겨도 속도가 같습니다.
+    """
     # 1. 권한 검사 (내 매장이 맞는지)
     verify_store_permission(db, current_user, store_id)
-    
-    # 2. 해당 매장의 전체 주문 내역을 최신순(id.desc)으로 최대 100개까지 불러옵니다.
-    orders = db.query(models.Order).filter(
+
+    # 2. 해당 매장의 주문 내역을 최신순(id.desc)으로 한 페이지씩 불러옵니다.
+    # (주문 id는 생성 순서대로 증가하므로 id 순서 = 주문 시각 순서)
+    query = db.query(models.Order).options(
+        joinedload(models.Order.table),
+        selectinload(models.Order.items)
+    ).filter(
         models.Order.store_id == store_id
-    ).order_by(models.Order.id.desc()).limit(100).all()
+    )
+    if cursor is not None:
+        query = query.filter(models.Order.id < cursor)
+    if start_date or end_date:
+        start_dt, end_dt = parse_date_range(start_date or "1970-01-01", end_date or "9999-12-30")
+        query = query.filter(models.Order.created_at >= start_dt, models.Order.created_at < end_dt)
+    if payment_status:
+        query = query.filter(models.Order.payment_status == payment_status)
+    if table_id is not None:
+        query = query.filter(models.Order.table_id == table_id)
 
-    result = []
-    for o in orders:
-        order_data = schemas.OrderResponse.model_validate(o).model_dump()
-        # 테이블 이름 매핑 (테이블이 삭제되었거나 포장 주문일 경우 예외 처리)
-        order_data["table_name"] = o.table.name if o.table else "포장/미지정"
-        result.append(order_data)
-        
-    return result
+    # 한 개 더 읽어서 다음 페이지가 있는지 판단합니다. (COUNT 쿼리 없음)
+    orders = query.order_by(models.Order.id.desc()).limit(limit + 1).all()
+    headers = {}
+    if len(orders) > limit:
+        orders = orders[:limit]
+        headers["X-Next-Cursor"] = str(orders[-1].id)
+
+    # 테이블이 삭제되었거나 포장 주문일 경우 예외 처리
+    return _order_list_response(orders, missing_table_name="포장/미지정", headers=headers)
 
 # =========================================================
 # ✨ [신규 추가] 조리 시작 상태로 변경 API
@@ -274,6 +464,7 @@ async def update_cooking_status(order_id: int, db: Session = Depends(get_db), cu
     
     # 상태를 COOKING(조리중)으로 업데이트하고 저장
     order.cooking_status = "COOKING"
+    order.change_seq = crud.next_feed_version(db, order.store_id)
     db.commit()
     
     return {"message": "조리 시작 상태로 변경되었습니다."}
@@ -289,5 +480,13 @@ async def update_order_target_time(order_id: int, time_change: int, db: Session
     if new_time < 5: new_time = 5 # 최소 조리 시간은 5분으로 제한
         
     order.target_time = new_time
+    order.change_seq = crud.next_feed_version(db, order.store_id)
+    # 조리 중인 주문이면 바뀐 마감 시각으로 SLA 타이머를 다시 맞춥니다. (취소/완료된 주문은 다시 켜지 않음)
+    is_open = order.payment_status in SLA_PAYMENT_STATUSES and not order.is_completed
+    order_id, store_id, due_at = order.id, order.store_id, order_deadline(order.created_at, new_time)
     db.commit()
+    if is_open:
+        sla_timer.track(order_id, store_id, due_at)
+    else:
+        sla_timer.untrack(order_id)
     return {"message": "시간이 업데이트 되었습니다.", "target_time": new_time}
\ No newline at end of file
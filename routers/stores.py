@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from typing import List
 
@@ -6,11 +6,16 @@ from typing import List
 import models
 import schemas
 import crud
+import auth
 import dependencies
 from database import get_db
+from connection_manager import manager
 
 # 공통 함수 (utils.py)
-from utils import verify_store_permission, create_audit_log
+from utils import verify_store_permission, create_audit_log, parse_date_range
+from principals import invalidate_principal
+from tenancy import tenancy_index
+from store_menu import get_store_menu_snapshot
 
 # ✨ 라우터 생성
 router = APIRouter(tags=["Stores & Brands"])
@@ -72,9 +77,10 @@ def create_store(store: schemas.StoreCreate, db: Session = Depends(get_db), curr
     
     # 점주가 직접 생성한 경우 자신의 계정에 매장 ID 연결
     if current_user.role == models.UserRole.STORE_OWNER:
-        current_user.store_id = new_store.id
-        db.add(current_user)
+        db.query(models.User).filter(models.User.id == current_user.id).update({"store_id": new_store.id}, synchronize_session=False)
         db.commit()
+        invalidate_principal(current_user.email)
+        auth.revoke_user_tokens(current_user.id) # 토큰의 store_id가 바뀌었으므로 리프레시로 새 토큰을 받아야 함
         
     create_audit_log(
         db=db, user_id=current_user.id, action="CREATE_STORE", 
@@ -85,24 +91,11 @@ def create_store(store: schemas.StoreCreate, db: Session = Depends(get_db), curr
 
 @router.get("/stores/{store_id}", response_model=schemas.StoreResponse)
 def read_store(store_id: int, db: Session = Depends(get_db)):
-    db_store = crud.get_store(db, store_id=store_id)
-    if not db_store: 
+    # 손님 QR 접속마다 호출되므로, 메뉴판까지 조립·직렬화해 둔 스냅샷을 그대로 보냅니다.
+    snapshot = get_store_menu_snapshot(db, store_id)
+    if not snapshot: 
         raise HTTPException(status_code=404, detail="Store not found")
-        
-    store_data = schemas.StoreResponse.model_validate(db_store).model_dump()
-    
-    # 메뉴별 연결된 옵션 그룹 정보를 조합
-    for category in store_data.get("categories", []):
-        for menu in category.get("menus", []):
-            links = db.query(models.MenuOptionLink).filter(models.MenuOptionLink.menu_id == menu["id"]).order_by(models.MenuOptionLink.order_index).all()
-            option_groups = []
-            for link in links:
-                og = db.query(models.OptionGroup).filter(models.OptionGroup.id == link.option_group_id).first()
-                if og: 
-                    option_groups.append(schemas.OptionGroupResponse.model_validate(og).model_dump())
-            menu["option_groups"] = option_groups
-            
-    return store_data
+    return Response(content=snapshot.body, media_type="application/json")
 
 @router.get("/groups/my/stores", response_model=List[schemas.StoreResponse])
 def read_my_stores(db: Session = Depends(get_db), current_user: models.User = Depends(dependencies.get_current_user)):
@@ -240,23 +233,31 @@ def get_hq_sales_stats(start_date: str, end_date: str, db: Session = Depends(get
     if current_user.role not in [models.UserRole.SUPER_ADMIN, models.UserRole.BRAND_ADMIN, models.UserRole.GROUP_ADMIN]:
         raise HTTPException(status_code=403, detail="본사 관리자만 접근할 수 있습니다.")
         
+    start_dt, end_dt = parse_date_range(start_date, end_date)
+    empty_stats = {"total_revenue": 0, "total_order_count": 0, "total_royalty_fee": 0, "store_stats": []}
+
+    # 브랜드/그룹 소속 매장 ID는 메모리 색인에서 꺼내고, 매장 정보는 PK로만 조회
     query = db.query(models.Store)
-    if current_user.role == models.UserRole.BRAND_ADMIN: 
-        query = query.filter(models.Store.brand_id == current_user.brand_id)
-    elif current_user.role == models.UserRole.GROUP_ADMIN: 
-        query = query.filter(models.Store.group_id == current_user.group_id)
+    if current_user.role in [models.UserRole.BRAND_ADMIN, models.UserRole.GROUP_ADMIN]:
+        if current_user.role == models.UserRole.BRAND_ADMIN:
+            scoped_ids = tenancy_index.stores_of_brand(current_user.brand_id)
+        else:
+            scoped_ids = tenancy_index.stores_of_group(current_user.group_id)
+        if not scoped_ids:
+            return empty_stats
+        query = query.filter(models.Store.id.in_(scoped_ids))
         
     stores = query.all()
     store_ids = [s.id for s in stores]
 
     if not store_ids: 
-        return {"total_revenue": 0, "total_order_count": 0, "total_royalty_fee": 0, "store_stats": []}
+        return empty_stats
 
     orders = db.query(models.Order).filter(
         models.Order.store_id.in_(store_ids), 
         models.Order.payment_status == "PAID", 
-        models.Order.created_at >= f"{start_date} 00:00:00", 
-        models.Order.created_at <= f"{end_date} 23:59:59"
+        models.Order.created_at >= start_dt, 
+        models.Order.created_at < end_dt
     ).all()
     
     total_rev = sum(o.total_price for o in orders)
@@ -293,12 +294,13 @@ def get_hq_sales_stats(start_date: str, end_date: str, db: Session = Depends(get
 @router.get("/stores/{store_id}/stats") 
 def get_store_stats(store_id: int, start_date: str, end_date: str, db: Session = Depends(get_db), current_user: models.User = Depends(dependencies.get_current_user)):
     verify_store_permission(db, current_user, store_id)
+    start_dt, end_dt = parse_date_range(start_date, end_date)
     
     orders = db.query(models.Order).filter(
         models.Order.store_id == store_id, 
         models.Order.payment_status == "PAID", 
-        models.Order.created_at >= f"{start_date} 00:00:00", 
-        models.Order.created_at <= f"{end_date} 23:59:59"
+        models.Order.created_at >= start_dt, 
+        models.Order.created_at < end_dt
     ).all()
     
     total_revenue = sum(o.total_price for o in orders)
@@ -308,8 +310,8 @@ def get_store_stats(store_id: int, start_date: str, end_date: str, db: Session =
 
     for order in orders:
         try:
-            d_part, t_part = str(order.created_at).split(" ")
-            order_hour, order_month = t_part.split(":")[0], d_part[:7]
+            created_at = order.created_at.astimezone()
+            d_part, order_hour, order_month = created_at.strftime("%Y-%m-%d"), created_at.strftime("%H"), created_at.strftime("%Y-%m")
             hourly_data[order_hour] += order.total_price
             
             if d_part not in daily_data: 
@@ -340,4 +342,14 @@ def get_store_stats(store_id: int, start_date: str, end_date: str, db: Session =
         "hourly_stats": [{"hour": k, "sales": v} for k, v in hourly_data.items()],
         "daily_stats": [{"date": k, "sales": v["sales"], "count": v["count"]} for k, v in sorted(daily_data.items(), reverse=True)],
         "monthly_stats": [{"month": k, "sales": v["sales"], "count": v["count"]} for k, v in sorted(monthly_data.items(), reverse=True)]
-    }
\ No newline at end of file
+    }
+
+# =========================================================
+# 📡 매장 기기 연결 현황
+# =========================================================
+
+@router.get("/stores/{store_id}/connections", response_model=schemas.StoreConnectionStats)
+def get_store_connections(store_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(dependencies.get_current_user)):
+    # 워커가 여러 개면 요청을 받은 워커 기준 숫자입니다. (응답 없는 연결은 하트비트 주기마다 정리됨)
+    verify_store_permission(db, current_user, store_id)
+    return {"store_id": store_id, **manager.connection_counts(store_id)}
@@ -8,6 +8,7 @@ import models
 import schemas
 import dependencies
 from database import get_db
+from tenancy import tenancy_index
 
 # ✨ 라우터 생성
 router = APIRouter(tags=["System & Notices"])
@@ -49,9 +50,9 @@ def get_unread_notices(db: Session = Depends(get_db), current_user: models.User
         target_filters.append(and_(models.Notice.target_type == "STORE", models.Notice.target_store_id == current_user.store_id))
         
         # 소속 매장의 상위 브랜드 공지도 볼 수 있도록 처리
-        user_store = db.query(models.Store).filter(models.Store.id == current_user.store_id).first()
-        if user_store and user_store.brand_id: 
-            target_filters.append(and_(models.Notice.target_type == "BRAND", models.Notice.target_brand_id == user_store.brand_id))
+        store_brand_id = tenancy_index.brand_of(db, current_user.store_id)
+        if store_brand_id: 
+            target_filters.append(and_(models.Notice.target_type == "BRAND", models.Notice.target_brand_id == store_brand_id))
             
     return db.query(models.Notice).filter(and_(*filters), or_(*target_filters)).order_by(models.Notice.created_at.asc()).all()
 
@@ -84,9 +85,9 @@ def get_my_notices(db: Session = Depends(get_db), current_user: models.User = De
     if current_user.store_id:
         target_filters.append(and_(models.Notice.target_type == "STORE", models.Notice.target_store_id == current_user.store_id))
         
-        user_store = db.query(models.Store).filter(models.Store.id == current_user.store_id).first()
-        if user_store and user_store.brand_id: 
-            target_filters.append(and_(models.Notice.target_type == "BRAND", models.Notice.target_brand_id == user_store.brand_id))
+        store_brand_id = tenancy_index.brand_of(db, current_user.store_id)
+        if store_brand_id: 
+            target_filters.append(and_(models.Notice.target_type == "BRAND", models.Notice.target_brand_id == store_brand_id))
     
     notices = db.query(models.Notice).filter(or_(*target_filters)).order_by(models.Notice.created_at.desc()).all()
     read_notice_ids = {r.notice_id for r in db.query(models.NoticeRead).filter(models.NoticeRead.user_id == current_user.id).all()}
@@ -1,4 +1,3 @@
-import json
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
@@ -7,6 +6,7 @@ from typing import List
 import models
 import schemas
 import crud
+import events
 import dependencies
 from database import get_db
 from connection_manager import manager  # 호출 알림을 위해 웹소켓 매니저 임포트
@@ -99,10 +99,11 @@ async def create_staff_call(store_id: int, call: schemas.StaffCallCreate, db: Se
 
     # 매장 관리자 페이지(WebSocket)로 실시간 알림 전송
     try:
-        message = json.dumps({
-            "type": "NEW_CALL", 
-            "message": f"🔔 새로운 직원 호출: {call.message}"
-        }, ensure_ascii=False)
+        message = events.NewCallEvent(
+            call_id=new_call.id,
+            table_id=new_call.table_id,
+            message=f"🔔 새로운 직원 호출: {call.message}"
+        ).encode()
         await manager.broadcast(message, store_id=store_id)
     except: 
         pass
@@ -142,7 +143,7 @@ async def complete_staff_call(call_id: int, db: Session = Depends(get_db), curre
     
     # ✨ [추가된 부분] 다른 화면에서도 직원 호출 카드 지우기
     try:
-        message = json.dumps({"type": "CALL_COMPLETED", "call_id": call_id}, ensure_ascii=False)
+        message = events.CallCompletedEvent(call_id=call_id).encode()
         await manager.broadcast(message, store_id=int(call.store_id))
     except: 
         pass
@@ -1,7 +1,16 @@
-from pydantic import BaseModel, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing import List, Literal, Optional
+from datetime import datetime
 from models import UserRole 
 
+def format_timestamp(value):
+    # DB의 타임존 포함 시각을 기존 응답 형식("YYYY-MM-DD HH:MM:SS.ffffff", 서버 현지 시각)으로 맞춥니다.
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone().replace(tzinfo=None)
+        return str(value)
+    return value
+
 # --- 브랜드(본사) 스키마 ---
 class BrandBase(BaseModel):
     name: str
@@ -316,6 +325,28 @@ class OrderResponse(OrderBase):
     target_time: Optional[int] = 15
     model_config = ConfigDict(from_attributes=True)
 
+    _format_created_at = field_validator("created_at", mode="before")(format_timestamp)
+
+# ✨ [신규] 주방 현황판 델타 응답 (?since=커서 이후 바뀐 주문만, 완료된 주문은 is_completed=true로 내려가 화면에서 제거)
+class OrderFeedDelta(BaseModel):
+    cursor: int
+    orders: List[OrderResponse] = []
+
+# ✨ [신규] 주방 일괄 상태 변경 (마감 시 여러 주문을 한 번에 조리 시작/완료 처리)
+class OrderBulkStatusUpdate(BaseModel):
+    order_ids: List[int] = Field(..., min_length=1, max_length=500)
+    status: Literal["COOKING", "COMPLETED"]
+
+class OrderBulkStatusResult(BaseModel):
+    status: str
+    updated_ids: List[int] = []
+    skipped_ids: List[int] = []  # 다른 매장 주문, 이미 처리된 주문, 없는 주문
+
+class StoreConnectionStats(BaseModel):
+    store_id: int
+    connected: int  # 이 서버 워커에 붙어 있는 웹소켓 연결 수
+    live: int       # 그중 하트비트(PING/PONG)에 제때 답하고 있는 기기 수
+
 class UserResponse(UserBase):
     id: int
     is_active: bool
@@ -351,13 +382,26 @@ class StaffCallResponse(BaseModel):
     is_completed: bool
     model_config = ConfigDict(from_attributes=True)
 
+    _format_created_at = field_validator("created_at", mode="before")(format_timestamp)
+
 class PaymentVerifyRequest(BaseModel):
     imp_uid: str
     merchant_uid: str
 
+# ✨ [신규] 포트원 웹훅 수신 스키마
+class PortOneWebhookRequest(BaseModel):
+    imp_uid: str
+    merchant_uid: str
+    status: Optional[str] = None
+
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # 액세스 토큰 유효 시간 (초)
+
+class TokenRefreshRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     email: Optional[str] = None
@@ -401,4 +445,4 @@ class NoticeCreate(BaseModel):
 class OrderCancelRequest(BaseModel):
     reason: str = "관리자 화면에서 직접 취소"
     amount: Optional[int] = None  # 값이 없으면 '전액 취소', 값이 있으면 '부분 취소'
-    cancelled_item_ids: List[int] = []  # ✨ [신규 추가] 취소하려고 체크한 메뉴 아이템의 ID 목록
\ No newline at end of file
+    cancelled_item_ids: List[int] = []  # ✨ [신규 추가] 취소하려고 체크한 메뉴 아이템의 ID 목록 (amount와 함께 보내면 amount는 메뉴 금액 이하)
\ No newline at end of file
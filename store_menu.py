@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+from typing import Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.util import identity_key
+
+import models
+import schemas
+
+# 다른 워커에서 바뀐 메뉴도 결국 반영되도록 하는 안전장치 (초)
+MENU_SNAPSHOT_TTL_SECONDS = float(os.getenv("MENU_SNAPSHOT_TTL_SECONDS", "60"))
+
+# 이 모델들이 바뀌면 GET /stores/{store_id} 응답(매장 정보 + 메뉴판)이 달라집니다.
+SNAPSHOT_MODELS = (
+    models.Store, models.Category, models.Menu, models.OptionGroup, models.Option,
+    models.Table, models.OperatingHour, models.Holiday,
+)
+
+class StoreMenuSnapshot:
+    """매장 정보 + 메뉴판 전체를 한 번 직렬화해 둔 JSON (손님 QR 접속마다 그대로 전송)"""
+    __slots__ = ("store_id", "body", "loaded_at")
+
+    def __init__(self, store_id: int, body: bytes):
+        self.store_id = store_id
+        self.body = body
+        self.loaded_at = time.monotonic()
+
+def build_store_response(db: Session, store_id: int) -> Optional[schemas.StoreResponse]:
+    """
+    메뉴 수와 상관없이 고정된 쿼리 수로 매장 응답을 조립합니다.
+    - 매장 + 카테고리/메뉴/테이블/영업시간/휴일: selectinload (관계당 IN 쿼리 1개)
+    - 메뉴-옵션 그룹 연결: 매장 전체를 한 번에 조회 후 메뉴별로 메모리에서 묶음
+    - 옵션 그룹 + 옵션: 연결된 그룹 ID로 한 번에 조회
+    """
+    store = db.query(models.Store).options(
+        selectinload(models.Store.categories).selectinload(models.Category.menus),
+        selectinload(models.Store.tables),
+        selectinload(models.Store.operating_hours),
+        selectinload(models.Store.holidays),
+    ).filter(models.Store.id == store_id).first()
+    if not store:
+        return None
+
+    links = db.query(models.MenuOptionLink).join(models.Menu, models.Menu.id == models.MenuOptionLink.menu_id).filter(
+        models.Menu.store_id == store_id
+    ).order_by(models.MenuOptionLink.menu_id, models.MenuOptionLink.order_index).all()
+
+    groups = {}
+    group_ids = {link.option_group_id for link in links}
+    if group_ids:
+        for og in db.query(models.OptionGroup).options(selectinload(models.OptionGroup.options)).filter(models.OptionGroup.id.in_(group_ids)):
+            groups[og.id] = schemas.OptionGroupResponse.model_validate(og)
+
+    groups_by_menu = {}
+    for link in links:
+        og = groups.get(link.option_group_id)
+        if og is not None:
+            groups_by_menu.setdefault(link.menu_id, []).append(og)
+
+    response = schemas.StoreResponse.model_validate(store)
+    for category in response.categories:
+        for menu in category.menus:
+            menu.option_groups = groups_by_menu.get(menu.id, [])
+    return response
+
+class StoreMenuCache:
+    """
+    store_id → StoreMenuSnapshot (워커 프로세스 단위).
+    - 이 워커의 변경은 커밋 직후 해당 매장 스냅샷을 버리고, 다른 워커의 변경은 TTL로 반영됩니다.
+    - 조립 중에 무효화가 일어나면 (세대 번호가 바뀌면) 조립한 결과를 저장하지 않습니다.
+    """
+    def __init__(self, ttl: float = MENU_SNAPSHOT_TTL_SECONDS):
+        self.ttl = ttl
+        self._snapshots: Dict[int, StoreMenuSnapshot] = {}
+        self._generations: Dict[int, int] = {}
+        self._global_generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, store_id: int) -> Optional[StoreMenuSnapshot]:
+        snapshot = self._snapshots.get(store_id)
+        if snapshot and time.monotonic() - snapshot.loaded_at < self.ttl:
+            return snapshot
+
+        generation = self._generation(store_id)
+        response = build_store_response(db, store_id)
+        if response is None:
+            return None
+
+        snapshot = StoreMenuSnapshot(store_id, response.model_dump_json().encode())
+        with self._lock:
+            if self._generation(store_id) == generation:
+                self._snapshots[store_id] = snapshot
+        return snapshot
+
+    def _generation(self, store_id: int):
+        return self._global_generation, self._generations.get(store_id, 0)
+
+    def invalidate(self, store_id: int):
+        with self._lock:
+            self._generations[store_id] = self._generations.get(store_id, 0) + 1
+            self._snapshots.pop(store_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._global_generation += 1
+            self._generations.clear()
+            self._snapshots.clear()
+
+    def __len__(self):
+        return len(self._snapshots)
+
+# 전역에서 하나만 쓸 매장 메뉴판 캐시
+store_menu_cache = StoreMenuCache()
+
+def get_store_menu_snapshot(db: Session, store_id: int) -> Optional[StoreMenuSnapshot]:
+    return store_menu_cache.get(db, store_id)
+
+def invalidate_store_menu(store_id: int):
+    # query.update()/delete() 같은 일괄 쿼리로 메뉴를 바꿨다면 커밋 후 직접 호출하세요.
+    store_menu_cache.invalidate(store_id)
+
+# ✨ 메뉴/카테고리/옵션/연결/매장 정보 변경을 flush 때 모아 두었다가 커밋이 끝나면 스냅샷을 버립니다. (롤백되면 버림)
+@event.listens_for(Session, "after_flush")
+def _collect_menu_changes(session, flush_context):
+    changed = session.info.setdefault("menu_snapshot_changes", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, models.Store):
+            if obj.id is not None:
+                changed.add(obj.id)
+        elif isinstance(obj, SNAPSHOT_MODELS):
+            if obj.store_id is not None:
+                changed.add(obj.store_id)
+        elif isinstance(obj, models.MenuOptionLink):
+            # 연결 테이블에는 store_id가 없으므로 같은 세션에 올라와 있는 메뉴에서 찾습니다. (못 찾으면 전체 무효화)
+            menu = session.identity_map.get(identity_key(models.Menu, obj.menu_id))
+            changed.add(menu.store_id if menu is not None else None)
+    if not changed:
+        session.info.pop("menu_snapshot_changes", None)
+
+@event.listens_for(Session, "after_commit")
+def _apply_menu_changes(session):
+    changed = session.info.pop("menu_snapshot_changes", None)
+    if not changed:
+        return
+    if None in changed:
+        store_menu_cache.clear()
+        return
+    for store_id in changed:
+        store_menu_cache.invalidate(store_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_menu_changes(session):
+    session.info.pop("menu_snapshot_changes", None)
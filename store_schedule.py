@@ -0,0 +1,121 @@
+import json
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import models
+
+# 다른 워커에서 바뀐 영업시간도 결국 반영되도록 하는 안전장치 (초)
+SCHEDULE_TTL_SECONDS = 60
+DEFAULT_OPEN_TIME = "09:00"
+
+class DaySchedule:
+    def __init__(self, open_time: Optional[str], close_time: Optional[str], is_closed: bool, breaks: List[Tuple[str, str]]):
+        self.open_time = open_time or DEFAULT_OPEN_TIME
+        self.close_time = close_time
+        self.is_closed = is_closed
+        # 시작 시각 기준으로 정렬된 브레이크 타임 ("HH:MM" 문자열은 사전순 비교 = 시간순 비교)
+        self.breaks = sorted(breaks)
+        self._break_starts = [start for start, _ in self.breaks]
+
+    def current_break(self, hhmm: str):
+        # 현재 시각 이전에 시작한 브레이크만 뒤에서부터 검사 (겹치는 구간 대비)
+        idx = bisect_right(self._break_starts, hhmm)
+        for start, end in reversed(self.breaks[:idx]):
+            if hhmm <= end:
+                return start, end
+        return None
+
+class StoreSchedule:
+    """
+    매장 영업시간/브레이크 타임/휴일을 한 번 컴파일해 둔 객체.
+    주문 시점의 "지금 주문 받을 수 있나?" 판단을 DB 조회 없이 처리합니다.
+    """
+    def __init__(self, store_id: int, days: Dict[int, DaySchedule], holidays: set):
+        self.store_id = store_id
+        self.days = days
+        self.holidays = holidays
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def compile(cls, store_id: int, operating_hours: List[models.OperatingHour], holidays: List[models.Holiday]):
+        days = {}
+        for hour in operating_hours:
+            breaks = []
+            if hour.break_time_list and hour.break_time_list != "[]":
+                try:
+                    for bt in json.loads(hour.break_time_list):
+                        if bt.get("start") and bt.get("end"):
+                            breaks.append((bt["start"], bt["end"]))
+                except (ValueError, TypeError, AttributeError):
+                    pass # 잘못 저장된 브레이크 타임은 무시 (기존 동작과 동일)
+            days[hour.day_of_week] = DaySchedule(hour.open_time, hour.close_time, bool(hour.is_closed), breaks)
+        return cls(store_id, days, {h.date for h in holidays if h.date})
+
+    def closed_reason(self, now: datetime) -> Optional[str]:
+        # 주문을 받을 수 없으면 손님에게 보여줄 사유를, 받을 수 있으면 None을 반환
+        if now.strftime("%Y-%m-%d") in self.holidays:
+            return "오늘은 매장 휴무일입니다."
+
+        day = self.days.get(now.weekday())
+        if not day:
+            return None
+        if day.is_closed:
+            return "오늘은 매장 휴무일입니다."
+
+        current_break = day.current_break(now.strftime("%H:%M"))
+        if current_break:
+            return f"현재 브레이크 타임({current_break[0]} ~ {current_break[1]}) 중이므로 주문할 수 없습니다. ☕"
+        return None
+
+    def business_date(self, now: datetime):
+        # 오픈 시간 이전의 주문은 전날 영업일로 집계합니다. (새벽 영업 매장 대응)
+        day = self.days.get(now.weekday())
+        open_time_str = day.open_time if day else DEFAULT_OPEN_TIME
+        open_hour, open_minute = (int(x) for x in open_time_str.split(":")[:2])
+        today_open_dt = now.replace(hour=open_hour, minute=open_minute, second=0, microsecond=0)
+        if now < today_open_dt:
+            return (today_open_dt - timedelta(days=1)).date()
+        return today_open_dt.date()
+
+# 워커 프로세스 단위 캐시 {store_id: StoreSchedule}
+_schedules: Dict[int, StoreSchedule] = {}
+# 매장별 무효화 횟수. 읽는 도중 무효화가 일어났으면 읽은(이전) 값을 캐시에 넣지 않습니다.
+_generations: Dict[int, int] = {}
+
+def get_store_schedule(db: Session, store_id: int) -> StoreSchedule:
+    schedule = _schedules.get(store_id)
+    if schedule and time.monotonic() - schedule.loaded_at < SCHEDULE_TTL_SECONDS:
+        return schedule
+
+    generation = _generations.get(store_id, 0)
+    operating_hours = db.query(models.OperatingHour).filter(models.OperatingHour.store_id == store_id).all()
+    holidays = db.query(models.Holiday).filter(models.Holiday.store_id == store_id).all()
+    schedule = StoreSchedule.compile(store_id, operating_hours, holidays)
+    if _generations.get(store_id, 0) == generation:
+        _schedules[store_id] = schedule
+    return schedule
+
+def invalidate_store_schedule(store_id: int):
+    _generations[store_id] = _generations.get(store_id, 0) + 1
+    _schedules.pop(store_id, None)
+
+# ✨ 영업시간/휴일 변경을 flush 때 모아 두었다가 커밋이 끝나면 해당 매장 캐시를 버립니다. (롤백되면 버림)
+# 커밋 전에 버리면 동시 요청이 아직 커밋 전인 이전 값을 다시 캐시해 TTL 동안 쓰게 됩니다.
+# (query.update()/delete() 같은 일괄 쿼리는 이벤트가 없으므로 커밋 후 직접 invalidate_store_schedule을 호출하세요)
+@event.listens_for(Session, "after_flush")
+def _collect_schedule_changes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (models.OperatingHour, models.Holiday)) and obj.store_id is not None:
+            session.info.setdefault("schedule_changes", set()).add(obj.store_id)
+
+@event.listens_for(Session, "after_commit")
+def _apply_schedule_changes(session):
+    for store_id in session.info.pop("schedule_changes", ()):
+        invalidate_store_schedule(store_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_schedule_changes(session):
+    session.info.pop("schedule_changes", None)
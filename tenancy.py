@@ -0,0 +1,145 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, FrozenSet, NamedTuple, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+import models
+from database import SessionLocal
+
+# 다른 워커에서 생성/수정된 매장을 반영하기 위해 전체 목록을 다시 읽는 주기 (초)
+TENANCY_REFRESH_SECONDS = float(os.getenv("TENANCY_REFRESH_SECONDS", "60"))
+
+class StoreTenancy(NamedTuple):
+    brand_id: Optional[int]
+    group_id: Optional[int]
+
+class TenancyIndex:
+    """
+    매장 ↔ 브랜드/그룹 소속 관계를 메모리에 들고 있는 색인 (워커 프로세스 단위).
+    - 매장 → (brand_id, group_id), 브랜드/그룹 → 매장 ID 집합
+    - 서버 시작 시 한 번 전체를 읽고, 이 워커의 매장 생성/수정은 커밋 직후 바로 반영합니다.
+    - 색인에 없는 매장(다른 워커에서 방금 생성 등)은 DB에서 읽어 채웁니다.
+    """
+    def __init__(self):
+        self._stores: Dict[int, StoreTenancy] = {}
+        self._by_brand: Dict[int, FrozenSet[int]] = {}
+        self._by_group: Dict[int, FrozenSet[int]] = {}
+        self._lock = threading.Lock()
+        self.loaded_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        await run_in_threadpool(self.reload)
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(TENANCY_REFRESH_SECONDS)
+            try:
+                await run_in_threadpool(self.reload)
+            except Exception as e:
+                print(f"매장 소속 색인 갱신 실패 (기존 색인 유지): {e!r}")
+
+    def reload(self):
+        db = SessionLocal()
+        try:
+            rows = db.query(models.Store.id, models.Store.brand_id, models.Store.group_id).all()
+        finally:
+            db.close()
+        stores = {store_id: StoreTenancy(brand_id, group_id) for store_id, brand_id, group_id in rows}
+        by_brand, by_group = {}, {}
+        for store_id, tenancy in stores.items():
+            if tenancy.brand_id is not None:
+                by_brand.setdefault(tenancy.brand_id, set()).add(store_id)
+            if tenancy.group_id is not None:
+                by_group.setdefault(tenancy.group_id, set()).add(store_id)
+        with self._lock:
+            self._stores = stores
+            self._by_brand = {k: frozenset(v) for k, v in by_brand.items()}
+            self._by_group = {k: frozenset(v) for k, v in by_group.items()}
+            self.loaded_at = time.monotonic()
+
+    def put(self, store_id: int, brand_id: Optional[int], group_id: Optional[int]):
+        with self._lock:
+            self._discard(store_id)
+            self._stores[store_id] = StoreTenancy(brand_id, group_id)
+            if brand_id is not None:
+                self._by_brand[brand_id] = self._by_brand.get(brand_id, frozenset()) | {store_id}
+            if group_id is not None:
+                self._by_group[group_id] = self._by_group.get(group_id, frozenset()) | {store_id}
+
+    def remove(self, store_id: int):
+        with self._lock:
+            self._discard(store_id)
+
+    def _discard(self, store_id: int):
+        old = self._stores.pop(store_id, None)
+        if old is None:
+            return
+        if old.brand_id is not None:
+            self._by_brand[old.brand_id] = self._by_brand.get(old.brand_id, frozenset()) - {store_id}
+        if old.group_id is not None:
+            self._by_group[old.group_id] = self._by_group.get(old.group_id, frozenset()) - {store_id}
+
+    def get(self, db: Session, store_id: int) -> Optional[StoreTenancy]:
+        """매장의 소속 (없는 매장이면 None)"""
+        tenancy = self._stores.get(store_id)
+        if tenancy is not None:
+            return tenancy
+        row = db.query(models.Store.brand_id, models.Store.group_id).filter(models.Store.id == store_id).first()
+        if row is None:
+            return None
+        self.put(store_id, row.brand_id, row.group_id)
+        return self._stores[store_id]
+
+    def brand_of(self, db: Session, store_id: int) -> Optional[int]:
+        tenancy = self.get(db, store_id)
+        return tenancy.brand_id if tenancy else None
+
+    def stores_of_brand(self, brand_id: Optional[int]) -> FrozenSet[int]:
+        self._ensure_loaded()
+        return self._by_brand.get(brand_id, frozenset())
+
+    def stores_of_group(self, group_id: Optional[int]) -> FrozenSet[int]:
+        self._ensure_loaded()
+        return self._by_group.get(group_id, frozenset())
+
+    def _ensure_loaded(self):
+        # 역방향 조회는 전체 목록이 있어야 정확하므로, 서버 시작 전(스크립트 등)이면 여기서 한 번 읽습니다.
+        if self.loaded_at is None:
+            self.reload()
+
+# 전역에서 하나만 쓸 매장 소속 색인
+tenancy_index = TenancyIndex()
+
+# ✨ 매장 생성/수정/삭제를 flush 때 모아 두었다가 커밋이 끝나면 색인에 반영합니다. (롤백되면 버림)
+@event.listens_for(Session, "after_flush")
+def _collect_store_changes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, models.Store) and obj.id is not None:
+            session.info.setdefault("tenancy_changes", {})[obj.id] = (obj.brand_id, obj.group_id)
+    for obj in session.deleted:
+        if isinstance(obj, models.Store) and obj.id is not None:
+            session.info.setdefault("tenancy_changes", {})[obj.id] = None
+
+@event.listens_for(Session, "after_commit")
+def _apply_store_changes(session):
+    for store_id, change in session.info.pop("tenancy_changes", {}).items():
+        if change is None:
+            tenancy_index.remove(store_id)
+        else:
+            tenancy_index.put(store_id, *change)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_store_changes(session):
+    session.info.pop("tenancy_changes", None)
@@ -1,8 +1,10 @@
 import os
 import requests
+from datetime import datetime, timedelta
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 import models
+from tenancy import tenancy_index
 
 DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL")
 
@@ -12,11 +14,24 @@ def send_discord_alert(message: str):
             requests.post(DISCORD_WEBHOOK_URL, json={"content": f"🚨 **[토리오더 긴급알림]**\n{message}"})
     except: pass 
 
+def parse_date_range(start_date: str, end_date: str):
+    # "YYYY-MM-DD" 기간을 서버 현지 시각 기준 [시작일 00:00, 종료일 다음날 00:00) 범위로 변환
+    try:
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d").astimezone()
+        end_dt = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).astimezone()
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="날짜는 YYYY-MM-DD 형식이어야 합니다.")
+    except OverflowError:
+        # 9999-12-31의 다음날, 0001-01-01의 시간대 변환 등 datetime 범위를 벗어나는 날짜
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="조회할 수 없는 날짜 범위입니다.")
+    return start_dt, end_dt
+
 def verify_store_permission(db: Session, current_user: models.User, store_id: int):
     if current_user.role == models.UserRole.SUPER_ADMIN: return True
     if current_user.role == models.UserRole.BRAND_ADMIN:
-        store = db.query(models.Store).filter(models.Store.id == store_id).first()
-        if not store or store.brand_id != current_user.brand_id:
+        # 매장 소속은 메모리 색인에서 확인 (DB 조회 없음)
+        tenancy = tenancy_index.get(db, store_id)
+        if not tenancy or tenancy.brand_id != current_user.brand_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="타 브랜드 매장에는 접근불가")
         return True
     if current_user.role in [models.UserRole.STORE_OWNER, models.UserRole.STAFF]: